@@ -0,0 +1,27 @@
+"""Add task_status.stage for staged background-job progress.
+
+Revision ID: 002_task_stage
+Revises: 001_initial
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "002_task_stage"
+down_revision: str | None = "001_initial"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("task_status", sa.Column("stage", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("task_status", "stage")
@@ -0,0 +1,91 @@
+"""Add water_samples.row_key / content_hash for idempotent re-imports.
+
+Rows ingested before this revision are keyed here, with the application's
+own ``row_fingerprint``, so re-importing them updates or skips them
+instead of duplicating them.  Where a sample was already stored more than
+once, only its first copy gets the key; the later copies keep a NULL
+row_key (NULLs never conflict) and are left as they are.
+
+Revision ID: 003_sample_row_key
+Revises: 002_task_stage
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "003_sample_row_key"
+down_revision: str | None = "002_task_stage"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+_BACKFILL_BATCH = 5000
+# The stored columns ``row_fingerprint`` reads.
+_KEY_COLUMNS = (
+    "village_code",
+    "state",
+    "district",
+    "location",
+    "year",
+    "source",
+    "latitude",
+    "longitude",
+    "parameters_json",
+)
+
+
+def _backfill_row_keys() -> None:
+    from app.services.ingest_service import row_fingerprint
+
+    bind = op.get_bind()
+    samples = sa.table(
+        "water_samples",
+        sa.column("id"),
+        sa.column("row_key"),
+        sa.column("content_hash"),
+        *(sa.column(name) for name in _KEY_COLUMNS),
+    )
+    query = sa.select(samples.c.id, *(samples.c[name] for name in _KEY_COLUMNS)).order_by(samples.c.id)
+    stmt = (
+        sa.update(samples)
+        .where(samples.c.id == sa.bindparam("sample_id"))
+        .values(row_key=sa.bindparam("new_row_key"), content_hash=sa.bindparam("new_content_hash"))
+    )
+    seen: set[str] = set()
+    keyed = duplicates = last_id = 0
+    while rows := bind.execute(query.where(samples.c.id > last_id).limit(_BACKFILL_BATCH)).all():
+        params = []
+        for row in rows:
+            row_key, content_hash = row_fingerprint(row._mapping)
+            if row_key in seen:
+                duplicates += 1
+                continue
+            seen.add(row_key)
+            params.append({"sample_id": row.id, "new_row_key": row_key, "new_content_hash": content_hash})
+        if params:
+            bind.execute(stmt, params)
+        keyed += len(params)
+        last_id = rows[-1].id
+    if keyed or duplicates:
+        logger.info("Keyed %d existing samples; left %d duplicate copies unkeyed", keyed, duplicates)
+
+
+def upgrade() -> None:
+    op.add_column("water_samples", sa.Column("row_key", sa.String(length=64), nullable=True))
+    op.add_column("water_samples", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    _backfill_row_keys()
+    op.create_index("ix_water_samples_row_key", "water_samples", ["row_key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_water_samples_row_key", table_name="water_samples")
+    op.drop_column("water_samples", "content_hash")
+    op.drop_column("water_samples", "row_key")
@@ -0,0 +1,45 @@
+"""Add the jobs table backing the durable background-job queue.
+
+Revision ID: 004_jobs
+Revises: 003_sample_row_key
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "004_jobs"
+down_revision: str | None = "003_sample_row_key"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("task_id", sa.String(), nullable=True),
+        sa.Column("handler", sa.String(), nullable=False),
+        sa.Column("args_json", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("worker", sa.String(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("enqueued_at", sa.Float(), nullable=False),
+        sa.Column("started_at", sa.Float(), nullable=True),
+        sa.Column("finished_at", sa.Float(), nullable=True),
+        sa.Column("lease_expires_at", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_jobs_task_id", "jobs", ["task_id"])
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status", table_name="jobs")
+    op.drop_index("ix_jobs_task_id", table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,33 @@
+"""Add priority, client and size columns used to schedule queued jobs.
+
+Revision ID: 005_job_scheduling
+Revises: 004_jobs
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "005_job_scheduling"
+down_revision: str | None = "004_jobs"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("priority", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("jobs", sa.Column("client", sa.String(), nullable=True))
+    op.add_column("jobs", sa.Column("size_bytes", sa.Integer(), nullable=True))
+    op.create_index("ix_jobs_client", "jobs", ["client"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_client", table_name="jobs")
+    op.drop_column("jobs", "size_bytes")
+    op.drop_column("jobs", "client")
+    op.drop_column("jobs", "priority")
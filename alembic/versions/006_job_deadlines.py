@@ -0,0 +1,29 @@
+"""Add per-job deadlines and cancellation requests.
+
+Revision ID: 006_job_deadlines
+Revises: 005_job_scheduling
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "006_job_deadlines"
+down_revision: str | None = "005_job_scheduling"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("deadline_seconds", sa.Float(), nullable=True))
+    op.add_column("jobs", sa.Column("cancel_requested", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column("jobs", "cancel_requested")
+    op.drop_column("jobs", "deadline_seconds")
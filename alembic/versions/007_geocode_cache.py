@@ -0,0 +1,36 @@
+"""Add the reverse-geocoding cache.
+
+Revision ID: 007_geocode_cache
+Revises: 006_job_deadlines
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "007_geocode_cache"
+down_revision: str | None = "006_job_deadlines"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "geocode_cache",
+        sa.Column("scope", sa.String(), primary_key=True),
+        sa.Column("lat_key", sa.BigInteger(), primary_key=True),
+        sa.Column("lon_key", sa.BigInteger(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("admin1", sa.String(), nullable=True),
+        sa.Column("admin2", sa.String(), nullable=True),
+        sa.Column("cc", sa.String(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("geocode_cache")
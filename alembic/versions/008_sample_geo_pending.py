@@ -0,0 +1,29 @@
+"""Flag samples awaiting deferred reverse geocoding.
+
+Revision ID: 008_sample_geo_pending
+Revises: 007_geocode_cache
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "008_sample_geo_pending"
+down_revision: str | None = "007_geocode_cache"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("water_samples", sa.Column("geo_pending", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.create_index("ix_water_samples_geo_pending", "water_samples", ["geo_pending"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_water_samples_geo_pending", table_name="water_samples")
+    op.drop_column("water_samples", "geo_pending")
@@ -5,7 +5,14 @@ In-memory TTL caching layer.
 Uses ``cachetools`` for lightweight, thread-safe caching with automatic
 TTL expiration.  No external infrastructure (Redis, Memcached) required.
 
-Cache is invalidated explicitly when new data is uploaded.
+Cache is invalidated explicitly when new data is uploaded, or, when
+background geocoding renames places, only for the map viewports and
+summaries those rows appear in.  The quick-calc memo is pure computation
+and never needs invalidating.
+
+The caches that matter live in the API process serving the requests; a
+job worker process ``set_sink``-s its invalidations to be forwarded
+there (see ``job_queue``), where they are ``apply``-ed.
 """
 
 from __future__ import annotations
@@ -13,10 +20,17 @@ from __future__ import annotations
 import functools
 import hashlib
 import logging
-from collections.abc import Callable
+import threading
+from collections.abc import Callable, Mapping
 from typing import Any
 
-from cachetools import TTLCache
+import numpy as np
+from cachetools import LRUCache, TTLCache
+from prometheus_client import Counter
+
+from app import calculator
+from app.config import settings
+from app.standards import get_profile
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +38,18 @@ logger = logging.getLogger(__name__)
 # Max 256 entries, 5-minute TTL.  Tunable via env vars if needed later.
 _indices_cache: TTLCache = TTLCache(maxsize=256, ttl=300)
 _map_cache: TTLCache = TTLCache(maxsize=256, ttl=300)
+# Viewport (min_lng, min_lat, max_lng, max_lat) of each map cache entry; None = whole map.
+_map_bboxes: dict[str, tuple[float, float, float, float] | None] = {}
+
+# Quick-calc results are deterministic, so plain LRU (no TTL) is enough.
+_quickcalc_cache: LRUCache = LRUCache(maxsize=max(1, settings.QUICKCALC_CACHE_SIZE))
+_quickcalc_lock = threading.Lock()
+
+# Where this process's invalidations go instead of its own caches (job workers).
+_sink: Callable[[str, tuple[Any, ...]], None] | None = None
+
+QUICKCALC_CACHE_HITS = Counter("quickcalc_cache_hits_total", "Quick-calc results served from the LRU memo")
+QUICKCALC_CACHE_MISSES = Counter("quickcalc_cache_misses_total", "Quick-calc results computed on a memo miss")
 
 
 def _make_key(*args: Any, **kwargs: Any) -> str:
@@ -49,6 +75,15 @@ def cached_indices(func: Callable) -> Callable:
     return wrapper
 
 
+def _parse_bbox(bbox: str | None) -> tuple[float, float, float, float] | None:
+    # Mirrors get_map_points: a missing or malformed bbox returns every point.
+    try:
+        min_lng, min_lat, max_lng, max_lat = map(float, bbox.split(","))
+    except AttributeError, ValueError:
+        return None
+    return min_lng, min_lat, max_lng, max_lat
+
+
 def cached_map(func: Callable) -> Callable:
     """Decorator to cache map endpoint results."""
 
@@ -60,14 +95,88 @@ def cached_map(func: Callable) -> Callable:
             return _map_cache[key]
         result = await func(*args, **kwargs)
         _map_cache[key] = result
+        if len(_map_bboxes) >= _map_cache.maxsize:
+            # Forget the viewports of entries the cache has expired or evicted.
+            for stale in [k for k in list(_map_bboxes) if k not in _map_cache]:
+                _map_bboxes.pop(stale, None)
+        _map_bboxes[key] = _parse_bbox(kwargs.get("bbox"))
         logger.debug("Cache MISS for map (key=%s)", key[:8])
         return result
 
     return wrapper
 
 
+def quickcalc_indices(metals: Mapping[str, Any], standard: str = "BIS") -> dict[str, Any]:
+    """
+    ``calculator.calculate_all_indices`` behind an LRU memo.
+
+    The key is the compiled standard profile plus the canonical
+    (symbol-resolved, rounded) metal vector, so ``{"arsenic": 12}`` and
+    ``{"As": 12}`` share one entry.  Disabled by
+    ``QUICKCALC_CACHE_ENABLED=false``.
+    """
+    if not settings.QUICKCALC_CACHE_ENABLED:
+        return calculator.calculate_all_indices(metals, standard)
+
+    key = (get_profile(standard), calculator.canonical_metals(metals))
+    with _quickcalc_lock:
+        cached = _quickcalc_cache.get(key)
+    if cached is not None:
+        QUICKCALC_CACHE_HITS.inc()
+        return {**cached, "missing_parameters": list(cached["missing_parameters"])}
+
+    QUICKCALC_CACHE_MISSES.inc()
+    result = calculator.calculate_all_indices(metals, standard)
+    with _quickcalc_lock:
+        _quickcalc_cache[key] = {**result, "missing_parameters": list(result["missing_parameters"])}
+    return result
+
+
+def set_sink(sink: Callable[[str, tuple[Any, ...]], None] | None) -> None:
+    """Send this process's invalidations to *sink* as ``(name, args)`` rather than applying them."""
+    global _sink
+    _sink = sink
+
+
+def apply(name: str, args: tuple[Any, ...]) -> None:
+    """Apply an invalidation forwarded from another process's sink."""
+    _INVALIDATIONS[name](*args)
+
+
 def invalidate_all() -> None:
     """Clear all caches.  Called after new data uploads."""
+    if _sink is not None:
+        _sink("all", ())
+        return
     _indices_cache.clear()
     _map_cache.clear()
+    _map_bboxes.clear()
     logger.info("All caches invalidated.")
+
+
+def invalidate_points(lat: np.ndarray, lon: np.ndarray, summary_changed: bool = False) -> None:
+    """
+    Drop the cached map responses whose viewport contains any of the points
+    at *lat*/*lon* (samples whose place names changed), and the indices
+    summary when *summary_changed*.
+    """
+    if _sink is not None:
+        _sink("points", (lat, lon, summary_changed))
+        return
+    if summary_changed:
+        _indices_cache.clear()
+    dropped = 0
+    for key in list(_map_cache.keys()):
+        bbox = _map_bboxes.get(key)
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            inside = (lon >= min_lng) & (lon <= max_lng) & (lat >= min_lat) & (lat <= max_lat)
+            if not inside.any():
+                continue
+        _map_cache.pop(key, None)
+        _map_bboxes.pop(key, None)
+        dropped += 1
+    logger.info("Invalidated %d cached map responses for %d updated points.", dropped, len(lat))
+
+
+_INVALIDATIONS: dict[str, Callable[..., None]] = {"all": invalidate_all, "points": invalidate_points}
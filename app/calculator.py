@@ -11,11 +11,13 @@ Computes 6 water quality indices:
   6. PMI  — PCA-Based Metal Index
 
 Changes from v2:
-- Uses app.standards for WHO/BIS limits
+- Uses app.standards for WHO/BIS limits (precompiled StandardProfile vectors)
 - Supports selectable standard ('BIS' or 'WHO')
 - 6 indices instead of 2
 - Metal name-to-symbol mapping for flexible input
 - Backward-compatible function signatures
+- Vectorized batch engine (``calculate_all_indices_batch``); the per-row
+  functions are thin wrappers over the same array kernels
 """
 
 from __future__ import annotations
@@ -25,15 +27,15 @@ import math
 from collections.abc import Mapping
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 from app.standards import (
-    EHCI_WEIGHTS,
-    HMI_WEIGHTS,
+    METAL_ORDER,
     NSPMI_MAX,
     NSPMI_MIN,
-    PMI_FACTOR_SCORES,
-    STANDARDS,
+    StandardProfile,
+    get_profile,
 )
 
 logger = logging.getLogger(__name__)
@@ -61,7 +63,74 @@ PERMISSIBLE_VALUES: dict[str, int] = {
 UNIT_WEIGHTAGE: dict[str, float] = {metal: 1.0 / value for metal, value in PERMISSIBLE_VALUES.items()}
 
 
-# ── Helpers ─────────────────────────────────────────────────────────────
+# ── Vectorized Engine ──────────────────────────────────────────────────
+# Every index is computed over an ``(n_rows, n_metals)`` concentration
+# matrix in one pass.  The per-row functions further down are thin
+# wrappers that build a one-row matrix and call the same kernels, so the
+# scalar and batch paths cannot drift apart.
+
+# Matrix columns follow app.standards.METAL_ORDER, the same ordering every
+# compiled StandardProfile vector uses.
+_METAL_INDEX: dict[str, int] = {symbol: j for j, symbol in enumerate(METAL_ORDER)}
+_METAL_KEYS: tuple[str, ...] = (*METAL_NAME_TO_SYMBOL, *METAL_ORDER)
+
+# Category labels indexed by ``np.digitize`` over the matching thresholds.
+_HPI_THRESHOLDS = np.array([25.0, 50.0, 75.0, 100.0])
+_HPI_LABELS = np.array(["Excellent", "Good", "Poor", "Very Poor", "Unsuitable"], dtype=object)
+_CD_THRESHOLDS = np.array([1.0, 3.0])
+_CD_LABELS = np.array(
+    ["Low degree of contamination", "Moderate degree of contamination", "High degree of contamination"],
+    dtype=object,
+)
+
+type BatchInput = pd.DataFrame | Mapping[str, Any]
+
+
+def _column_to_float(values: Any, key: str) -> np.ndarray:
+    """
+    Coerce one input column to a float64 vector.
+
+    None / NaN / ±inf become NaN (treated as "not measured"); negative
+    readings are clamped to 0.  Non-numeric strings raise ``ValueError``.
+    """
+    arr = np.asarray(values)
+    if arr.ndim == 0:
+        arr = arr.reshape(1)
+    if arr.dtype.kind not in "fiub":
+        arr = pd.to_numeric(pd.Series(arr, dtype=object)).to_numpy(dtype=np.float64, na_value=np.nan)
+    arr = arr.astype(np.float64)
+    arr[~np.isfinite(arr)] = np.nan
+
+    negative = arr < 0
+    if negative.any():
+        logger.warning("Clamped %d negative %s value(s) to 0", int(negative.sum()), key)
+        arr[negative] = 0.0
+    return arr
+
+
+def _metal_matrix(columns: Mapping[str, Any], n_rows: int) -> np.ndarray:
+    """
+    Build an ``(n_rows, len(METAL_ORDER))`` matrix of concentrations in
+    mg/L, NaN where a metal was not measured.
+
+    Lowercase-name columns (``'arsenic'``) are read first; symbol columns
+    (``'As'``) override them wherever the symbol value is usable.
+    """
+    conc = np.full((n_rows, len(METAL_ORDER)), np.nan)
+
+    for name, symbol in METAL_NAME_TO_SYMBOL.items():
+        if name in columns:
+            conc[:, _METAL_INDEX[symbol]] = _column_to_float(columns[name], name)
+
+    for symbol, j in _METAL_INDEX.items():
+        if symbol in columns:
+            vals = _column_to_float(columns[symbol], symbol)
+            conc[:, j] = np.where(np.isnan(vals), conc[:, j], vals)
+
+    # Both names and symbols are assumed to arrive in µg/L.
+    return conc / 1000.0
+
+
 def _safe_value(row: Mapping[str, Any], key: str) -> float | None:
     """Return a valid non-negative finite float, or None."""
     if key not in row:
@@ -77,101 +146,205 @@ def _safe_value(row: Mapping[str, Any], key: str) -> float | None:
     except TypeError, ValueError:
         pass
     val = float(val)
+    if math.isinf(val):
+        return None
     if val < 0:
         logger.warning("Negative %s value (%.4f) clamped to 0", key, val)
         return 0.0
     return val
 
 
+def _row_matrix(row: Mapping[str, Any]) -> np.ndarray:
+    """
+    One-row concentration matrix for a single ``Mapping`` row.
+
+    Built with plain-Python coercion: for one row that is several times
+    cheaper than going through the column path in ``_metal_matrix``.
+    """
+    vec = [math.nan] * len(METAL_ORDER)
+    for name, symbol in METAL_NAME_TO_SYMBOL.items():
+        val = _safe_value(row, name)
+        if val is not None:
+            vec[_METAL_INDEX[symbol]] = val
+    for symbol, j in _METAL_INDEX.items():
+        val = _safe_value(row, symbol)
+        if val is not None:
+            vec[j] = val
+    return np.array([vec]) / 1000.0
+
+
+def canonical_metals(row: Mapping[str, Any], significant_digits: int = 12) -> tuple[float | None, ...]:
+    """
+    Symbol-resolved mg/L concentrations of *row* in ``METAL_ORDER``,
+    rounded to *significant_digits* (None = not measured).
+
+    Rows that differ only in how metals are keyed (``'arsenic'`` vs
+    ``'As'``) or in float noise map to the same tuple, which makes it a
+    safe memoization key.
+    """
+    return tuple(None if math.isnan(v) else float(f"{v:.{significant_digits}g}") for v in _row_matrix(row)[0].tolist())
+
+
+def _batch_matrix(data: BatchInput) -> np.ndarray:
+    """Concentration matrix for a DataFrame or a dict of per-metal arrays."""
+    if isinstance(data, pd.DataFrame):
+        return _metal_matrix(data, len(data))
+
+    lengths = {np.atleast_1d(np.asarray(data[key])).shape[0] for key in _METAL_KEYS if key in data}
+    if len(lengths) > 1:
+        raise ValueError("All metal columns must have the same length.")
+    if lengths:
+        n_rows = lengths.pop()
+    else:
+        n_rows = next((len(v) for v in data.values() if np.ndim(v) > 0), 0)
+    return _metal_matrix(data, n_rows)
+
+
 def _resolve_metals(row: Mapping[str, Any]) -> dict[str, float]:
     """
     Extract metal concentrations from *row*, returning a dict keyed by
-    chemical symbol (e.g. ``'As'``, ``'Pb'``).
+    chemical symbol (e.g. ``'As'``, ``'Pb'``) in mg/L.
 
     Accepts rows with either lowercase names (``'arsenic'``) or chemical
     symbols (``'As'``).  Symbol-keyed values take precedence when both are
     present.
     """
-    metals: dict[str, float] = {}
+    conc = _row_matrix(row)[0]
+    return {symbol: float(conc[j]) for symbol, j in _METAL_INDEX.items() if not np.isnan(conc[j])}
 
-    # First pass: lowercase names → symbols
-    for name, symbol in METAL_NAME_TO_SYMBOL.items():
-        val = _safe_value(row, name)
-        if val is not None:
-            metals[symbol] = val / 1000.0  # Convert µg/L to mg/L
 
-    # Second pass: direct symbol keys (override names if both present)
-    for symbol in STANDARDS.get("BIS", {}):
-        val = _safe_value(row, symbol)
-        if val is not None:
-            # Assume direct symbols might be mg/L or µg/L?
-            # If the user uploads CSV with 'As', 'Cd' it's probably µg/L too.
-            metals[symbol] = val / 1000.0  # Convert µg/L to mg/L
+def _hpi_kernel(conc: np.ndarray, profile: StandardProfile) -> tuple[np.ndarray, np.ndarray]:
+    qi = np.where(
+        profile.no_relaxation,
+        np.maximum(100.0 * (conc / profile.si - 1.0), 0.0),
+        np.maximum(0.0, 100.0 * (conc - profile.ii) / profile.span),
+    )
+    wi = np.where(np.isnan(conc), 0.0, profile.hpi_weight)
+    wi_sum = wi.sum(axis=1)
+    wiqi_sum = np.nansum(wi * qi, axis=1)
+    hpi = np.round(np.divide(wiqi_sum, wi_sum, out=np.zeros_like(wi_sum), where=wi_sum > 0), 2)
 
-    return metals
+    category = _HPI_LABELS[np.digitize(hpi, _HPI_THRESHOLDS)]
+    category[wi_sum == 0] = "No Data"
+    return hpi, category
 
 
-# ── Index Calculations ─────────────────────────────────────────────────
-def calculate_hpi(row: Mapping[str, Any], standard: str = "BIS") -> tuple[float, str]:
-    """
-    Heavy Metal Pollution Index (HPI).
+def _cd_kernel(conc: np.ndarray, profile: StandardProfile) -> tuple[np.ndarray, np.ndarray]:
+    cd = np.nansum(np.maximum(conc / profile.si - 1.0, 0.0), axis=1)
 
-    Uses the standard HPI formula:
-        Wi = 1 / Si
-        Qi = 100 * (Oi - Ii) / (Si - Ii), clamped >= 0
-    Fallback when Si == Ii (No Relaxation):
-        Qi = 100 * max(0, Oi/Si - 1)
+    # Classification uses the unrounded value, as the per-row code always did.
+    return np.round(cd, 2), _CD_LABELS[np.digitize(cd, _CD_THRESHOLDS)]
 
-    Returns ``(hpi_value, category_string)`` with 5-level classification.
+
+def _hei_kernel(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    return np.round(np.nansum(conc / profile.si, axis=1), 4)
+
+
+def _ehci_kernel(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    qi = np.maximum(0.0, 100.0 * (conc - profile.ii) / profile.span)
+    return np.round(np.nansum(profile.ehci_weight * qi, axis=1), 4)
+
+
+def _hmi_kernel(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    return np.round(np.nansum(profile.hmi_weight * (conc / profile.si), axis=1), 4)
+
+
+def _pmi_kernel(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    vt = np.nansum(conc, axis=1)
+    weighted = np.nansum(conc * profile.pmi_weight, axis=1)
+    nspmi = np.divide(weighted, vt, out=np.full_like(vt, NSPMI_MIN), where=vt > 0)
+    return np.round(np.maximum(0.0, (nspmi - NSPMI_MIN) / (NSPMI_MAX - NSPMI_MIN)), 4)
+
+
+def _compute_all(conc: np.ndarray, standard: str) -> dict[str, np.ndarray]:
+    profile = get_profile(standard)
+    hpi, hpi_cat = _hpi_kernel(conc, profile)
+    cd, cd_cat = _cd_kernel(conc, profile)
+    missing_mask = np.isnan(conc) & profile.defined
+
+    return {
+        "hpi": hpi,
+        "hpi_category": hpi_cat,
+        "cd": cd,
+        "cd_category": cd_cat,
+        "hei": _hei_kernel(conc, profile),
+        "ehci": _ehci_kernel(conc, profile),
+        "hmi": _hmi_kernel(conc, profile),
+        "pmi": _pmi_kernel(conc, profile),
+        "reduced_parameter_set": missing_mask.any(axis=1),
+        "missing_mask": missing_mask,
+    }
+
+
+def calculate_all_indices_batch(data: BatchInput, standard: str = "BIS") -> dict[str, np.ndarray]:
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
+    Compute all 6 indices for every row of *data* in one vectorized pass.
 
-    if not metals:
-        return 0.0, "No Data"
+    *data* is a DataFrame or a dict of equal-length arrays, one column per
+    metal (lowercase names or chemical symbols, in µg/L — the same keys
+    the per-row functions accept).
 
-    wi_sum: float = 0.0
-    wiqi_sum: float = 0.0
+    Returns a dict of length-``n`` arrays::
 
-    for symbol, oi in metals.items():
-        if symbol not in std:
-            continue
+        {
+            "hpi": float64, "hpi_category": object,
+            "cd": float64, "cd_category": object,
+            "hei": float64, "ehci": float64,
+            "hmi": float64, "pmi": float64,
+            "reduced_parameter_set": bool,
+            "missing_mask": bool, shape (n, len(METAL_ORDER)),
+        }
+    """
+    result = _compute_all(_batch_matrix(data), standard)
 
-        si = std[symbol]["Si"]
-        ii = std[symbol]["Ii"]
+    n_reduced = int(result["reduced_parameter_set"].sum())
+    if n_reduced:
+        logger.info("%d of %d row(s) were computed with a reduced parameter set", n_reduced, len(result["hpi"]))
 
-        if si is None or ii is None or not si:
-            continue
+    return result
 
-        wi = 1.0 / si
 
-        if si == ii:
-            # No Relaxation fallback
-            qi = 100.0 * ((oi / si) - 1.0) if oi > si else 0.0
-        else:
-            qi = max(0.0, 100.0 * (oi - ii) / (si - ii))
+def missing_parameters(missing_mask_row: np.ndarray) -> list[str]:
+    """Translate one row of a batch ``missing_mask`` into metal symbols."""
+    return [METAL_ORDER[j] for j in np.flatnonzero(missing_mask_row)]
 
-        wi_sum += wi
-        wiqi_sum += wi * qi
 
-    if wi_sum == 0:
-        return 0.0, "No Data"
+def batch_records(result: Mapping[str, np.ndarray]) -> list[dict[str, Any]]:
+    """
+    Split a ``calculate_all_indices_batch`` result into one plain dict per
+    row, shaped exactly like ``calculate_all_indices`` output.
+    """
+    columns = {
+        key: result[key].tolist() for key in ("hpi", "hpi_category", "cd", "cd_category", "hei", "ehci", "hmi", "pmi")
+    }
+    reduced = result["reduced_parameter_set"].tolist()
+    missing = result["missing_mask"].tolist()
+
+    return [
+        {
+            **{key: values[i] for key, values in columns.items()},
+            "reduced_parameter_set": reduced[i],
+            "missing_parameters": [symbol for symbol, gap in zip(METAL_ORDER, missing[i], strict=True) if gap],
+        }
+        for i in range(len(reduced))
+    ]
 
-    hpi_value = round(wiqi_sum / wi_sum, 2)
 
-    # 5-level HPI classification
-    if hpi_value < 25:
-        category = "Excellent"
-    elif hpi_value < 50:
-        category = "Good"
-    elif hpi_value < 75:
-        category = "Poor"
-    elif hpi_value < 100:
-        category = "Very Poor"
-    else:
-        category = "Unsuitable"
+# ── Index Calculations ─────────────────────────────────────────────────
+def calculate_hpi(row: Mapping[str, Any], standard: str = "BIS") -> tuple[float, str]:
+    """
+    Heavy Metal Pollution Index (HPI).
 
-    return hpi_value, category
+    Uses the standard HPI formula:
+        Wi = 1 / Si
+        Qi = 100 * (Oi - Ii) / (Si - Ii), clamped >= 0
+    Fallback when Si == Ii (No Relaxation):
+        Qi = 100 * max(0, Oi/Si - 1)
+
+    Returns ``(hpi_value, category_string)`` with 5-level classification.
+    """
+    hpi, category = _hpi_kernel(_row_matrix(row), get_profile(standard))
+    return float(hpi[0]), category[0]
 
 
 def calculate_cd(row: Mapping[str, Any], standard: str = "BIS") -> tuple[float, str]:
@@ -182,27 +355,8 @@ def calculate_cd(row: Mapping[str, Any], standard: str = "BIS") -> tuple[float,
 
     Returns ``(cd_value, category_string)`` with 3-level classification.
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
-
-    cd_value: float = 0.0
-
-    for symbol, oi in metals.items():
-        if symbol not in std:
-            continue
-        si = std[symbol]["Si"]
-        if si is None or not si:
-            continue
-        cd_value += max((oi / si) - 1.0, 0.0)
-
-    if cd_value < 1:
-        category = "Low degree of contamination"
-    elif cd_value < 3:
-        category = "Moderate degree of contamination"
-    else:
-        category = "High degree of contamination"
-
-    return round(cd_value, 2), category
+    cd, category = _cd_kernel(_row_matrix(row), get_profile(standard))
+    return float(cd[0]), category[0]
 
 
 # Backward-compatible alias
@@ -215,20 +369,7 @@ def calculate_hei(row: Mapping[str, Any], standard: str = "BIS") -> float:
 
     HEI = Σ (Oi / Si) for each metal.
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
-
-    hei: float = 0.0
-
-    for symbol, oi in metals.items():
-        if symbol not in std:
-            continue
-        si = std[symbol]["Si"]
-        if si is None or not si:
-            continue
-        hei += oi / si
-
-    return round(hei, 4)
+    return float(_hei_kernel(_row_matrix(row), get_profile(standard))[0])
 
 
 def calculate_ehci(row: Mapping[str, Any], standard: str = "BIS") -> float:
@@ -238,25 +379,7 @@ def calculate_ehci(row: Mapping[str, Any], standard: str = "BIS") -> float:
     Weighted sum of Qi values using entropy-derived weights.
     Skips metals with Si == Ii (No Relaxation).
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
-
-    ehci: float = 0.0
-
-    for symbol, oi in metals.items():
-        if symbol not in std or symbol not in EHCI_WEIGHTS:
-            continue
-
-        si = std[symbol]["Si"]
-        ii = std[symbol]["Ii"]
-
-        if si is None or ii is None or si == ii:
-            continue
-
-        qi = max(0.0, 100.0 * (oi - ii) / (si - ii))
-        ehci += EHCI_WEIGHTS[symbol] * qi
-
-    return round(ehci, 4)
+    return float(_ehci_kernel(_row_matrix(row), get_profile(standard))[0])
 
 
 def calculate_hmi(row: Mapping[str, Any], standard: str = "BIS") -> float:
@@ -265,22 +388,7 @@ def calculate_hmi(row: Mapping[str, Any], standard: str = "BIS") -> float:
 
     HMI = Σ Wi * (Oi / Si) for each metal (using toxicity weights).
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
-
-    hmi: float = 0.0
-
-    for symbol, oi in metals.items():
-        if symbol not in std or symbol not in HMI_WEIGHTS:
-            continue
-
-        si = std[symbol]["Si"]
-        if si is None or not si:
-            continue
-
-        hmi += HMI_WEIGHTS[symbol] * (oi / si)
-
-    return round(hmi, 4)
+    return float(_hmi_kernel(_row_matrix(row), get_profile(standard))[0])
 
 
 def calculate_pmi(row: Mapping[str, Any], standard: str = "BIS") -> float:
@@ -290,19 +398,7 @@ def calculate_pmi(row: Mapping[str, Any], standard: str = "BIS") -> float:
     Uses PCA factor scores to weight each metal's contribution,
     then normalizes to [0, 1] range.
     """
-    metals = _resolve_metals(row)
-
-    vt = sum(metals.values())
-
-    if vt == 0:
-        return 0.0
-
-    nspmi = sum(PMI_FACTOR_SCORES.get(symbol, 0.0) * (oi / vt) for symbol, oi in metals.items())
-
-    pmi = (nspmi - NSPMI_MIN) / (NSPMI_MAX - NSPMI_MIN)
-    pmi = max(0.0, pmi)
-
-    return round(pmi, 4)
+    return float(_pmi_kernel(_row_matrix(row), get_profile(standard))[0])
 
 
 def calculate_all_indices(
@@ -323,29 +419,11 @@ def calculate_all_indices(
             "missing_parameters": list,
         }
     """
-    std = STANDARDS.get(standard, STANDARDS["BIS"])
-    metals = _resolve_metals(row)
-
-    expected_metals = set(std.keys())
-    provided_metals = set(metals.keys())
-    missing_metals = list(expected_metals - provided_metals)
-    reduced_parameter_set = len(missing_metals) > 0
+    record = batch_records(_compute_all(_row_matrix(row), standard))[0]
 
-    if reduced_parameter_set:
-        logger.warning("Historical index was computed with a reduced parameter set. Missing: %s", missing_metals)
+    if record["reduced_parameter_set"]:
+        logger.warning(
+            "Historical index was computed with a reduced parameter set. Missing: %s", record["missing_parameters"]
+        )
 
-    hpi_value, hpi_cat = calculate_hpi(row, standard)
-    cd_value, cd_cat = calculate_cd(row, standard)
-
-    return {
-        "hpi": hpi_value,
-        "hpi_category": hpi_cat,
-        "cd": cd_value,
-        "cd_category": cd_cat,
-        "hei": calculate_hei(row, standard),
-        "ehci": calculate_ehci(row, standard),
-        "hmi": calculate_hmi(row, standard),
-        "pmi": calculate_pmi(row, standard),
-        "reduced_parameter_set": reduced_parameter_set,
-        "missing_parameters": missing_metals,
-    }
+    return record
@@ -20,6 +20,17 @@ def _csv_list(env_key: str, default: str) -> list[str]:
     return [v.strip() for v in raw.split(",") if v.strip()]
 
 
+def _seconds_by_key(env_key: str, default: str) -> dict[str, float]:
+    """Read a ``key=seconds,...`` env var (e.g. ``pdf=1800,csv=300``) into a dict."""
+    pairs = (item.split("=", 1) for item in _csv_list(env_key, default) if "=" in item)
+    return {key.strip().lower(): float(value) for key, value in pairs}
+
+
+def _bool(env_key: str, default: str) -> bool:
+    """Read a boolean env var ("1", "true", "yes", "on" are truthy)."""
+    return os.getenv(env_key, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class Settings:
     """Immutable application settings – one source of truth."""
@@ -43,6 +54,103 @@ class Settings:
 
     # --- Upload limits ---
     MAX_UPLOAD_SIZE_BYTES: int = int(os.getenv("MAX_UPLOAD_SIZE_BYTES", str(10 * 1024 * 1024)))  # 10 MB
+    # Uploads are streamed to disk; at most this much of one is buffered in memory.
+    UPLOAD_CHUNK_SIZE_BYTES: int = int(os.getenv("UPLOAD_CHUNK_SIZE_BYTES", str(1024 * 1024)))  # 1 MB
+
+    # --- Parse cache ---
+    # Parsed uploads keyed by SHA-256 of their bytes; LRU-evicted past the size cap.
+    PARSE_CACHE_ENABLED: bool = _bool("PARSE_CACHE_ENABLED", "true")
+    PARSE_CACHE_DIR: str = os.getenv("PARSE_CACHE_DIR", "data/parse_cache")
+    PARSE_CACHE_MAX_BYTES: int = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # 512 MB
+
+    # --- Ingest ---
+    # Rows geocoded, scored, inserted and committed per transaction by /calculate
+    # and ?auto_calculate uploads; bounds peak memory and SQLite write-lock time.
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+    # --- Reverse geocoding ---
+    # Uploaded coordinates are matched to the nearest GeoNames place in these
+    # countries (ISO codes; empty = worldwide), at most GEOCODER_MAX_DISTANCE_KM
+    # away (0 = any distance).  The index is built once under
+    # GEOCODER_INDEX_DIR and loaded lazily, or in the background after startup
+    # with GEOCODER_WARM_UP where the API process geocodes itself.
+    GEOCODER_COUNTRIES: list[str] = field(default_factory=lambda: _csv_list("GEOCODER_COUNTRIES", "IN"))
+    GEOCODER_MAX_DISTANCE_KM: float = float(os.getenv("GEOCODER_MAX_DISTANCE_KM", "100"))
+    GEOCODER_INDEX_DIR: str = os.getenv("GEOCODER_INDEX_DIR", "data/geocoder")
+    GEOCODER_WARM_UP: bool = _bool("GEOCODER_WARM_UP", "true")
+    # Coordinates are rounded to this many decimals (4 ≈ 11 m) and deduplicated
+    # before lookup; results are kept per rounded coordinate in the
+    # geocode_cache table, so repeat imports of the same wells skip the lookup.
+    GEOCODER_PRECISION: int = int(os.getenv("GEOCODER_PRECISION", "4"))
+    GEOCODER_CACHE_ENABLED: bool = _bool("GEOCODER_CACHE_ENABLED", "true")
+    # Leave rows that already carry state, district and location as uploaded.
+    GEOCODER_SKIP_LOCATED_ROWS: bool = _bool("GEOCODER_SKIP_LOCATED_ROWS", "false")
+    # Insert rows with their uploaded place names, flagged geo_pending, and
+    # geocode them afterwards in a background job, GEOCODER_ENRICH_BATCH_SIZE
+    # rows per transaction; false geocodes during ingest instead.
+    GEOCODER_DEFERRED: bool = _bool("GEOCODER_DEFERRED", "true")
+    GEOCODER_ENRICH_BATCH_SIZE: int = int(os.getenv("GEOCODER_ENRICH_BATCH_SIZE", "5000"))
+
+    # --- Background jobs ---
+    # Worker processes running queued uploads (0 = run each job in the API
+    # process right after its request, as FastAPI background tasks).
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    # A running job's lease; workers renew it while alive, and a job whose
+    # lease lapses (its worker died) is handed to another worker.
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+    # Workers that only take uploads up to JOB_FAST_LANE_MAX_BYTES, so small
+    # interactive files never wait behind bulk imports.  At least one worker
+    # always stays general.
+    JOB_FAST_LANE_WORKERS: int = int(os.getenv("JOB_FAST_LANE_WORKERS", "1"))
+    JOB_FAST_LANE_MAX_BYTES: int = int(os.getenv("JOB_FAST_LANE_MAX_BYTES", str(2 * 1024 * 1024)))
+    # Per-file-type wall-clock limit on a job, by upload extension (0 = none);
+    # other types get JOB_DEFAULT_DEADLINE_SECONDS.  A job past its deadline
+    # is stopped and its task failed; with JOB_KEEP_PARTIAL_ROWS (or
+    # ?keep_partial=true) the rows from PDF pages already parsed are kept.
+    JOB_DEADLINES: dict[str, float] = field(
+        default_factory=lambda: _seconds_by_key("JOB_DEADLINES", "pdf=1800,xlsx=600,xls=600,csv=300,json=300")
+    )
+    JOB_DEFAULT_DEADLINE_SECONDS: float = float(os.getenv("JOB_DEFAULT_DEADLINE_SECONDS", "600"))
+    JOB_KEEP_PARTIAL_ROWS: bool = _bool("JOB_KEEP_PARTIAL_ROWS", "false")
+    # How long shutdown waits for running jobs before stopping their workers.
+    JOB_SHUTDOWN_GRACE_SECONDS: float = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "10"))
+
+    # --- Parse sandbox ---
+    # Uploads are parsed in a throwaway child process with these caps (0 = no
+    # cap); a child that hits one is killed and its task fails.  The wall-clock
+    # limit catches parses that hang without using CPU.
+    PARSE_SANDBOX_ENABLED: bool = _bool("PARSE_SANDBOX_ENABLED", "true")
+    PARSE_SANDBOX_MAX_MEMORY_BYTES: int = int(os.getenv("PARSE_SANDBOX_MAX_MEMORY_BYTES", str(4 * 1024**3)))
+    PARSE_SANDBOX_CPU_SECONDS: int = int(os.getenv("PARSE_SANDBOX_CPU_SECONDS", "1800"))
+    PARSE_SANDBOX_TIMEOUT_SECONDS: float = float(os.getenv("PARSE_SANDBOX_TIMEOUT_SECONDS", "2400"))
+
+    # --- CSV parsing ---
+    # CSV uploads are read CSV_CHUNK_ROWS rows at a time, by pyarrow's
+    # streaming reader when it is installed ("auto"), else pandas' C parser.
+    CSV_ENGINE: str = os.getenv("CSV_ENGINE", "auto")  # auto | pyarrow | c
+    CSV_CHUNK_ROWS: int = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+
+    # --- PDF parsing ---
+    # Worker processes for page-parallel table extraction (1 = parse in-process,
+    # page by page); PDFs are split into ranges of PDF_PAGES_PER_CHUNK pages.
+    PDF_PARSE_WORKERS: int = int(os.getenv("PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PAGES_PER_CHUNK: int = int(os.getenv("PDF_PAGES_PER_CHUNK", "8"))
+
+    # --- Task progress ---
+    # Live progress is kept in memory; the task_status row is updated at most
+    # this often (plus on every status change).
+    TASK_PROGRESS_FLUSH_SECONDS: float = float(os.getenv("TASK_PROGRESS_FLUSH_SECONDS", "1"))
+    # Idle seconds between keep-alive comments on GET /tasks/{id}/events streams.
+    SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+    # --- Quick calculator ---
+    # Rows scored per vectorized pass by the NDJSON batch endpoint.
+    QUICKCALC_BATCH_CHUNK_SIZE: int = int(os.getenv("QUICKCALC_BATCH_CHUNK_SIZE", "1000"))
+    # LRU memoization of single quick-calc results, keyed by the canonical metal vector.
+    QUICKCALC_CACHE_ENABLED: bool = _bool("QUICKCALC_CACHE_ENABLED", "true")
+    QUICKCALC_CACHE_SIZE: int = int(os.getenv("QUICKCALC_CACHE_SIZE", "4096"))
 
     # --- Rate limiting (requests per minute per client IP) ---
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
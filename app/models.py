@@ -9,6 +9,8 @@ import json
 from datetime import UTC, datetime
 
 from sqlalchemy import (
+    BigInteger,
+    Boolean,
     Column,
     DateTime,
     Float,
@@ -64,6 +66,15 @@ class WaterSample(Base):
     standards_json: str = Column(Text, default="{}")
     validation_issues_json: str = Column(Text, default="[]")
 
+    # Set while state/district/location still hold the uploaded values and the
+    # row awaits reverse geocoding (see geocoding.enrich_pending).
+    geo_pending: bool = Column(Boolean, nullable=False, default=False, index=True)
+
+    # Natural-key fingerprint (see ingest_service.row_fingerprint) that makes
+    # re-imports idempotent, and a hash of the values a re-import may change.
+    row_key: str = Column(String(64), unique=True, index=True, nullable=True)
+    content_hash: str = Column(String(64), nullable=True)
+
     created_at: datetime = Column(DateTime, default=_utcnow)
     updated_at: datetime = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
@@ -123,8 +134,11 @@ class TaskStatus(Base):
     __tablename__ = "task_status"
 
     id = Column(String, primary_key=True)
-    status = Column(String, nullable=False, default="pending")  # pending | processing | completed | failed
+    status = Column(String, nullable=False, default="pending")  # pending | processing | completed | failed | cancelled
     progress = Column(Integer, default=0)  # 0–100
+    # Current phase of the job: parsing | saving | geocoding | scoring | inserting | done
+    # (left at the failing phase when status is "failed").
+    stage = Column(String, nullable=True)
     result_json = Column(Text, default="{}")
     error_message = Column(String, nullable=True)
 
@@ -145,6 +159,65 @@ class TaskStatus(Base):
         return f"<TaskStatus id={self.id} status={self.status} progress={self.progress}>"
 
 
+class Job(Base):
+    """A unit of background work in the durable job queue (see services/job_queue.py)."""
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    task_id = Column(String, index=True, nullable=True)
+    handler = Column(String, nullable=False)  # "package.module:function"
+    args_json = Column(Text, default="[]")
+    status = Column(
+        String, nullable=False, default="queued", index=True
+    )  # queued | running | done | failed | cancelled
+    attempts = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+
+    # Scheduling: higher priority first; among equals, clients with fewer
+    # jobs running go first; small jobs also qualify for the fast lane.
+    priority = Column(Integer, nullable=False, default=0)
+    client = Column(String, nullable=True, index=True)  # X-Client-Id header or client address
+    size_bytes = Column(Integer, nullable=True)
+
+    # Wall-clock limit per attempt (None = none), and a cancellation request
+    # (DELETE /tasks/{id}) for the worker running it to act on.
+    deadline_seconds = Column(Float, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+
+    # Unix timestamps (seconds): lease arithmetic stays plain float comparisons.
+    enqueued_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job id={self.id} status={self.status} attempts={self.attempts}>"
+
+
+class GeocodeCache(Base):
+    """Reverse-geocoding results by rounded coordinate (see services/geocoding.py)."""
+
+    __tablename__ = "geocode_cache"
+
+    # The index and settings the result came from (geocoding.cache_scope()),
+    # so a change of GEOCODER_COUNTRIES, distance or precision never reads
+    # results computed under the old ones.
+    scope = Column(String, primary_key=True)
+    # round(coordinate * 10**GEOCODER_PRECISION)
+    lat_key = Column(BigInteger, primary_key=True)
+    lon_key = Column(BigInteger, primary_key=True)
+    # All None: no place within GEOCODER_MAX_DISTANCE_KM.
+    name = Column(String, nullable=True)
+    admin1 = Column(String, nullable=True)
+    admin2 = Column(String, nullable=True)
+    cc = Column(String, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<GeocodeCache ({self.lat_key}, {self.lon_key}) name={self.name}>"
+
+
 def get_db():
     """FastAPI dependency – yields a DB session and ensures cleanup."""
     db: Session = SessionLocal()
@@ -24,7 +24,7 @@ async def predict_hotspots(
     """
     Accept a CSV or JSON file and return per-location risk predictions.
     """
-    df = await file_parser.parse_upload(
+    df = await file_parser.parse_upload_frame(
         file,
         allowed_types=_PREDICT_TYPES,
         validate_columns=True,
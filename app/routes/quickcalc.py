@@ -1,18 +1,29 @@
 # app/routes/quickcalc.py
-"""Quick calculator endpoint — pure computation, no DB persistence."""
+"""Quick calculator endpoints — pure computation, no DB persistence."""
 
 from __future__ import annotations
 
+import json
 import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
 
 from app import calculator
+from app.cache import quickcalc_indices
+from app.config import settings
 from app.schemas import QuickCalcRequest, QuickCalcResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
 
 @router.post("/quickcalc/", response_model=QuickCalcResponse)
 async def quick_calculate(request: QuickCalcRequest) -> QuickCalcResponse:
@@ -21,11 +32,140 @@ async def quick_calculate(request: QuickCalcRequest) -> QuickCalcResponse:
 
     Accepts metal concentrations as a dict (keyed by chemical symbol or
     lowercase name) and an optional standard ('BIS' or 'WHO').
-    No data is persisted — pure computation.
+    No data is persisted — pure computation, memoized for repeated inputs.
     """
-    indices = calculator.calculate_all_indices(request.metals, request.standard)
+    indices = quickcalc_indices(request.metals, request.standard)
 
     return QuickCalcResponse(
         indices=indices,
         standard=request.standard,
     )
+
+
+# ── Batch (NDJSON) ──────────────────────────────────────────────────────
+def _score_chunk(chunk: list[tuple[int, Any]]) -> Iterable[str]:
+    """
+    Validate and score one chunk of ``(index, raw_item)`` pairs, yielding
+    NDJSON lines in input order.  Valid items are grouped by standard and
+    scored with one vectorized call per group.
+    """
+    lines: dict[int, dict[str, Any]] = {}
+    groups: dict[str, list[tuple[int, QuickCalcRequest]]] = defaultdict(list)
+
+    for index, raw in chunk:
+        if isinstance(raw, Exception):
+            lines[index] = {"index": index, "error": str(raw)}
+            continue
+        try:
+            item = QuickCalcRequest.model_validate(raw)
+        except ValidationError as exc:
+            lines[index] = {
+                "index": index,
+                "error": exc.errors(include_url=False, include_context=False, include_input=False),
+            }
+            continue
+        groups[item.standard].append((index, item))
+
+    for standard, items in groups.items():
+        keys = {key for _, item in items for key in item.metals}
+        columns = {key: [item.metals.get(key) for _, item in items] for key in keys}
+        result = calculator.calculate_all_indices_batch(columns, standard)
+        for (index, _), indices in zip(items, calculator.batch_records(result), strict=True):
+            lines[index] = {"index": index, "indices": indices, "standard": standard}
+
+    for index, _ in chunk:
+        yield json.dumps(lines[index]) + "\n"
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    """Yield one decoded object per line of a streamed NDJSON body (or the parse error)."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            if line.strip():
+                yield _loads_or_error(line)
+    if buffer.strip():
+        yield _loads_or_error(buffer)
+
+
+def _loads_or_error(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return ValueError(f"Invalid JSON line: {exc}")
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that leaves ``receive`` to the body iterator.
+
+    Starlette normally runs a disconnect listener alongside the iterator,
+    which would swallow the request-body messages our NDJSON reader is
+    still consuming.  A client disconnect surfaces through
+    ``request.stream()`` instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _replay(items: list[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+def _parse_json_array(body: bytes) -> list[Any]:
+    try:
+        items = json.loads(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}") from exc
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of quick-calc requests.")
+    return items
+
+
+@router.post("/quickcalc/batch", response_class=StreamingResponse)
+async def quick_calculate_batch(request: Request) -> StreamingResponse:
+    """
+    Score many readings in one round-trip and stream the results back.
+
+    The body is either a JSON array or an NDJSON stream
+    (``Content-Type: application/x-ndjson``) of ``QuickCalcRequest``
+    objects — ``{"metals": {...}, "standard": "BIS"}``.  Items are scored
+    through the vectorized calculator in chunks and each result is
+    written as one NDJSON line as soon as its chunk is done::
+
+        {"index": 0, "indices": {...}, "standard": "BIS"}
+        {"index": 1, "error": "..."}
+
+    NDJSON input is consumed incrementally, so memory stays flat however
+    many lines are sent.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in _NDJSON_TYPES:
+        items = _iter_ndjson(request)
+    else:
+        # Parse eagerly so a malformed array is still a proper 400.
+        items = _replay(_parse_json_array(await request.body()))
+
+    chunk_size = max(1, settings.QUICKCALC_BATCH_CHUNK_SIZE)
+
+    async def _stream() -> AsyncIterator[str]:
+        chunk: list[tuple[int, Any]] = []
+        index = 0
+        async for raw in items:
+            chunk.append((index, raw))
+            index += 1
+            if len(chunk) >= chunk_size:
+                for line in _score_chunk(chunk):
+                    yield line
+                chunk = []
+        for line in _score_chunk(chunk):
+            yield line
+        logger.info("Quick-calc batch scored %d item(s)", index)
+
+    return _DuplexStreamingResponse(_stream(), media_type="application/x-ndjson")
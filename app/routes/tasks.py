@@ -1,15 +1,22 @@
 # app/routes/tasks.py
-"""Background task status polling endpoint."""
+"""Background task status endpoints: polling and a Server-Sent Events stream."""
 
 from __future__ import annotations
 
 import logging
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import models
+from app.config import settings
 from app.schemas import TaskStatusResponse
+from app.services import job_queue, task_events
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -24,18 +31,127 @@ async def get_task_status(
     Poll the status of a background upload-and-calculate task.
 
     Returns the current status, progress percentage, and result
-    (when completed) or error message (when failed).
+    (when completed) or error message (when failed).  A task still running
+    in this process is answered from memory, without a database query.
+    A task waiting for a worker also reports its place in the queue and
+    an estimated start time.
     """
+    live = task_events.live_snapshot(task_id)
+    if live is not None:
+        return TaskStatusResponse(**live)
+
     task = db.query(models.TaskStatus).filter(models.TaskStatus.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
 
-    return TaskStatusResponse(
-        task_id=task.id,
-        status=task.status,
-        progress=task.progress,
-        result=task.result,
-        error_message=task.error_message,
-        created_at=task.created_at,
-        updated_at=task.updated_at,
+    return TaskStatusResponse(**_stored_snapshot(db, task))
+
+
+@router.delete("/tasks/{task_id}", response_model=TaskStatusResponse, status_code=202, tags=["Tasks"])
+def cancel_task(task_id: str, db: Session = Depends(models.get_db)) -> TaskStatusResponse:
+    """
+    Cancel a queued or running task.
+
+    A queued task is cancelled straight away.  A running one is stopped by
+    its worker within about a second, its CPU work included; poll the task
+    (or follow its events) until ``status`` is ``cancelled``.  Tasks that
+    already finished answer 409.
+    """
+    task = db.query(models.TaskStatus).filter(models.TaskStatus.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
+    outcome = job_queue.cancel(db, task_id)
+    if outcome is None:
+        raise HTTPException(status_code=409, detail=f"Task '{task_id}' is not queued or running ({task.status}).")
+    logger.info("[BREADCRUMB] Cancellation of task %s: %s", task_id, outcome)
+    db.refresh(task)
+    return TaskStatusResponse(**(task_events.live_snapshot(task_id) or task_events.snapshot(task)))
+
+
+def _stored_snapshot(db: Session, task: models.TaskStatus) -> dict[str, Any]:
+    """Snapshot of a task's row, plus its place in the job queue while it waits."""
+    event = task_events.snapshot(task)
+    if task.status == "pending":
+        queued = job_queue.estimate(db, task.id)
+        if queued is not None:
+            event["queue_position"] = queued.position
+            if queued.start_at is not None:
+                event["estimated_start_at"] = datetime.fromtimestamp(queued.start_at, UTC)
+    return event
+
+
+def _load_snapshot(task_id: str) -> dict[str, Any] | None:
+    live = task_events.live_snapshot(task_id)
+    if live is not None:
+        return live
+    db = models.SessionLocal()
+    try:
+        task = db.query(models.TaskStatus).filter(models.TaskStatus.id == task_id).first()
+        return _stored_snapshot(db, task) if task else None
+    finally:
+        db.close()
+
+
+def _sse(event: dict[str, Any]) -> str:
+    return f"data: {TaskStatusResponse(**event).model_dump_json()}\n\n"
+
+
+def _changed(new: dict[str, Any], old: dict[str, Any]) -> bool:
+    return any(new.get(key) != old.get(key) for key in ("status", "progress", "stage"))
+
+
+@router.get("/tasks/{task_id}/events", response_class=StreamingResponse, tags=["Tasks"])
+async def stream_task_events(task_id: str) -> StreamingResponse:
+    """
+    Stream a task's progress as Server-Sent Events (``text/event-stream``).
+
+    Each event's ``data`` is the task's full status, in the same shape as
+    ``GET /tasks/{task_id}``: the current state first, then every progress,
+    stage or status change as it happens.  The stream ends after the
+    ``completed``, ``failed`` or ``cancelled`` event.  Comment lines are
+    sent every SSE_KEEPALIVE_SECONDS to keep idle proxies from closing the
+    connection.
+
+    Updates are pushed in-process without touching the database.  A task
+    run by another process reaches only its ``task_status`` row, so each
+    idle SSE_KEEPALIVE_SECONDS the row is re-read, and sent in place of the
+    keep-alive if it changed.  Clients that cannot hold the stream open
+    keep polling ``GET /tasks/{task_id}``.
+    """
+    # Subscribe before reading the current state, so no update falls between them.
+    subscription = task_events.subscribe(task_id)
+    try:
+        current = await run_in_threadpool(_load_snapshot, task_id)
+    except BaseException:
+        subscription.close()
+        raise
+    if current is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail=f"Task '{task_id}' not found.")
+
+    async def _stream() -> AsyncIterator[str]:
+        try:
+            event = current
+            yield _sse(event)
+            while event["status"] not in task_events.TERMINAL_STATUSES:
+                update = await subscription.next(timeout=settings.SSE_KEEPALIVE_SECONDS)
+                if update is None:
+                    update = await run_in_threadpool(_load_snapshot, task_id)
+                    if update is None:
+                        return  # the task is gone
+                    if _changed(update, event):
+                        event = update
+                        yield _sse(event)
+                    else:
+                        yield ": keep-alive\n\n"
+                    continue
+                event = update
+                yield _sse(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -3,204 +3,412 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import math
 import uuid
+from collections.abc import Callable, Iterable, Iterator
 from typing import Any
 
-import reverse_geocoder as rg
-
-# Force initialization of the KDTree in the main thread to prevent
-# C-extension segmentation faults on Windows when spawned in a background thread.
-rg.search((28.6139, 77.2090), mode=1)
-
-from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import models
 from app.cache import invalidate_all as invalidate_cache
+from app.config import settings
 from app.schemas import TaskAcceptedResponse
-from app.services import calculation_service, file_parser
-from app.standards import RFD
+from app.services import (
+    file_parser,
+    geocoding,
+    ingest_service,
+    job_queue,
+    parse_cache,
+    parse_sandbox,
+    task_events,
+    upload_store,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-PARAM_COLUMN_MAP = {
-    "parameters.pH": "pH",
-    "parameters.EC": "EC",
-    "parameters.CO3": "CO3",
-    "parameters.HCO3": "HCO3",
-    "parameters.Cl": "Cl",
-    "parameters.F": "F",
-    "parameters.SO4": "SO4",
-    "parameters.NO3": "NO3",
-    "parameters.PO4": "PO4",
-    "parameters.total_hardness": "total_hardness",
-    "parameters.Ca": "Ca",
-    "parameters.Mg": "Mg",
-    "parameters.Na": "Na",
-    "parameters.K": "K",
-    "parameters.TDS": "TDS",
-    "parameters.SiO2": "SiO2",
-    "parameters.Fe": "Fe",
-    "parameters.Mn": "Mn",
-    "parameters.Zn": "Zn",
-    "parameters.Cu": "Cu",
-    "parameters.U": "U",
-    "parameters.As": "As",
-    "parameters.Pb": "Pb",
-    "parameters.Cd": "Cd",
-    "parameters.Cr": "Cr",
-    "parameters.Hg": "Hg",
-    "parameters.Ni": "Ni",
-}
 
+import os
 
-def to_int_or_none(v):
-    try:
-        return int(v) if v not in ("", None) else None
-    except ValueError, TypeError:
-        return None
+from fastapi import HTTPException
 
+from app.schemas import CalculateResponse
 
-def to_float_or_none(v):
-    try:
-        if v in ("", None):
-            return None
-        val = float(v)
-        if math.isnan(val):
-            return None
-        return val
-    except ValueError, TypeError:
-        return None
+UPLOAD_DIR = "data/uploads"
 
 
-def normalize_str(v):
-    if v is None:
-        return ""
-    if isinstance(v, float) and math.isnan(v):
-        return ""
-    return str(v).strip()
+def _store_path(file_id: str) -> str:
+    """Directory holding the parsed upload in the columnar format of ``upload_store``."""
+    return os.path.join(UPLOAD_DIR, file_id)
 
 
-import os
+def _geocode_targets(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(mask, lat, lon)``: the rows to reverse-geocode (in-range coordinates) and their coordinates."""
+    lon = ingest_service.numeric_column(df, ingest_service.LON_COLUMN)
+    lat = ingest_service.numeric_column(df, ingest_service.LAT_COLUMN)
+    wanted = (lon >= -180.0) & (lon <= 180.0) & (lat >= -90.0) & (lat <= 90.0)
+    if settings.GEOCODER_SKIP_LOCATED_ROWS:
+        located = np.ones(len(df), dtype=bool)
+        for column in ("state", "district", "location"):
+            located &= np.array([v is not None for v in ingest_service.string_column(df, column)], dtype=bool)
+        wanted &= ~located
+    return wanted, lat, lon
 
-from fastapi import HTTPException
 
-from app.schemas import CalculateResponse
+def _geocode_frame(db: Session, df: pd.DataFrame) -> tuple[dict[int, dict[str, Any]], geocoding.GeocodeStats]:
+    """Reverse-geocode every row with in-range coordinates; positional index → hit."""
+    wanted, lat, lon = _geocode_targets(df)
+    valid_indices = np.flatnonzero(wanted)
+    hits, stats = geocoding.reverse_geocode(db, lat[valid_indices], lon[valid_indices])
+    return {i: hit for i, hit in zip(valid_indices.tolist(), hits, strict=True) if hit is not None}, stats
+
+
+def _geocode_summary(stats: geocoding.GeocodeStats) -> dict[str, Any]:
+    """Task-result form of an upload's geocoding totals."""
+    return {
+        **stats._asdict(),
+        "cache_hit_rate": round(stats.cache_hits / stats.coordinates, 4) if stats.coordinates else None,
+    }
 
-UPLOAD_DIR = "data/uploads"
 
+def _frame_batches(df: pd.DataFrame, batch_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start : start + batch_size].reset_index(drop=True)
+
+
+def _ingest_batches(
+    db: Session,
+    batches: Iterable[pd.DataFrame],
+    total_rows: int,
+    on_stage: Callable[[str, int], None] | None = None,
+) -> tuple[int, ingest_service.UpsertCounts, geocoding.GeocodeStats]:
+    """
+    Geocode, score and upsert a parsed upload one batch at a time, committing
+    after each so memory stays bounded and the write lock is released
+    between batches; returns ``(rows_processed, counts, geocode_stats)``
+    with the new / updated / skipped / duplicate and geocoding totals
+    across batches.
 
-def _parse_save_and_finalize(task_id: str, file_id: str, contents: bytes, filename: str):
-    """Background task: parse uploaded file bytes, save parsed rows to disk, and update task status."""
+    With GEOCODER_DEFERRED the rows to geocode are stored ``geo_pending``
+    instead, and an enrichment job is queued for them at the end.
+
+    *on_stage* is told ``(stage, progress %)`` as each phase of each batch
+    starts, with progress running from 75 to 99 across the batches.
+    """
+    processed = inserted = updated = skipped = duplicates = 0
+    geocoded = coordinates = cache_hits = deferred = 0
+
+    def stage(name: str):
+        if on_stage:
+            on_stage(name, 75 + (24 * processed) // max(total_rows, 1))
+
+    for batch in batches:
+        geocode_results: dict[int, dict[str, Any]]
+        if settings.GEOCODER_DEFERRED:
+            geocode_results, geo_pending = {}, _geocode_targets(batch)[0]
+            deferred += int(geo_pending.sum())
+        else:
+            stage("geocoding")
+            geocode_results, geo_stats = _geocode_frame(db, batch)
+            geo_pending = None
+            geocoded += geo_stats.rows
+            coordinates += geo_stats.coordinates
+            cache_hits += geo_stats.cache_hits
+
+        stage("scoring")
+        records = ingest_service.build_sample_records(batch, geocode_results, geo_pending)
+
+        stage("inserting")
+        counts = ingest_service.upsert_sample_records(db, records)
+        db.commit()
+        # Invalidate caches after each committed batch so readers see it
+        invalidate_cache()
+
+        processed += len(batch)
+        inserted += counts.inserted
+        updated += counts.updated
+        skipped += counts.skipped
+        duplicates += counts.duplicates
+        logger.info(
+            "[BREADCRUMB] Ingested %d/%d rows (%d new, %d updated, %d unchanged so far)",
+            processed,
+            total_rows,
+            inserted,
+            updated,
+            skipped,
+        )
+
+    if deferred:
+        job_id = geocoding.enqueue_enrichment(db)
+        db.commit()
+        logger.info("[BREADCRUMB] %d rows await geocoding by job %s", deferred, job_id)
+
+    return (
+        processed,
+        ingest_service.UpsertCounts(inserted, updated, skipped, duplicates),
+        geocoding.GeocodeStats(geocoded, coordinates, cache_hits, deferred),
+    )
+
+
+def _parse_save_and_finalize(
+    task_id: str,
+    file_id: str,
+    upload_path: str,
+    filename: str,
+    auto_calculate: bool = False,
+    cache_key: str | None = None,
+    keep_partial: bool = False,
+):
+    """
+    Job handler: parse the spooled upload and update task status.
+
+    The upload is parsed into an upload store on disk, kept for a later
+    ``/calculate/{file_id}`` by default.  With *auto_calculate* the store is
+    read back in INGEST_BATCH_SIZE batches and geocoded, scored and
+    inserted right here instead, then removed, so the whole pipeline runs
+    as one job with staged progress.
+
+    When *cache_key* is in the parse cache the parse is skipped and the
+    cached store used instead; otherwise the new store is added to it.
+
+    If the job times out while parsing a PDF, *keep_partial* still saves
+    (or inserts) the rows of the pages parsed so far; the task fails
+    either way, with those rows described in its result.
+    """
     logger.info("[BREADCRUMB] Starting background parse and save for task %s, file '%s'", task_id, filename)
     db_gen = models.get_db()
     db = next(db_gen)
+    tracker: task_events.TaskTracker | None = None
     try:
         task = db.query(models.TaskStatus).filter_by(id=task_id).first()
         if not task:
             return
 
-        task.status = "processing"
-        task.progress = 20
-        db.commit()
+        # Progress lives in memory and is written behind to task_status
+        # (throttled, plus every status change); see task_events.TaskTracker.
+        tracker = task_events.TaskTracker(db, task)
+        tracker.update(status="processing", stage="parsing", progress=20)
 
         def update_progress(pct: int):
             try:
-                task.progress = pct
-                db.commit()
+                tracker.update(progress=pct)
             except Exception:
                 pass
 
-        # Parse raw bytes (runs in background threadpool with per-page progress updates)
-        logger.info("[BREADCRUMB] Parsing bytes for '%s'", filename)
-        rows = file_parser.parse_bytes_direct(
-            contents, filename, validate_columns=True, progress_callback=update_progress
-        )
-
-        task.progress = 75
-        db.commit()
-
-        # Save parsed rows as JSON
-        filepath = os.path.join(UPLOAD_DIR, f"{file_id}.json")
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        task.progress = 85
-        db.commit()
-
-        with open(filepath, "w") as f:
-            json.dump(rows, f)
+        def enter_stage(stage: str, pct: int):
+            tracker.update(stage=stage, progress=pct)
+
+        def ingest_rows(batches: Iterable[pd.DataFrame], total_rows: int, cached: bool) -> dict:
+            """Geocode, score and insert the parsed rows (auto_calculate); returns the task result."""
+            rows_processed, counts, geo_stats = _ingest_batches(db, batches, total_rows, on_stage=enter_stage)
+            logger.info(
+                "[BREADCRUMB] Inserted %d of %d rows from '%s' for task %s",
+                counts.inserted,
+                rows_processed,
+                filename,
+                task_id,
+            )
+            return {
+                "filename": filename,
+                "rows_processed": rows_processed,
+                "rows_inserted": counts.inserted,
+                "rows_updated": counts.updated,
+                "rows_skipped": counts.skipped,
+                "rows_duplicate": counts.duplicates,
+                "cached": cached,
+                "geocoding": _geocode_summary(geo_stats),
+            }
 
-        logger.info(
-            "[BREADCRUMB] Saved %d rows from '%s' for task %s",
-            len(rows),
-            filename,
-            task_id,
-        )
+        def saved(total_rows: int, cached: bool) -> dict:
+            """Task result once the rows are in the upload store at ``_store_path(file_id)``."""
+            logger.info(
+                "[BREADCRUMB] Saved %d rows from '%s' for task %s",
+                total_rows,
+                filename,
+                task_id,
+            )
+            return {"file_id": file_id, "filename": filename, "cached": cached}
+
+        store_path = _store_path(file_id)
+        cached_path = parse_cache.lookup(cache_key) if cache_key else None
+        if cached_path:
+            logger.info("[BREADCRUMB] Reusing cached parse of '%s'", filename)
+            cached = upload_store.open_store(cached_path)
+            if auto_calculate:
+                result = ingest_rows(cached.iter_chunks(settings.INGEST_BATCH_SIZE), cached.num_rows, cached=True)
+            else:
+                # A link to the cache entry where possible, else a chunked copy
+                enter_stage("saving", 85)
+                if not parse_cache.copy_to(cache_key, store_path):
+                    upload_store.save_chunks(cached.iter_chunks(settings.INGEST_BATCH_SIZE), store_path)
+                result = saved(cached.num_rows, cached=True)
+        else:
+            # Parse the spooled upload in a resource-capped child process, with
+            # per-page progress updates.  The child writes the rows straight
+            # into the columnar upload store (CSV chunk by chunk), so neither
+            # process ever holds the whole parsed file.
+            logger.info("[BREADCRUMB] Parsing spooled upload for '%s'", filename)
+            try:
+                total_rows = parse_sandbox.parse_file_to_store(
+                    upload_path, filename, store_path, validate_columns=True, progress_callback=update_progress
+                )
+            except job_queue.JobTimedOut as exc:
+                if keep_partial and exc.partial is not None and not exc.partial.empty:
+                    df = exc.partial
+                    logger.info("[BREADCRUMB] Keeping %d rows parsed before the deadline", len(df))
+                    if auto_calculate:
+                        result = ingest_rows(_frame_batches(df, settings.INGEST_BATCH_SIZE), len(df), cached=False)
+                    else:
+                        upload_store.save_frame(df, store_path)
+                        result = saved(len(df), cached=False)
+                    # The job fails on re-raise; the task keeps this result.
+                    tracker.update(result={**result, "partial": True})
+                    tracker.flush()
+                raise
+            if cache_key:
+                parse_cache.store_saved(cache_key, store_path)
+            if auto_calculate:
+                try:
+                    store = upload_store.open_store(store_path)
+                    result = ingest_rows(store.iter_chunks(settings.INGEST_BATCH_SIZE), total_rows, cached=False)
+                finally:
+                    upload_store.remove(store_path)
+            else:
+                result = saved(total_rows, cached=False)
 
-        task.status = "completed"
-        task.progress = 100
-        task.result = {"file_id": file_id, "filename": filename}
-        db.commit()
+        tracker.update(status="completed", stage="done", progress=100, result=result)
     except Exception as e:
         logger.exception("[BREADCRUMB] Background parsing/save failed for task %s", task_id)
-        task = db.query(models.TaskStatus).filter_by(id=task_id).first()
-        if task:
-            task.status = "failed"
-            if hasattr(e, "detail"):
-                task.error_message = str(e.detail)
-            else:
-                task.error_message = str(e)
-            db.commit()
+        if tracker:
+            # Discard whatever the failed step left in the session; committed
+            # batches stay, and the task row is rewritten from the tracker.
+            db.rollback()
+            tracker.update(status="failed", error_message=str(e.detail) if hasattr(e, "detail") else str(e))
     finally:
+        try:
+            os.remove(upload_path)
+        except OSError:
+            logger.warning("Could not remove spooled upload %s", upload_path)
         try:
             next(db_gen)
         except StopIteration:
             pass
 
 
-@router.post("/upload/", response_model=TaskAcceptedResponse, status_code=202)
+def _client_key(request: Request) -> str | None:
+    """Whom an upload's job is scheduled fairly against: ``X-Client-Id``, else the caller's address."""
+    client_id = request.headers.get("x-client-id", "").strip()
+    if client_id:
+        return client_id[:128]
+    return request.client.host if request.client else None
+
+
+# The body is parsed by hand (see file_parser.spool_multipart_upload), so
+# describe it for the OpenAPI docs explicitly.
+_UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/upload/", response_model=TaskAcceptedResponse, status_code=202, openapi_extra=_UPLOAD_REQUEST_BODY)
 async def upload_file(
-    background_tasks: BackgroundTasks, file: UploadFile = File(...), db: Session = Depends(models.get_db)
+    request: Request,
+    background_tasks: BackgroundTasks,
+    auto_calculate: bool = False,
+    priority: int = Query(0, ge=-10, le=10, description="Higher runs sooner; 0 is normal"),
+    keep_partial: bool = Query(
+        settings.JOB_KEEP_PARTIAL_ROWS, description="On timeout, keep the rows of PDF pages already parsed"
+    ),
+    db: Session = Depends(models.get_db),
 ):
     """
     Accept a CSV, JSON, PDF, or Excel file and queue it for asynchronous parsing
-    in the background worker thread pool. Returns immediately with 202 Accepted.
-    """
-    logger.info("[BREADCRUMB] Incoming POST /upload/ for file '%s'", file.filename)
-    filename = file.filename or ""
-    content_type = file.content_type or ""
-
-    if content_type not in file_parser.ALLOWED_CONTENT_TYPES and not filename.endswith(
-        (".csv", ".json", ".xls", ".xlsx", ".pdf")
-    ):
-        raise HTTPException(
-            status_code=415,
-            detail="Unsupported file type. Please upload a CSV, JSON, PDF, or Excel file.",
-        )
+    by the job workers (see ``job_queue``). Returns immediately with 202 Accepted.
 
-    contents = await file.read()
-    if len(contents) > file_parser.settings.MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum allowed size is {file_parser.settings.MAX_UPLOAD_SIZE_BYTES} bytes.",
-        )
+    With ``?auto_calculate=true`` the background job also geocodes, scores
+    and inserts the rows (what ``/calculate/{file_id}`` would do), reporting
+    each phase in the task's ``stage``; no follow-up call is needed.
+
+    The file is streamed to disk as it arrives (never held in memory whole)
+    and rejected with 413 as soon as it exceeds MAX_UPLOAD_SIZE_BYTES.
+
+    Parses are cached by content hash: re-uploading a file that was parsed
+    before completes the task straight away (``"cached": true`` in its
+    result) without parsing it again.
+
+    Jobs run by ``?priority=`` (higher first), then fairly across clients
+    (``X-Client-Id`` header, else the caller's address); small files can
+    also take the fast lane.  See ``job_queue``.
 
+    Each job has a deadline by file type (JOB_DEADLINES); ``DELETE
+    /tasks/{task_id}`` cancels it.  With ``?keep_partial=true`` a PDF that
+    times out still yields the rows of the pages parsed in time.
+    """
+    logger.info("[BREADCRUMB] Incoming POST /upload/")
     file_id = uuid.uuid4().hex
     task_id = uuid.uuid4().hex
 
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    upload = await file_parser.spool_multipart_upload(request, os.path.join(UPLOAD_DIR, f"{file_id}.upload"))
+    filename = upload.filename
+    logger.info("[BREADCRUMB] Spooled %d bytes of '%s' to disk", upload.size, filename)
+    cache_key = parse_cache.cache_key(upload.sha256, filename)
+
+    if not auto_calculate and await run_in_threadpool(parse_cache.copy_to, cache_key, _store_path(file_id)):
+        os.remove(upload.path)
+        db.add(
+            models.TaskStatus(
+                id=task_id,
+                status="completed",
+                stage="done",
+                progress=100,
+                result={"file_id": file_id, "filename": filename, "cached": True},
+            )
+        )
+        db.commit()
+        logger.info("[BREADCRUMB] Served '%s' from the parse cache as task %s", filename, task_id)
+        return TaskAcceptedResponse(task_id=task_id, status="completed", poll_url=f"/api/v1/tasks/{task_id}")
+
     task = models.TaskStatus(
         id=task_id,
         status="pending",
+        stage="queued",
         progress=0,
     )
     db.add(task)
+    job_id = job_queue.enqueue(
+        db,
+        "app.routes.upload:_parse_save_and_finalize",
+        [task_id, file_id, upload.path, filename, auto_calculate, cache_key, keep_partial],
+        task_id=task_id,
+        priority=priority,
+        client=_client_key(request),
+        size_bytes=upload.size,
+        deadline_seconds=job_queue.deadline_for(filename),
+    )
     db.commit()
 
-    logger.info("[BREADCRUMB] Created task %s for file '%s', queueing background parse", task_id, filename)
-    background_tasks.add_task(_parse_save_and_finalize, task_id, file_id, contents, filename)
+    logger.info("[BREADCRUMB] Created task %s for file '%s', queued as job %s", task_id, filename, job_id)
+    if job_queue.runs_inline():
+        background_tasks.add_task(job_queue.run_job, job_id)
+        # ...and any job it queues in turn (geocoding of the rows it inserted)
+        background_tasks.add_task(job_queue.run_queued)
 
     return TaskAcceptedResponse(task_id=task_id, poll_url=f"/api/v1/tasks/{task_id}")
 
@@ -208,191 +416,39 @@ async def upload_file(
 @router.post("/calculate/{file_id}", response_model=CalculateResponse)
 def calculate_file(
     file_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(models.get_db),
 ):
     """
-    Read the previously parsed JSON file, calculate indices, and insert into DB.
+    Read the previously parsed upload, calculate indices, and upsert into DB
+    in INGEST_BATCH_SIZE batches, each committed on its own.  Rows already
+    stored (same natural key) are updated if changed and skipped otherwise,
+    so calculating overlapping data twice does not duplicate it.  With
+    GEOCODER_DEFERRED, reverse geocoding is left to a background job.
     Runs synchronously in FastAPI's external threadpool to avoid blocking the event loop.
     """
-    filepath = os.path.join(UPLOAD_DIR, f"{file_id}.json")
+    store_path = _store_path(file_id)
 
-    if not os.path.exists(filepath):
+    if not file_id.isalnum() or not upload_store.exists(store_path):
         raise HTTPException(status_code=404, detail="Uploaded file not found or expired.")
 
-    with open(filepath) as f:
-        rows = json.load(f)
-
-    # Pre-process coordinates for bulk reverse geocoding
-    coords_to_geocode = []
-    valid_indices = []
-    for i, r in enumerate(rows):
-        lon_val = to_float_or_none(r.get("coordinates.coordinates[0]"))
-        lat_val = to_float_or_none(r.get("coordinates.coordinates[1]"))
-        if lon_val is not None and lat_val is not None:
-            if -180.0 <= lon_val <= 180.0 and -90.0 <= lat_val <= 90.0:
-                coords_to_geocode.append((lat_val, lon_val))
-                valid_indices.append(i)
-
-    geocode_results = {}
-    if coords_to_geocode:
-        # use mode=1 to avoid multiprocessing spawn issues on Windows within threads
-        # batch to avoid GIL starvation
-        rg_results = []
-        chunk_size = 500
-        for i in range(0, len(coords_to_geocode), chunk_size):
-            chunk = coords_to_geocode[i : i + chunk_size]
-            rg_results.extend(rg.search(chunk, mode=1))
-
-        for i, res in zip(valid_indices, rg_results, strict=True):
-            geocode_results[i] = res
-
-    samples_created = 0
-    samples_list = []
-
-    for idx, r in enumerate(rows):
-        # Reverse fetch location names from coordinates if available
-        geo_res = geocode_results.get(idx)
-        if geo_res:
-            state = normalize_str(geo_res.get("admin1")) or None
-            district = normalize_str(geo_res.get("admin2")) or None
-            location = normalize_str(geo_res.get("name")) or None
-        else:
-            state = normalize_str(r.get("state")) or None
-            district = normalize_str(r.get("district")) or None
-            location = normalize_str(r.get("location")) or None
-
-        village_code = normalize_str(r.get("village_code")) or None
-        source = normalize_str(r.get("source")) or "lab_A"
-        year_val = to_int_or_none(r.get("year"))
-        lon_val = to_float_or_none(r.get("coordinates.coordinates[0]"))
-        lat_val = to_float_or_none(r.get("coordinates.coordinates[1]"))
-        ph_val = to_float_or_none(r.get("parameters.pH"))
-
-        issues: list[str] = []
-
-        if not state:
-            issues.append("state missing")
-        if not district:
-            issues.append("district missing")
-        if not location:
-            issues.append("location missing")
-
-        if lon_val is None:
-            issues.append("longitude missing/invalid")
-        elif not (-180.0 <= lon_val <= 180.0):
-            issues.append("longitude out of range (-180, 180)")
-            lon_val = None
-
-        if lat_val is None:
-            issues.append("latitude missing/invalid")
-        elif not (-90.0 <= lat_val <= 90.0):
-            issues.append("latitude out of range (-90, 90)")
-            lat_val = None
-
-        if year_val is None:
-            issues.append("year missing/invalid")
-        elif not (1900 <= year_val <= 2100):
-            issues.append("year out of range (1900-2100)")
-        if ph_val is None:
-            issues.append("pH missing/invalid")
-        elif not (0.0 <= ph_val <= 14.0):
-            issues.append("pH out of range (0-14)")
-
-        parameters: dict[str, Any] = {}
-        for col_name, param_key in PARAM_COLUMN_MAP.items():
-            val = to_float_or_none(r.get(col_name))
-            if val is not None:
-                parameters[param_key] = val
-
-        if (
-            not state
-            and not district
-            and not location
-            and lon_val is None
-            and lat_val is None
-            and year_val is None
-            and not parameters
-        ):
-            continue
-
-        metal_raw: dict[str, float] = {}
-        for metal in ["Fe", "Mn", "Zn", "Cu", "U", "As", "Pb", "Cd", "Cr", "Hg", "Ni"]:
-            if metal in parameters:
-                metal_raw[metal] = parameters[metal]
-
-        metals_mgL = calculation_service.convert_units_for_metals(metal_raw)
-
-        standards: dict[str, Any] = {}
-        if metals_mgL:
-            # WHO
-            ci_who = calculation_service.calc_ci(metals_mgL, calculation_service.WHO_LIMITS_METALS)
-            standards["WHO"] = {
-                "ci": ci_who,
-                "ehci": calculation_service.calc_ehci(ci_who),
-                "hei": calculation_service.calc_hei(ci_who),
-                "pli": calculation_service.calc_pli(ci_who),
-                "hmpi": calculation_service.calc_hmpi(metals_mgL, calculation_service.WHO_LIMITS_METALS),
-                "hi": calculation_service.calc_hi(metals_mgL, RFD),
-            }
-
-            # BIS
-            ci_bis = calculation_service.calc_ci(metals_mgL, calculation_service.BIS_LIMITS_METALS)
-            standards["BIS"] = {
-                "ci": ci_bis,
-                "ehci": calculation_service.calc_ehci(ci_bis),
-                "hei": calculation_service.calc_hei(ci_bis),
-                "pli": calculation_service.calc_pli(ci_bis),
-                "hmpi": calculation_service.calc_hmpi(metals_mgL, calculation_service.BIS_LIMITS_METALS),
-                "hi": calculation_service.calc_hi(metals_mgL, RFD),
-            }
-
-            if standards["WHO"]["hmpi"] is not None:
-                parameters["hmpi"] = standards["WHO"]["hmpi"]
-
-        # ── Document Reduced Parameter Set ────────────────────────
-        missing_metals = calculation_service.get_missing_metals(metals_mgL, calculation_service.BIS_LIMITS_METALS)
-        if missing_metals:
-            issues.append(
-                f"Historical index was computed with a reduced parameter set (Missing: {', '.join(missing_metals)})."
-            )
-
-        sample = models.WaterSample(
-            village_code=village_code,
-            state=state,
-            district=district,
-            location=location,
-            year=year_val,
-            source=source,
-            latitude=lat_val,
-            longitude=lon_val,
-            fe=parameters.get("Fe"),
-            as_=parameters.get("As"),
-            u=parameters.get("U"),
-            hmpi_bis=standards.get("BIS", {}).get("hmpi") if standards.get("BIS") else None,
-            hei_bis=standards.get("BIS", {}).get("hei") if standards.get("BIS") else None,
-            pli_bis=standards.get("BIS", {}).get("pli") if standards.get("BIS") else None,
-            parameters_json=json.dumps(parameters),
-            standards_json=json.dumps(standards),
-            validation_issues_json=json.dumps(issues),
-        )
-
-        samples_list.append(sample)
-        samples_created += 1
-
-    db.bulk_save_objects(samples_list)
-    db.commit()
-
-    # Invalidate caches after successful upload
-    invalidate_cache()
+    # Numeric columns are memory-mapped and read one batch at a time, so peak
+    # memory is bounded by INGEST_BATCH_SIZE rather than the file size.
+    store = upload_store.open_store(store_path)
+    rows_processed, counts, geo_stats = _ingest_batches(
+        db, store.iter_chunks(settings.INGEST_BATCH_SIZE), store.num_rows
+    )
+    if geo_stats.deferred and job_queue.runs_inline():
+        background_tasks.add_task(job_queue.run_queued)
 
-    # Try to clean up the file
-    try:
-        os.remove(filepath)
-    except Exception as e:
-        logger.warning(f"Could not remove temporary file {filepath}: {e}")
+    # Clean up the parsed upload
+    upload_store.remove(store_path)
 
     return CalculateResponse(
         message="Dataset INSERTED successfully with computed WHO/BIS indices.",
-        rows_processed=len(rows),
-        rows_inserted=samples_created,
+        rows_processed=rows_processed,
+        rows_inserted=counts.inserted,
+        rows_updated=counts.updated,
+        rows_skipped=counts.skipped,
+        rows_duplicate=counts.duplicates,
     )
@@ -43,6 +43,8 @@ class SampleResponse(BaseModel):
     parameters: dict[str, Any] = Field(default_factory=dict)
     standards: dict[str, Any] = Field(default_factory=dict)
     validation_issues: list[str] = Field(default_factory=list)
+    # True until background geocoding has filled in state/district/location.
+    geo_pending: bool = False
 
     created_at: datetime | None = None
     updated_at: datetime | None = None
@@ -64,6 +66,9 @@ class CalculateResponse(BaseModel):
     message: str
     rows_processed: int
     rows_inserted: int
+    rows_updated: int = 0
+    rows_skipped: int = 0
+    rows_duplicate: int = 0
 
 
 class MapPointResponse(BaseModel):
@@ -151,11 +156,15 @@ class TaskStatusResponse(BaseModel):
     """Full status of a background task, returned by the polling endpoint."""
 
     task_id: str
-    status: str  # pending | processing | completed | failed
+    status: str  # pending | processing | completed | failed | cancelled
     progress: int = 0
+    stage: str | None = None
     result: dict[str, Any] | None = None
     error_message: str | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
+    # Only while the task waits for a worker: 1 = next to start.
+    queue_position: int | None = None
+    estimated_start_at: datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -1,21 +1,36 @@
 # app/services/calculation_service.py
 """
 Service layer wrapping calculator functions based on CGWB standard.
+
+Every ``calc_*`` function has a per-row (dict) form and a ``*_batch``
+form that works on ``(n_rows, len(METAL_ORDER))`` matrices for whole
+files.  The batch forms accumulate in the same order as the dict forms,
+so both produce bit-identical values; PLI has a single log-space
+implementation (``calc_pli_batch``) that ``calc_pli`` delegates to.
 """
 
 from __future__ import annotations
 
 import logging
-from collections.abc import Mapping
+import math
+from collections.abc import Iterable, Mapping
 from typing import Any
 
+import numpy as np
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
-from app.standards import STANDARDS
+from app.standards import METAL_ORDER, RFD, StandardProfile, get_profile
+
+# Constants for Heavy Metals taken from the compiled standard profiles
+WHO_LIMITS_METALS = get_profile("WHO").limits
+BIS_LIMITS_METALS = get_profile("BIS").limits
 
-# Constants for Heavy Metals dynamically loaded from standards
-WHO_LIMITS_METALS = {k: v["Si"] for k, v in STANDARDS.get("WHO", {}).items() if "Si" in v}
-BIS_LIMITS_METALS = {k: v["Si"] for k, v in STANDARDS.get("BIS", {}).items() if "Si" in v}
+
+def get_limits(standard: str) -> Mapping[str, float]:
+    """``{symbol: Si}`` for *standard*, including ones added via ``register_standard``."""
+    return get_profile(standard).limits
 
 
 def safe_div(a: float, b: float):
@@ -25,7 +40,7 @@ def safe_div(a: float, b: float):
         return None
 
 
-def calc_ci(params: dict[str, float], limits: dict[str, float]) -> dict[str, float]:
+def calc_ci(params: dict[str, float], limits: Mapping[str, float]) -> dict[str, float]:
     ci: dict[str, float] = {}
     for metal, std in limits.items():
         if metal in params and params[metal] is not None:
@@ -48,18 +63,11 @@ def calc_hei(ci: dict[str, float]):
 def calc_pli(ci: dict[str, float]):
     if not ci:
         return None
-    vals = [v for v in ci.values() if v >= 0]
-    if not vals:
-        return None
-    product = 1.0
-    for v in vals:
-        product *= v
-    if product == 0:
-        return 0.0
-    return product ** (1.0 / len(vals))
+    pli = calc_pli_batch(np.array([list(ci.values())], dtype=np.float64))[0]
+    return None if math.isnan(pli) else float(pli)
 
 
-def calc_hmpi(params: dict[str, float], limits: dict[str, float]):
+def calc_hmpi(params: dict[str, float], limits: Mapping[str, float]):
     numerator = 0.0
     denominator = 0.0
     for metal, std in limits.items():
@@ -84,22 +92,24 @@ def calc_hi(params: dict[str, float], rfd: dict[str, float]):
     return total if count else None
 
 
+TRACE_METALS_IN_PPB: tuple[str, ...] = ("As", "U", "Pb", "Cd", "Cr", "Hg", "Ni")
+
+
 def convert_units_for_metals(params: dict[str, Any]) -> dict[str, Any]:
     """
     Convert ppb → mg/L for trace metals commonly reported in ppb.
     Fe, Mn, Zn, Cu are assumed to be mg/L (ppm) and kept as is.
     """
     converted = dict(params)
-    trace_metals_in_ppb = ["As", "U", "Pb", "Cd", "Cr", "Hg", "Ni"]
 
-    for metal in trace_metals_in_ppb:
+    for metal in TRACE_METALS_IN_PPB:
         if metal in converted and converted[metal] is not None:
             converted[metal] = converted[metal] / 1000.0  # ppb → mg/L
 
     return converted
 
 
-def get_missing_metals(params: dict[str, Any], limits: dict[str, float]) -> list[str]:
+def get_missing_metals(params: dict[str, Any], limits: Mapping[str, float]) -> list[str]:
     """Return a list of expected metals that are missing or None in the params."""
     missing = []
     for metal in limits.keys():
@@ -108,78 +118,204 @@ def get_missing_metals(params: dict[str, Any], limits: dict[str, float]) -> list
     return missing
 
 
-def predict_hotspots(rows: list[Mapping]) -> list[dict[str, Any]]:
-    """
-    Compute per-location pollution risk predictions from uploaded data.
+# ── Batch (columnar) forms ─────────────────────────────────────────────
+# Matrices are (n_rows, len(METAL_ORDER)); NaN means "not measured" or
+# "not computable" and maps to None wherever the dict forms return None.
+_PPB_MASK = np.array([metal in TRACE_METALS_IN_PPB for metal in METAL_ORDER])
+_METAL_INDEX = {metal: j for j, metal in enumerate(METAL_ORDER)}
 
-    For each row, extracts lat/lon and metal concentrations (Fe, As, U),
-    computes HMPI against BIS standards, and classifies the risk level.
 
-    Returns a list of dicts matching the ``PredictionResult`` schema:
-    ``{latitude, longitude, risk_score, risk_category}``.
+def convert_units_batch(raw: np.ndarray) -> np.ndarray:
+    """Column-wise ``convert_units_for_metals`` (ppb → mg/L for trace metals)."""
+    return np.where(_PPB_MASK, raw / 1000.0, raw)
+
+
+def calc_ci_batch(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    """CI matrix: Oi / Si, NaN where the metal is missing or has no usable limit."""
+    return conc / profile.si
+
+
+def _ordered_sum(matrix: np.ndarray, columns: range | list[int]) -> tuple[np.ndarray, np.ndarray]:
     """
-    results: list[dict[str, Any]] = []
+    Left-to-right NaN-skipping sum over *columns*, plus the count of
+    non-NaN terms — the same accumulation order as ``sum()`` over a dict.
+    """
+    total = np.zeros(matrix.shape[0])
+    count = np.zeros(matrix.shape[0], dtype=np.int64)
+    for j in columns:
+        col = matrix[:, j]
+        present = ~np.isnan(col)
+        total = np.where(present, total + col, total)
+        count += present
+    return total, count
 
-    for row in rows:
-        # ── Extract coordinates ────────────────────────────────────
-        raw_lon = row.get("coordinates.coordinates[0]")
-        raw_lat = row.get("coordinates.coordinates[1]")
 
-        if raw_lat is None or raw_lon is None:
-            continue
+def _compensated_sum(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise NaN-skipping sum with Neumaier compensation, plus the count of
+    non-NaN terms — bit-for-bit what the builtin ``sum()`` returns for the
+    same floats in the same order.
+    """
+    total = np.zeros(matrix.shape[0])
+    comp = np.zeros(matrix.shape[0])
+    count = np.zeros(matrix.shape[0], dtype=np.int64)
+    for j in range(matrix.shape[1]):
+        col = matrix[:, j]
+        present = ~np.isnan(col)
+        x = np.where(present, col, 0.0)
+        with np.errstate(invalid="ignore"):
+            t = total + x
+            c = np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+        comp = np.where(present, comp + c, comp)
+        total = np.where(present, t, total)
+        count += present
+    with np.errstate(invalid="ignore"):
+        return np.where((comp != 0) & np.isfinite(comp), total + comp, total), count
+
+
+def calc_hei_batch(ci: np.ndarray) -> np.ndarray:
+    total, count = _compensated_sum(ci)
+    return np.where(count > 0, total, np.nan)
+
+
+def calc_pli_batch(ci: np.ndarray) -> np.ndarray:
+    """
+    Row-wise geometric mean of the non-negative CI values, taken in log
+    space — exp(mean(log ci)) — so a row of extreme ratios can neither
+    underflow to 0 nor overflow to inf the way a running product does.
 
-        try:
-            lat = float(raw_lat)
-            lon = float(raw_lon)
-        except ValueError, TypeError:
-            logger.warning("Skipping row with invalid coordinates: lat=%s, lon=%s", raw_lat, raw_lon)
+    NaN and negative entries are masked out; a row with nothing left is
+    NaN (``calc_pli`` → None) and a row containing a zero CI is 0.0.
+    """
+    use = ci >= 0  # False for NaN
+    positive = use & (ci > 0)
+    count = use.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log(np.where(positive, ci, 1.0))
+    # Left-to-right over columns so a 1-row call from calc_pli and the
+    # same row inside a whole file sum their logs in the same order.
+    log_sum = np.zeros(ci.shape[0])
+    for j in range(ci.shape[1]):
+        log_sum += logs[:, j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pli = np.exp(log_sum / count)
+    has_zero = (ci == 0).any(axis=1)
+    return np.where(count == 0, np.nan, np.where(has_zero, 0.0, pli))
+
+
+def calc_hmpi_batch(conc: np.ndarray, profile: StandardProfile) -> np.ndarray:
+    numerator = np.zeros(conc.shape[0])
+    denominator = np.zeros(conc.shape[0])
+    for j in range(conc.shape[1]):
+        std = profile.si[j]
+        if np.isnan(std):
             continue
+        col = conc[:, j]
+        present = ~np.isnan(col)
+        W = 1.0 / std
+        numerator = np.where(present, numerator + W * ((col / std) * 100.0), numerator)
+        denominator = np.where(present, denominator + W, denominator)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator == 0, np.nan, numerator / denominator)
 
-        # ── Extract metal concentrations ───────────────────────────
-        metal_raw: dict[str, float] = {}
-        for key in ("Fe", "As", "U"):
-            param_key = f"parameters.{key}"
-            val = row.get(param_key)
-            if val is not None:
-                try:
-                    metal_raw[key] = float(val)
-                except ValueError, TypeError:
-                    pass
-
-        metals_mgL = convert_units_for_metals(metal_raw)
-
-        if not metals_mgL:
-            results.append(
-                {
-                    "latitude": lat,
-                    "longitude": lon,
-                    "risk_score": 0.0,
-                    "risk_category": "Unknown",
-                }
-            )
-            continue
 
-        # ── Compute risk score via HMPI ────────────────────────────
-        hmpi = calc_hmpi(metals_mgL, BIS_LIMITS_METALS)
-        risk_score = round(hmpi, 2) if hmpi is not None else 0.0
+def calc_hi_batch(conc: np.ndarray, rfd: Mapping[str, float] = RFD) -> np.ndarray:
+    columns = [_METAL_INDEX[metal] for metal, R in rfd.items() if R and metal in _METAL_INDEX]
+    scaled = conc / np.array([rfd.get(metal) or np.nan for metal in METAL_ORDER])
+    total, count = _ordered_sum(scaled, columns)
+    return np.where(count > 0, total, np.nan)
 
-        if risk_score < 25:
-            category = "Low"
-        elif risk_score < 50:
-            category = "Moderate"
-        elif risk_score < 75:
-            category = "High"
-        else:
-            category = "Critical"
 
+def score_standards_batch(
+    conc: np.ndarray, standards: tuple[str, ...] = ("WHO", "BIS")
+) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Score a mg/L metal matrix against each of *standards* in one pass.
+
+    Returns ``{standard: {"ci", "hei", "pli", "hmpi", "hi"}}``; ``ci`` is a
+    matrix, the rest are per-row vectors.  EHCI is left to ``calc_ehci`` on
+    the per-row CI dicts: it is only ever emitted as a dict, and the builtin
+    float pow it uses does not always round like a vectorized square.
+    """
+    hi = calc_hi_batch(conc)
+    scored: dict[str, dict[str, np.ndarray]] = {}
+    for name in standards:
+        profile = get_profile(name)
+        ci = calc_ci_batch(conc, profile)
+        scored[name] = {
+            "ci": ci,
+            "hei": calc_hei_batch(ci),
+            "pli": calc_pli_batch(ci),
+            "hmpi": calc_hmpi_batch(conc, profile),
+            "hi": hi,
+        }
+    return scored
+
+
+def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+    """*column* as float64, NaN where absent, blank or unparseable."""
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+_HOTSPOT_METALS = ("Fe", "As", "U")
+
+
+def predict_hotspots(data: pd.DataFrame | Iterable[Mapping]) -> list[dict[str, Any]]:
+    """
+    Compute per-location pollution risk predictions from uploaded data.
+
+    *data* is a parsed upload: the DataFrame from ``file_parser``, or (the
+    older form) one dict per row.  Rows need numeric lat/lon; their metal
+    concentrations (Fe, As, U) are scored by HMPI against BIS standards in
+    one pass over the columns, and the score is classified into a risk level.
+
+    Returns a list of dicts matching the ``PredictionResult`` schema:
+    ``{latitude, longitude, risk_score, risk_category}``.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(list(data))
+
+    # ── Coordinates ────────────────────────────────────────────────────
+    lon = _numeric(df, "coordinates.coordinates[0]")
+    lat = _numeric(df, "coordinates.coordinates[1]")
+    located = ~np.isnan(lat) & ~np.isnan(lon)
+    if not located.all():
+        logger.info("Skipping %d rows without valid coordinates", int((~located).sum()))
+
+    # ── Metal concentrations → HMPI ────────────────────────────────────
+    raw = np.full((len(df), len(METAL_ORDER)), np.nan)
+    for metal in _HOTSPOT_METALS:
+        raw[:, _METAL_INDEX[metal]] = _numeric(df, f"parameters.{metal}")
+    conc = convert_units_batch(raw)
+    has_metals = (~np.isnan(conc)).any(axis=1)
+    hmpi = calc_hmpi_batch(conc, get_profile("BIS"))
+
+    results: list[dict[str, Any]] = []
+    for row_lat, row_lon, measured, score in zip(
+        lat[located].tolist(), lon[located].tolist(), has_metals[located].tolist(), hmpi[located].tolist(), strict=True
+    ):
+        if not measured:
+            category = "Unknown"
+            risk_score = 0.0
+        else:
+            risk_score = 0.0 if math.isnan(score) else round(score, 2)
+            if risk_score < 25:
+                category = "Low"
+            elif risk_score < 50:
+                category = "Moderate"
+            elif risk_score < 75:
+                category = "High"
+            else:
+                category = "Critical"
         results.append(
             {
-                "latitude": lat,
-                "longitude": lon,
+                "latitude": row_lat,
+                "longitude": row_lon,
                 "risk_score": risk_score,
                 "risk_category": category,
             }
         )
 
-    logger.info("Predicted %d hotspots from %d rows", len(results), len(rows))
+    logger.info("Predicted %d hotspots from %d rows", len(results), len(df))
     return results
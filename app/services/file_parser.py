@@ -9,13 +9,24 @@ reusable module.
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import importlib.util
 import io
 import logging
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from typing import NamedTuple
 
 import pandas as pd
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException, Request, UploadFile
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.services import upload_store
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +88,15 @@ _COORDINATE_COLUMNS: set[str] = {
 }
 _PARAMETER_COLUMNS: set[str] = {c for c in REQUIRED_COLUMNS if c.startswith("parameters.")}
 
+# Declared types of the REQUIRED_COLUMNS in a CSV upload: measurements,
+# coordinates and year as float64, the repetitive identifiers as
+# categories.  Other columns are left to inference.
+_CSV_FLOAT_COLUMNS: set[str] = _PARAMETER_COLUMNS | _COORDINATE_COLUMNS | {"year"}
+_CSV_CATEGORY_COLUMNS: set[str] = _LOCATION_COLUMNS | {"source"}
+# The pyarrow reader streams blocks of bytes, not rows; this turns
+# CSV_CHUNK_ROWS into a block size (a CGWB row is ~150-250 bytes).
+_ARROW_BYTES_PER_ROW = 256
+
 _CSV_TYPES = {"text/csv"}
 _JSON_TYPES = {"application/json"}
 _PDF_TYPES = {"application/pdf"}
@@ -86,44 +106,264 @@ _EXCEL_TYPES = {
 }
 
 ALLOWED_CONTENT_TYPES = _CSV_TYPES | _JSON_TYPES | _PDF_TYPES | _EXCEL_TYPES
+_ALLOWED_EXTENSIONS = (".csv", ".json", ".xls", ".xlsx", ".pdf")
 
+# Slack on top of MAX_UPLOAD_SIZE_BYTES for multipart boundaries and part
+# headers when rejecting on the declared Content-Length alone.
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
-async def parse_upload(
+
+def check_upload_type(filename: str, content_type: str, allowed_types: set[str] | None = None) -> None:
+    """Raise 415 unless the content type or the file extension is one we can parse."""
+    if allowed_types is None:
+        allowed_types = ALLOWED_CONTENT_TYPES
+    if content_type not in allowed_types and not filename.endswith(_ALLOWED_EXTENSIONS):
+        raise HTTPException(
+            status_code=415,
+            detail="Unsupported file type. Please upload a CSV, JSON, PDF, or Excel file.",
+        )
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum allowed size is {settings.MAX_UPLOAD_SIZE_BYTES} bytes.",
+    )
+
+
+async def parse_upload_frame(
     file: UploadFile,
     *,
     allowed_types: set[str] | None = None,
     validate_columns: bool = True,
-) -> list[dict]:
+) -> pd.DataFrame:
     """
-    Read an ``UploadFile`` into a validated list of dicts.
+    Read an ``UploadFile`` into a validated DataFrame.
     Raises ``HTTPException`` on any validation or parse error.
     """
-    if allowed_types is None:
-        allowed_types = ALLOWED_CONTENT_TYPES
-
-    content_type = file.content_type or ""
-
     filename = file.filename or ""
-    if content_type not in allowed_types and not filename.endswith((".csv", ".json", ".xls", ".xlsx", ".pdf")):
-        raise HTTPException(
-            status_code=415,
-            detail="Unsupported file type. Please upload a CSV, JSON, PDF, or Excel file.",
-        )
-
-    contents = await file.read()
-    if len(contents) > settings.MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum allowed size is {settings.MAX_UPLOAD_SIZE_BYTES} bytes.",
-        )
+    check_upload_type(filename, file.content_type or "", allowed_types)
 
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+    os.close(fd)
     try:
-        return await asyncio.to_thread(parse_bytes_direct, contents, filename, validate_columns)
+        await spool_upload_file(file, path)
+        # Parsed in a resource-capped child process, off the event loop.
+        from app.services import parse_sandbox
+
+        return await asyncio.to_thread(parse_sandbox.parse_file_frame, path, filename, validate_columns)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        os.remove(path)
+
+
+async def parse_upload(
+    file: UploadFile,
+    *,
+    allowed_types: set[str] | None = None,
+    validate_columns: bool = True,
+) -> list[dict]:
+    """Like ``parse_upload_frame``, as one dict per row (NaN → None)."""
+    df = await parse_upload_frame(file, allowed_types=allowed_types, validate_columns=validate_columns)
+    return _frame_to_rows(df)
+
+
+# ── Streaming uploads to disk ──────────────────────────────────────────
+# Uploads never sit in memory whole: bytes are buffered up to
+# UPLOAD_CHUNK_SIZE_BYTES, written out off the event loop, and the size
+# limit is enforced as they arrive, so an oversized upload is rejected
+# after MAX_UPLOAD_SIZE_BYTES rather than after it has been read in full.
+
+
+class SpooledUpload(NamedTuple):
+    """An uploaded file that has been streamed to *path*."""
+
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+
+
+class _FileSink:
+    """Size-capped, chunk-buffered writer for one upload; hashes the bytes as they pass."""
+
+    def __init__(self, path: str):
+        self._fh = open(path, "wb")
+        self._buffer = bytearray()
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise _too_large()
+        self._digest.update(data)
+        self._buffer += data
+        if len(self._buffer) >= settings.UPLOAD_CHUNK_SIZE_BYTES:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await run_in_threadpool(self._fh.write, data)
+
+    def close(self) -> None:
+        self._fh.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+
+async def spool_upload_file(file: UploadFile, path: str) -> int:
+    """Copy an ``UploadFile`` to *path* chunk by chunk; returns its size."""
+    sink = _FileSink(path)
+    try:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE_BYTES):
+            await sink.write(chunk)
+        await sink.flush()
+    finally:
+        sink.close()
+    return sink.size
+
+
+class _MultipartFileReader:
+    """
+    ``python_multipart`` callbacks that pick out the first file part named
+    *field_name*; its bytes are collected in ``pending`` for the caller to
+    drain after every ``parser.write``.  Other parts are ignored.
+    """
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.found = False
+        self.filename = ""
+        self.content_type = ""
+        self.pending: list[bytes] = []
+        self._in_file = False
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if self.found or name != self.field_name or b"filename" not in options:
+            return
+        self.found = self._in_file = True
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self._in_file = False
+
+    def callbacks(self) -> dict[str, Callable]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+
+async def spool_multipart_upload(
+    request: Request,
+    path: str,
+    *,
+    field_name: str = "file",
+    allowed_types: set[str] | None = None,
+) -> SpooledUpload:
+    """
+    Stream the *field_name* file of a ``multipart/form-data`` request body
+    straight to *path*.
+
+    The file type is checked as soon as the part headers arrive (415) and
+    the size limit while the bytes do (413); on any error *path* is removed.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.MAX_UPLOAD_SIZE_BYTES + _MULTIPART_OVERHEAD_BYTES:
+        raise _too_large()
 
+    media_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if media_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=422, detail=f"Expected a multipart/form-data body with a '{field_name}' field.")
 
-from collections.abc import Callable
+    reader = _MultipartFileReader(field_name)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+    sink: _FileSink | None = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if reader.found and sink is None:
+                check_upload_type(reader.filename, reader.content_type, allowed_types)
+                sink = _FileSink(path)
+            for data in reader.pending:
+                await sink.write(data)
+            reader.pending.clear()
+        parser.finalize()
+        if sink is None:
+            raise HTTPException(status_code=422, detail=f"Missing '{field_name}' file in the upload.")
+        await sink.flush()
+    except BaseException as exc:
+        if sink is not None:
+            sink.close()
+            os.remove(path)
+        if isinstance(exc, MultipartParseError):
+            raise HTTPException(status_code=400, detail="Malformed multipart upload.") from exc
+        raise
+    sink.close()
+
+    return SpooledUpload(
+        path=path,
+        filename=reader.filename,
+        content_type=reader.content_type,
+        size=sink.size,
+        sha256=sink.sha256,
+    )
+
+
+# ── Parsing ────────────────────────────────────────────────────────────
+
+
+# The ``*_frame`` functions return the parsed DataFrame, whose typed
+# columns downstream stages consume directly; the ``*_direct`` ones turn
+# it into one dict per row for callers that still want records.
+
+
+def parse_bytes_frame(
+    contents: bytes,
+    filename: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> pd.DataFrame:
+    """Parse and validate raw upload bytes, returning the DataFrame itself."""
+    df = _parse_source(contents, filename, "", progress_callback=progress_callback)
+    return _validate_frame(df, filename, validate_columns)
 
 
 def parse_bytes_direct(
@@ -132,7 +372,163 @@ def parse_bytes_direct(
     validate_columns: bool = True,
     progress_callback: Callable[[int], None] | None = None,
 ) -> list[dict]:
-    df = _parse_bytes(contents, filename, "", progress_callback=progress_callback)
+    return _frame_to_rows(parse_bytes_frame(contents, filename, validate_columns, progress_callback))
+
+
+def parse_file_direct(
+    path: str,
+    filename: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> list[dict]:
+    """Like ``parse_bytes_direct``, reading the upload from *path* on disk."""
+    return _frame_to_rows(parse_file_frame(path, filename, validate_columns, progress_callback))
+
+
+def parse_file_frame(
+    path: str,
+    filename: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> pd.DataFrame:
+    """Parse and validate the upload at *path*, returning the DataFrame itself."""
+    df = _parse_source(path, filename, "", progress_callback=progress_callback)
+    return _validate_frame(df, filename, validate_columns)
+
+
+def parse_file_to_store(
+    path: str,
+    filename: str,
+    directory: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Parse and validate the upload at *path* into an ``upload_store`` at
+    *directory*; returns the row count.
+
+    A CSV goes from ``iter_csv_chunks`` to the store one chunk at a time,
+    so memory stays bounded by CSV_CHUNK_ROWS however large the file is.
+    Other formats are parsed whole, as by ``parse_file_frame``.
+    """
+    if filename.endswith(".csv"):
+        return upload_store.save_chunks(_csv_upload_chunks(path, filename, validate_columns), directory)
+    df = parse_file_frame(path, filename, validate_columns, progress_callback)
+    upload_store.save_frame(df, directory)
+    return len(df)
+
+
+def _csv_upload_chunks(path: str, filename: str, validate_columns: bool) -> Iterator[pd.DataFrame]:
+    """``iter_csv_chunks`` of the upload at *path*, with columns validated like ``parse_file_frame``."""
+    try:
+        header = pd.read_csv(path, nrows=0, encoding="utf-8")
+    except Exception as exc:
+        logger.exception("File parse error")
+        raise ValueError("Error processing file: unable to parse the uploaded data.") from exc
+    yield _validate_frame(header, filename, validate_columns)
+
+    try:
+        for chunk in iter_csv_chunks(path):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+    except Exception as exc:
+        logger.exception("File parse error")
+        raise ValueError("Error processing file: unable to parse the uploaded data.") from exc
+
+
+# ── CSV ────────────────────────────────────────────────────────────────
+
+
+def _csv_engine() -> str:
+    if settings.CSV_ENGINE != "auto":
+        return settings.CSV_ENGINE
+    return "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def _csv_input(source: bytes | str):
+    # A BytesIO over bytes shares their buffer, so nothing is decoded or copied up front.
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def _arrow_chunks(source: bytes | str, floats: list[str], categories: list[str], chunk_rows: int):
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    column_types = {name: pa.float64() for name in floats}
+    column_types.update({name: pa.dictionary(pa.int32(), pa.string()) for name in categories})
+    reader = pa_csv.open_csv(
+        source if isinstance(source, str) else pa.BufferReader(source),
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, chunk_rows * _ARROW_BYTES_PER_ROW)),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def iter_csv_chunks(source: bytes | str, chunk_rows: int | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV upload (its bytes, or a path) as frames of about *chunk_rows*
+    rows (CSV_CHUNK_ROWS), so memory is bounded by the chunk, not the file.
+
+    The REQUIRED_COLUMNS present are typed up front (see
+    ``_CSV_FLOAT_COLUMNS``) rather than inferred.  A measurement column
+    holding text ("BDL", "<0.01") cannot be read as float64; from the
+    chunk where that happens on, the float columns are inferred as before.
+    That read starts over and drops the rows already yielded, counted as
+    parsed records: line numbers would miscount around blank lines and
+    quoted line breaks.
+    """
+    chunk_rows = max(1, chunk_rows or settings.CSV_CHUNK_ROWS)
+    header = pd.read_csv(_csv_input(source), nrows=0, encoding="utf-8").columns
+    floats = [name for name in header if name.strip() in _CSV_FLOAT_COLUMNS]
+    categories = [name for name in header if name.strip() in _CSV_CATEGORY_COLUMNS]
+
+    rows_read = 0
+    try:
+        if _csv_engine() == "pyarrow":
+            chunks = _arrow_chunks(source, floats, categories, chunk_rows)
+        else:
+            dtype = {name: "float64" for name in floats} | {name: "category" for name in categories}
+            chunks = pd.read_csv(_csv_input(source), dtype=dtype, chunksize=chunk_rows, encoding="utf-8")
+        for chunk in chunks:
+            rows_read += len(chunk)
+            yield chunk
+        return
+    except ValueError:
+        logger.info("CSV has non-numeric measurements; inferring column types from row %d on", rows_read)
+
+    to_skip = rows_read
+    for chunk in pd.read_csv(
+        _csv_input(source), dtype={name: "category" for name in categories}, chunksize=chunk_rows, encoding="utf-8"
+    ):
+        if to_skip >= len(chunk):
+            to_skip -= len(chunk)
+            continue
+        yield chunk.iloc[to_skip:]
+        to_skip = 0
+
+
+def read_csv_frame(source: bytes | str) -> pd.DataFrame:
+    """A whole CSV upload as one frame, read chunk by chunk with ``iter_csv_chunks``."""
+    chunks = list(iter_csv_chunks(source))
+    if not chunks:
+        return pd.read_csv(_csv_input(source), nrows=0, encoding="utf-8")
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks with different category sets concatenate to plain objects.
+    for name in df.columns:
+        if name.strip() in _CSV_CATEGORY_COLUMNS and not isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype("category")
+    return df
+
+
+def _frame_to_rows(df: pd.DataFrame) -> list[dict]:
+    # Replace nan with None (as object: float and category columns can't hold None)
+    df = df.astype(object).where(pd.notnull(df), None)
+
+    return df.to_dict(orient="records")
+
+
+def _validate_frame(df: pd.DataFrame, filename: str, validate_columns: bool) -> pd.DataFrame:
     df.columns = df.columns.str.strip()
 
     if validate_columns:
@@ -154,10 +550,7 @@ def parse_bytes_direct(
                 ", ".join(sorted(missing)),
             )
 
-    # Replace nan with None
-    df = df.where(pd.notnull(df), None)
-
-    return df.to_dict(orient="records")
+    return df
 
 
 def _has_minimum_signal(columns: set[str]) -> bool:
@@ -166,26 +559,28 @@ def _has_minimum_signal(columns: set[str]) -> bool:
     return bool((columns & _LOCATION_COLUMNS) or (columns & _COORDINATE_COLUMNS) or (columns & _PARAMETER_COLUMNS))
 
 
-def _parse_bytes(
-    data: bytes,
+def _parse_source(
+    source: bytes | str,
     filename: str,
     content_type: str,
     progress_callback: Callable[[int], None] | None = None,
 ) -> pd.DataFrame:
+    """Parse raw upload bytes, or the upload saved at path *source*."""
+    on_disk = isinstance(source, str)
     try:
         if filename.endswith(".csv") or content_type in _CSV_TYPES:
-            return pd.read_csv(io.StringIO(data.decode("utf-8")))
+            return read_csv_frame(source)
 
         if filename.endswith(".json") or content_type in _JSON_TYPES:
-            return pd.read_json(io.StringIO(data.decode("utf-8")))
+            return pd.read_json(source if on_disk else io.StringIO(source.decode("utf-8")), encoding="utf-8")
 
         if filename.endswith(".pdf") or content_type in _PDF_TYPES:
             from app.services.pdf_parser import parse_pdf_bytes
 
-            return parse_pdf_bytes(data, filename, progress_callback=progress_callback)
+            return parse_pdf_bytes(source, filename, progress_callback=progress_callback)
 
         if filename.endswith((".xls", ".xlsx")) or content_type in _EXCEL_TYPES:
-            return pd.read_excel(io.BytesIO(data))
+            return pd.read_excel(source if on_disk else io.BytesIO(source))
 
     except Exception as exc:
         logger.exception("File parse error")
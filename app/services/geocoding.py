@@ -0,0 +1,350 @@
+# app/services/geocoding.py
+"""
+Offline reverse geocoding: coordinates → nearest populated place.
+
+The data is the GeoNames "cities1000" table bundled with the
+``reverse_geocoder`` package, restricted to GEOCODER_COUNTRIES (India by
+default).  ``reverse_geocoder`` itself parses the whole world's CSV and
+builds its KD-tree on first call, which costs seconds and a few hundred MB
+in every process that touches it.  Instead, the filtered table is
+converted once into a compact index::
+
+    data/geocoder/cities-<countries>-v<N>.npz   lat/lon arrays, place names
+                                                and an (admin1, admin2, cc) table
+
+and loaded lazily, on the first ``search`` or by ``warm_up`` in the
+background after startup, so no process pays for geocoding before it
+needs it.  Places further than GEOCODER_MAX_DISTANCE_KM from a point are
+not a match: with a one-country index, a point abroad would otherwise
+get the nearest town across the border.
+
+Uploads mostly repeat the same wells, within a file and year after year.
+``reverse_geocode`` rounds coordinates to GEOCODER_PRECISION decimals,
+looks each distinct one up once, and keeps the results in the
+``geocode_cache`` table so the next import of those wells needs no
+search at all.
+
+With GEOCODER_DEFERRED, ingest skips geocoding altogether: rows are
+stored with their uploaded place names and ``geo_pending`` set, and
+``enrich_pending`` (a queued job) fills them in afterwards, batch by
+batch, invalidating only the cached map views those rows appear in.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import invalidate_points
+from app.config import settings
+from app.services import job_queue
+from app.services.ingest_service import normalize_str
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout or the way it is built changes.
+INDEX_VERSION = 1
+
+_EARTH_RADIUS_KM = 6371.0088
+# Coordinate keys per ``IN (...)`` lookup; well under SQLite's bound-parameter limit.
+_CACHE_LOOKUP_CHUNK = 500
+_HIT_FIELDS = ("name", "admin1", "admin2", "cc")
+
+
+@dataclass
+class _Index:
+    tree: Any  # scipy.spatial.cKDTree over _unit_vectors of the places
+    names: np.ndarray  # place name per point
+    admin_ids: np.ndarray  # row of ``admins`` per point
+    admins: np.ndarray  # (n, 3): admin1, admin2, country code
+
+
+_index: _Index | None = None
+_lock = threading.Lock()
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere, so chord length orders points like great-circle distance."""
+    lat_r, lon_r = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)])
+
+
+def index_path() -> str:
+    countries = "-".join(sorted(c.upper() for c in settings.GEOCODER_COUNTRIES)) or "all"
+    return os.path.join(settings.GEOCODER_INDEX_DIR, f"cities-{countries}-v{INDEX_VERSION}.npz")
+
+
+def _build_index(path: str) -> None:
+    """Convert ``reverse_geocoder``'s bundled CSV into the index at *path*."""
+    import reverse_geocoder
+
+    source = os.path.join(os.path.dirname(reverse_geocoder.__file__), "rg_cities1000.csv")
+    df = pd.read_csv(source, dtype={"name": str, "admin1": str, "admin2": str, "cc": str}, keep_default_na=False)
+    df["cc"] = df["cc"].str.strip()
+    if settings.GEOCODER_COUNTRIES:
+        df = df[df["cc"].isin([c.upper() for c in settings.GEOCODER_COUNTRIES])]
+    admins, admin_ids = np.unique(df[["admin1", "admin2", "cc"]].to_numpy(dtype=str), axis=0, return_inverse=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp,
+        lat=df["lat"].to_numpy(dtype=np.float64),
+        lon=df["lon"].to_numpy(dtype=np.float64),
+        names=df["name"].to_numpy(dtype=str),
+        admin_ids=admin_ids.reshape(-1).astype(np.int32),
+        admins=admins,
+    )
+    os.replace(tmp, path)
+    logger.info("[BREADCRUMB] Built geocoder index %s (%d places)", path, len(df))
+
+
+def _load_index() -> _Index:
+    global _index
+    with _lock:
+        if _index is None:
+            from scipy.spatial import cKDTree
+
+            path = index_path()
+            if not os.path.exists(path):
+                _build_index(path)
+            with np.load(path) as data:
+                _index = _Index(
+                    tree=cKDTree(_unit_vectors(data["lat"], data["lon"])),
+                    names=data["names"],
+                    admin_ids=data["admin_ids"],
+                    admins=data["admins"],
+                )
+            logger.info("Geocoder index loaded (%d places)", len(_index.names))
+        return _index
+
+
+def warm_up() -> None:
+    """Load the index in a background thread, so the first upload doesn't wait for it."""
+
+    def load() -> None:
+        try:
+            _load_index()
+        except Exception:
+            logger.exception("Geocoder warm-up failed; the index will be loaded on first use")
+
+    threading.Thread(target=load, name="geocoder-warm-up", daemon=True).start()
+
+
+def search(lat: np.ndarray, lon: np.ndarray) -> list[dict[str, Any] | None]:
+    """
+    Nearest place to each (lat, lon) pair, as ``reverse_geocoder`` hits
+    (``name``, ``admin1``, ``admin2``, ``cc``), or None where no place lies
+    within GEOCODER_MAX_DISTANCE_KM.
+    """
+    if len(lat) == 0:
+        return []
+    index = _load_index()
+    bound = np.inf
+    if settings.GEOCODER_MAX_DISTANCE_KM > 0:
+        # Chord length on the unit sphere for that great-circle distance.
+        bound = 2 * np.sin(min(settings.GEOCODER_MAX_DISTANCE_KM / _EARTH_RADIUS_KM, np.pi) / 2)
+    _, nearest = index.tree.query(_unit_vectors(np.asarray(lat), np.asarray(lon)), k=1, distance_upper_bound=bound)
+
+    hits: list[dict[str, Any] | None] = []
+    for i in nearest.tolist():
+        if i >= len(index.names):
+            hits.append(None)
+            continue
+        admin1, admin2, cc = index.admins[index.admin_ids[i]].tolist()
+        hits.append({"name": str(index.names[i]), "admin1": admin1, "admin2": admin2, "cc": cc})
+    return hits
+
+
+class GeocodeStats(NamedTuple):
+    """What ``reverse_geocode`` did for one batch of rows."""
+
+    rows: int = 0  # rows with coordinates to geocode
+    coordinates: int = 0  # distinct rounded coordinates among them
+    cache_hits: int = 0  # coordinates answered by the geocode_cache table
+    deferred: int = 0  # rows stored geo_pending for enrich_pending instead
+
+
+def cache_scope() -> str:
+    """Identifies the index and settings a cached result depends on."""
+    index_name = os.path.splitext(os.path.basename(index_path()))[0]
+    return f"{index_name}:{settings.GEOCODER_MAX_DISTANCE_KM:g}km:{settings.GEOCODER_PRECISION}"
+
+
+def _cached_hits(db: Session, scope: str, keys: list[tuple[int, int]]) -> dict[tuple[int, int], dict[str, Any] | None]:
+    table = models.GeocodeCache.__table__
+    wanted = set(keys)
+    lat_keys = sorted({lat_key for lat_key, _ in keys})
+    cached: dict[tuple[int, int], dict[str, Any] | None] = {}
+    for start in range(0, len(lat_keys), _CACHE_LOOKUP_CHUNK):
+        chunk = lat_keys[start : start + _CACHE_LOOKUP_CHUNK]
+        rows = db.execute(
+            select(table.c.lat_key, table.c.lon_key, *(table.c[f] for f in _HIT_FIELDS)).where(
+                table.c.scope == scope, table.c.lat_key.in_(chunk)
+            )
+        ).all()
+        for lat_key, lon_key, *fields in rows:
+            if (lat_key, lon_key) in wanted:
+                cached[lat_key, lon_key] = dict(zip(_HIT_FIELDS, fields, strict=True)) if fields[-1] else None
+    return cached
+
+
+def _store_hits(db: Session, scope: str, hits: dict[tuple[int, int], dict[str, Any] | None]) -> None:
+    """Add *hits* to geocode_cache; keys a concurrent import stored meanwhile are left alone."""
+    table = models.GeocodeCache.__table__
+    rows = [
+        {"scope": scope, "lat_key": lat_key, "lon_key": lon_key, **(hit or dict.fromkeys(_HIT_FIELDS))}
+        for (lat_key, lon_key), hit in hits.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.execute(insert(table), rows)
+        return
+    db.execute(dialect_insert(table).on_conflict_do_nothing(), rows)
+
+
+def reverse_geocode(db: Session, lat: np.ndarray, lon: np.ndarray) -> tuple[list[dict[str, Any] | None], GeocodeStats]:
+    """
+    ``search`` for many rows at once: each distinct coordinate (rounded to
+    GEOCODER_PRECISION decimals) is read from geocode_cache or searched
+    once, and new results are added to the cache in *db*'s transaction.
+    """
+    if len(lat) == 0:
+        return [], GeocodeStats()
+    scale = 10.0**settings.GEOCODER_PRECISION
+    keys = np.column_stack([np.round(np.asarray(lat) * scale), np.round(np.asarray(lon) * scale)]).astype(np.int64)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    unique_keys = [(lat_key, lon_key) for lat_key, lon_key in unique.tolist()]
+
+    scope = cache_scope()
+    known = _cached_hits(db, scope, unique_keys) if settings.GEOCODER_CACHE_ENABLED else {}
+    missing = [key for key in unique_keys if key not in known]
+    if missing:
+        coords = np.array(missing, dtype=np.float64) / scale
+        found = dict(zip(missing, search(coords[:, 0], coords[:, 1]), strict=True))
+        if settings.GEOCODER_CACHE_ENABLED:
+            _store_hits(db, scope, found)
+        known.update(found)
+
+    hits = [known[key] for key in unique_keys]
+    stats = GeocodeStats(rows=len(keys), coordinates=len(unique_keys), cache_hits=len(unique_keys) - len(missing))
+    return [hits[i] for i in inverse.reshape(-1).tolist()], stats
+
+
+# ── Deferred enrichment ────────────────────────────────────────────────
+
+ENRICH_HANDLER = "app.services.geocoding:enrich_pending"
+_PLACE_FIELDS = ("state", "district", "location")
+_PLACE_ISSUES = {f"{field} missing" for field in _PLACE_FIELDS}
+
+
+def enqueue_enrichment(db: Session) -> str:
+    """
+    Queue an ``enrich_pending`` job unless one is already waiting (it will
+    pick up every pending row); the caller commits.  Returns the job id.
+    """
+    queued = db.scalar(
+        select(models.Job.id).where(models.Job.handler == ENRICH_HANDLER, models.Job.status == "queued").limit(1)
+    )
+    return queued or job_queue.enqueue(db, ENRICH_HANDLER, [])
+
+
+def _enriched(row: Any, hit: dict[str, Any] | None) -> tuple[tuple[str | None, ...], str]:
+    """``((state, district, location), validation_issues_json)`` for one pending sample."""
+    place = (row.state, row.district, row.location)
+    if hit is not None:
+        place = tuple(normalize_str(hit.get(key)) or None for key in ("admin1", "admin2", "name"))
+    # The place issues lead the list, as build_sample_records writes them.
+    issues = [issue for issue in json.loads(row.validation_issues_json or "[]") if issue not in _PLACE_ISSUES]
+    issues = [f"{field} missing" for field, value in zip(_PLACE_FIELDS, place, strict=True) if not value] + issues
+    return place, json.dumps(issues)
+
+
+def enrich_pending() -> None:
+    """
+    Job handler: reverse-geocode every ``geo_pending`` sample, committing
+    GEOCODER_ENRICH_BATCH_SIZE rows at a time.  Rows with no place in range
+    keep their uploaded names; either way they leave the pending state.
+    """
+    table = models.WaterSample.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("sample_id"))
+        .values(
+            **{field: bindparam(f"new_{field}") for field in _PLACE_FIELDS},
+            validation_issues_json=bindparam("new_issues"),
+            geo_pending=False,
+        )
+    )
+    db = models.SessionLocal()
+    try:
+        done = 0
+        while True:
+            rows = db.execute(
+                select(
+                    table.c.id,
+                    table.c.latitude,
+                    table.c.longitude,
+                    *(table.c[field] for field in _PLACE_FIELDS),
+                    table.c.validation_issues_json,
+                )
+                .where(table.c.geo_pending.is_(True))
+                .order_by(table.c.id)
+                .limit(max(1, settings.GEOCODER_ENRICH_BATCH_SIZE))
+            ).all()
+            if not rows:
+                break
+            lat = np.array([np.nan if r.latitude is None else r.latitude for r in rows], dtype=np.float64)
+            lon = np.array([np.nan if r.longitude is None else r.longitude for r in rows], dtype=np.float64)
+            located = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+            hits: list[dict[str, Any] | None] = [None] * len(rows)
+            found, stats = reverse_geocode(db, lat[located], lon[located])
+            for i, hit in zip(located.tolist(), found, strict=True):
+                hits[i] = hit
+
+            params = []
+            renamed = []  # positions of samples whose place names changed
+            summary_changed = False
+            for i, (row, hit) in enumerate(zip(rows, hits, strict=True)):
+                place, issues = _enriched(row, hit)
+                params.append(
+                    {
+                        "sample_id": row.id,
+                        **{f"new_{field}": value for field, value in zip(_PLACE_FIELDS, place, strict=True)},
+                        "new_issues": issues,
+                    }
+                )
+                if place != (row.state, row.district, row.location):
+                    renamed.append(i)
+                # The indices summary counts samples with issues, so it only
+                # goes stale when one moves between "[]" and a non-empty list.
+                summary_changed |= (row.validation_issues_json == "[]") != (issues == "[]")
+            db.execute(stmt, params)
+            db.commit()
+            if renamed or summary_changed:
+                invalidate_points(lat[renamed], lon[renamed], summary_changed=summary_changed)
+
+            done += len(rows)
+            logger.info(
+                "[BREADCRUMB] Geocoded %d pending samples (%d distinct coordinates, %d cache hits)",
+                done,
+                stats.coordinates,
+                stats.cache_hits,
+            )
+    finally:
+        db.close()
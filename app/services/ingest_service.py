@@ -0,0 +1,392 @@
+"""
+Columnar ingest: turn a parsed upload into ``WaterSample`` records.
+
+Type coercion, validation and WHO/BIS scoring run column-wise over the
+whole frame; per-row dicts and JSON strings are only built at the very
+end, once every value is already known.
+
+Every record carries a ``row_key`` fingerprint of the sample's natural
+key, so re-importing overlapping data updates or skips the rows already
+stored instead of duplicating them (see ``upsert_sample_records``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import calculation_service
+from app.standards import METAL_ORDER
+
+logger = logging.getLogger(__name__)
+
+PARAM_COLUMN_MAP = {
+    "parameters.pH": "pH",
+    "parameters.EC": "EC",
+    "parameters.CO3": "CO3",
+    "parameters.HCO3": "HCO3",
+    "parameters.Cl": "Cl",
+    "parameters.F": "F",
+    "parameters.SO4": "SO4",
+    "parameters.NO3": "NO3",
+    "parameters.PO4": "PO4",
+    "parameters.total_hardness": "total_hardness",
+    "parameters.Ca": "Ca",
+    "parameters.Mg": "Mg",
+    "parameters.Na": "Na",
+    "parameters.K": "K",
+    "parameters.TDS": "TDS",
+    "parameters.SiO2": "SiO2",
+    "parameters.Fe": "Fe",
+    "parameters.Mn": "Mn",
+    "parameters.Zn": "Zn",
+    "parameters.Cu": "Cu",
+    "parameters.U": "U",
+    "parameters.As": "As",
+    "parameters.Pb": "Pb",
+    "parameters.Cd": "Cd",
+    "parameters.Cr": "Cr",
+    "parameters.Hg": "Hg",
+    "parameters.Ni": "Ni",
+}
+
+# Metals whose absence is reported as a "reduced parameter set".
+_EXPECTED_METALS = np.array([metal in calculation_service.BIS_LIMITS_METALS for metal in METAL_ORDER])
+
+LON_COLUMN = "coordinates.coordinates[0]"
+LAT_COLUMN = "coordinates.coordinates[1]"
+
+# Coordinates are rounded to this many decimals (~1 m) in the row key, so
+# float noise between exports of the same sample does not split it.
+_KEY_COORD_DECIMALS = 5
+# Row keys per ``IN (...)`` lookup; well under SQLite's bound-parameter limit.
+_KEY_LOOKUP_CHUNK = 500
+
+
+def normalize_str(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, float) and math.isnan(v):
+        return ""
+    return str(v).strip()
+
+
+def numeric_column(df: pd.DataFrame, column: str) -> np.ndarray:
+    """*column* as float64, NaN where absent, blank or unparseable."""
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def string_column(df: pd.DataFrame, column: str) -> list[str | None]:
+    """*column* stripped to str, None where absent or blank."""
+    if column not in df.columns:
+        return [None] * len(df)
+    return [normalize_str(v) or None for v in df[column].tolist()]
+
+
+def _nan_to_none(values: np.ndarray) -> list[float | None]:
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def _metal_dicts(matrix: np.ndarray) -> list[dict[str, float]]:
+    """Per-row ``{metal: value}`` dicts (NaN entries dropped), in METAL_ORDER."""
+    return [
+        {metal: v for metal, v in zip(METAL_ORDER, row, strict=True) if not math.isnan(v)} for row in matrix.tolist()
+    ]
+
+
+def build_sample_records(
+    df: pd.DataFrame,
+    geocode_results: Mapping[int, Mapping[str, Any]] | None = None,
+    geo_pending: np.ndarray | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Validate and score every row of a parsed upload.
+
+    *geocode_results* maps positional row index → reverse-geocoder hit;
+    a hit overrides the row's own state/district/location.  Rows marked in
+    the boolean *geo_pending* keep their own and are stored flagged for
+    ``geocoding.enrich_pending`` instead.  Returns one
+    dict of ``WaterSample`` column values per row worth keeping (rows with
+    no location, coordinate, year or parameter at all are dropped).
+    """
+    n = len(df)
+    geocode_results = geocode_results or {}
+    pending = geo_pending.tolist() if geo_pending is not None else [False] * n
+
+    # ── Identifiers ────────────────────────────────────────────────────
+    state = string_column(df, "state")
+    district = string_column(df, "district")
+    location = string_column(df, "location")
+    for idx, geo in geocode_results.items():
+        state[idx] = normalize_str(geo.get("admin1")) or None
+        district[idx] = normalize_str(geo.get("admin2")) or None
+        location[idx] = normalize_str(geo.get("name")) or None
+    village_code = string_column(df, "village_code")
+    source = [s or "lab_A" for s in string_column(df, "source")]
+
+    # ── Numeric fields + range validation ──────────────────────────────
+    lon = numeric_column(df, LON_COLUMN)
+    lat = numeric_column(df, LAT_COLUMN)
+    year = np.trunc(numeric_column(df, "year"))
+    ph = numeric_column(df, "parameters.pH")
+
+    lon_missing, lat_missing = np.isnan(lon), np.isnan(lat)
+    lon_range = ~lon_missing & ~((lon >= -180.0) & (lon <= 180.0))
+    lat_range = ~lat_missing & ~((lat >= -90.0) & (lat <= 90.0))
+    lon = np.where(lon_range, np.nan, lon)
+    lat = np.where(lat_range, np.nan, lat)
+    year_missing = ~np.isfinite(year)
+    year_range = ~year_missing & ~((year >= 1900) & (year <= 2100))
+    ph_missing = np.isnan(ph)
+    ph_range = ~ph_missing & ~((ph >= 0.0) & (ph <= 14.0))
+
+    params = np.column_stack([numeric_column(df, col) for col in PARAM_COLUMN_MAP])
+    has_params = (~np.isnan(params)).any(axis=1)
+
+    # ── WHO/BIS scoring over the whole file ────────────────────────────
+    raw_metals = np.column_stack([numeric_column(df, f"parameters.{metal}") for metal in METAL_ORDER])
+    conc = calculation_service.convert_units_batch(raw_metals)
+    has_metals = (~np.isnan(conc)).any(axis=1)
+    scored = calculation_service.score_standards_batch(conc)
+    missing_metals = np.isnan(conc) & _EXPECTED_METALS
+
+    # ── Per-row assembly ───────────────────────────────────────────────
+    param_names = list(PARAM_COLUMN_MAP.values())
+    param_rows = params.tolist()
+    lon_l, lat_l = _nan_to_none(lon), _nan_to_none(lat)
+    year_l = [None if not math.isfinite(y) else int(y) for y in year.tolist()]
+    flags = {
+        name: arr.tolist()
+        for name, arr in {
+            "lon_missing": lon_missing,
+            "lon_range": lon_range,
+            "lat_missing": lat_missing,
+            "lat_range": lat_range,
+            "year_missing": year_missing,
+            "year_range": year_range,
+            "ph_missing": ph_missing,
+            "ph_range": ph_range,
+            "has_params": has_params,
+            "has_metals": has_metals,
+        }.items()
+    }
+    missing_l = missing_metals.tolist()
+    per_standard: dict[str, dict[str, Any]] = {
+        name: {
+            "ci": (ci := _metal_dicts(values["ci"])),
+            "ehci": [calculation_service.calc_ehci(row) for row in ci],
+            "hei": _nan_to_none(values["hei"]),
+            "pli": _nan_to_none(values["pli"]),
+            "hmpi": _nan_to_none(values["hmpi"]),
+            "hi": _nan_to_none(values["hi"]),
+        }
+        for name, values in scored.items()
+    }
+
+    records: list[dict[str, Any]] = []
+    for i in range(n):
+        if (
+            not state[i]
+            and not district[i]
+            and not location[i]
+            and lon_l[i] is None
+            and lat_l[i] is None
+            and year_l[i] is None
+            and not flags["has_params"][i]
+        ):
+            continue
+
+        issues: list[str] = []
+        if not state[i]:
+            issues.append("state missing")
+        if not district[i]:
+            issues.append("district missing")
+        if not location[i]:
+            issues.append("location missing")
+        if flags["lon_missing"][i]:
+            issues.append("longitude missing/invalid")
+        elif flags["lon_range"][i]:
+            issues.append("longitude out of range (-180, 180)")
+        if flags["lat_missing"][i]:
+            issues.append("latitude missing/invalid")
+        elif flags["lat_range"][i]:
+            issues.append("latitude out of range (-90, 90)")
+        if flags["year_missing"][i]:
+            issues.append("year missing/invalid")
+        elif flags["year_range"][i]:
+            issues.append("year out of range (1900-2100)")
+        if flags["ph_missing"][i]:
+            issues.append("pH missing/invalid")
+        elif flags["ph_range"][i]:
+            issues.append("pH out of range (0-14)")
+
+        parameters: dict[str, Any] = {
+            name: v for name, v in zip(param_names, param_rows[i], strict=True) if not math.isnan(v)
+        }
+
+        standards: dict[str, Any] = {}
+        if flags["has_metals"][i]:
+            for name, values in per_standard.items():
+                standards[name] = {key: column[i] for key, column in values.items()}
+            if standards["WHO"]["hmpi"] is not None:
+                parameters["hmpi"] = standards["WHO"]["hmpi"]
+
+        missing = [metal for metal, gap in zip(METAL_ORDER, missing_l[i], strict=True) if gap]
+        if missing:
+            issues.append(
+                f"Historical index was computed with a reduced parameter set (Missing: {', '.join(missing)})."
+            )
+
+        bis = standards.get("BIS", {})
+        record = {
+            "village_code": village_code[i],
+            "state": state[i],
+            "district": district[i],
+            "location": location[i],
+            "year": year_l[i],
+            "source": source[i],
+            "latitude": lat_l[i],
+            "longitude": lon_l[i],
+            "fe": parameters.get("Fe"),
+            "as_": parameters.get("As"),
+            "u": parameters.get("U"),
+            "hmpi_bis": bis.get("hmpi"),
+            "hei_bis": bis.get("hei"),
+            "pli_bis": bis.get("pli"),
+            "parameters_json": json.dumps(parameters),
+            "standards_json": json.dumps(standards),
+            "validation_issues_json": json.dumps(issues),
+            "geo_pending": pending[i],
+        }
+        record["row_key"], record["content_hash"] = row_fingerprint(record)
+        records.append(record)
+
+    return records
+
+
+# ── Fingerprints + upsert ──────────────────────────────────────────────
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join("" if p is None else str(p) for p in parts).encode()).hexdigest()
+
+
+def row_fingerprint(record: Mapping[str, Any]) -> tuple[str, str]:
+    """
+    ``(row_key, content_hash)`` for a ``build_sample_records`` record.
+
+    The row key is the sample's natural key: village code, year, source,
+    the coordinates rounded to ``_KEY_COORD_DECIMALS`` (or the state /
+    district / location names for a row without coordinates) and the
+    measured parameters, so two samples taken at one well in the same year
+    stay two rows.  The content hash covers every stored value that a
+    re-import can change.
+    """
+    lat, lon = record["latitude"], record["longitude"]
+    if lat is not None and lon is not None:
+        place: tuple[Any, ...] = (round(lat, _KEY_COORD_DECIMALS), round(lon, _KEY_COORD_DECIMALS))
+    else:
+        place = (lat, lon, record["state"], record["district"], record["location"])
+    row_key = _digest(record["village_code"], record["year"], record["source"], *place, record["parameters_json"])
+    content_hash = _digest(record["state"], record["district"], record["location"], lat, lon, record["parameters_json"])
+    return row_key, content_hash
+
+
+class UpsertCounts(NamedTuple):
+    """Outcome of ``upsert_sample_records`` for one batch."""
+
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    duplicates: int = 0  # rows repeating an earlier row's key in the same batch
+
+
+def _stored_hashes(db: Session, keys: list[str]) -> dict[str, str | None]:
+    """``row_key → content_hash`` for the *keys* already in ``water_samples``."""
+    table = models.WaterSample.__table__
+    stored: dict[str, str | None] = {}
+    for start in range(0, len(keys), _KEY_LOOKUP_CHUNK):
+        chunk = keys[start : start + _KEY_LOOKUP_CHUNK]
+        stored.update(db.execute(select(table.c.row_key, table.c.content_hash).where(table.c.row_key.in_(chunk))).all())
+    return stored
+
+
+def _write_upserts(db: Session, new: list[dict[str, Any]], changed: list[dict[str, Any]]) -> None:
+    """
+    ``INSERT ... ON CONFLICT (row_key) DO UPDATE`` the *new* and *changed*
+    records in one executemany; a row whose stored content hash already
+    matches (e.g. written meanwhile by a concurrent import) is left alone.
+    Dialects without ON CONFLICT get a plain insert plus a keyed update.
+    """
+    table = models.WaterSample.__table__
+    columns = [name for name in (new or changed)[0] if name not in ("row_key", "created_at")]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.row_key],
+            set_={name: stmt.excluded[name] for name in columns},
+            where=table.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        )
+        db.execute(stmt, new + changed)
+        return
+
+    if new:
+        db.execute(insert(table), new)
+    if changed:
+        stmt = (
+            update(table)
+            .where(table.c.row_key == bindparam("key"))
+            .values({name: bindparam(f"new_{name}") for name in columns})
+        )
+        db.execute(stmt, [{"key": r["row_key"], **{f"new_{name}": r[name] for name in columns}} for r in changed])
+
+
+def upsert_sample_records(db: Session, records: list[dict[str, Any]]) -> UpsertCounts:
+    """
+    Idempotently write ``build_sample_records`` output to ``water_samples``.
+
+    The batch's row keys are looked up first (one indexed ``IN`` query per
+    ``_KEY_LOOKUP_CHUNK`` keys): rows already stored with the same content
+    hash are skipped without being written, so re-importing a file costs
+    little more than those lookups.  New and changed rows go out in one
+    executemany upsert.  A row repeating the key of an earlier row in the
+    batch (the same sample listed twice) is stored once and counted, and
+    logged, as a duplicate.  The caller commits.
+    """
+    if not records:
+        return UpsertCounts()
+    by_key: dict[str, dict[str, Any]] = {}
+    for record in records:
+        by_key.setdefault(record["row_key"], record)
+    duplicates = len(records) - len(by_key)
+    if duplicates:
+        logger.warning("%d of %d rows repeat another row of the batch and were stored once", duplicates, len(records))
+    stored = _stored_hashes(db, list(by_key))
+    new = [r for key, r in by_key.items() if key not in stored]
+    changed = [r for key, r in by_key.items() if key in stored and stored[key] != r["content_hash"]]
+
+    if new or changed:
+        now = datetime.now(UTC)
+        for record in new + changed:
+            record.setdefault("created_at", now)
+            record.setdefault("updated_at", now)
+        _write_upserts(db, new, changed)
+    return UpsertCounts(len(new), len(changed), len(by_key) - len(new) - len(changed), duplicates)
@@ -0,0 +1,699 @@
+# app/services/job_queue.py
+"""
+Durable background-job queue backed by the application database.
+
+Uploads used to run as FastAPI ``BackgroundTasks``: in the API process,
+unbounded, and lost on restart (leaving their task "processing" forever).
+Now a request ``enqueue``-s a ``jobs`` row in the same transaction as its
+``task_status`` row, and a pool of JOB_WORKERS worker processes claims and
+runs them, so heavy parses no longer share CPU with request handling::
+
+    queued ──claim──▶ running ──▶ done | failed
+                        │
+                        └─ lease lapses (worker died) ──▶ claimable again
+
+A claim is a lease of JOB_VISIBILITY_TIMEOUT_SECONDS that the worker
+renews while the job runs.  If the worker dies, the lease lapses and the
+job is handed to the next worker, up to JOB_MAX_ATTEMPTS attempts; the
+supervisor releases a dead worker's job at once, and ``recover_orphans``
+sweeps lapsed jobs at startup.
+
+Workers take the highest ``priority`` first and, among equal priorities,
+the job whose client has the fewest jobs running, so one client's bulk
+import cannot hold every worker.  JOB_FAST_LANE_WORKERS of the workers
+only take jobs up to JOB_FAST_LANE_MAX_BYTES, so a small upload starts
+promptly even while large ones fill the queue.  ``estimate`` tells a
+waiting task its place in line and expected start time.
+
+A running job is stopped by raising ``JobCancelled`` (``cancel``, i.e.
+``DELETE /tasks/{id}``) or ``JobTimedOut`` (past its deadline) in the
+thread running it, from a watchdog thread that also renews the lease.
+
+A job is ``"package.module:function"`` plus JSON arguments; the function
+owns its task's progress (``task_events.TaskTracker``), whose updates the
+worker forwards to the API process for the live registry and SSE streams,
+along with the cache invalidations of jobs that write samples.
+With JOB_WORKERS=0 there is no pool and each job runs in the API process
+right after its request, as before.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from multiprocessing.connection import Connection, wait
+from typing import Any, NamedTuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Select, and_, func, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app import cache, models
+from app.config import settings
+from app.services import task_events
+
+logger = logging.getLogger(__name__)
+
+Job = models.Job
+
+JOB_WAIT_SECONDS = Histogram(
+    "job_queue_wait_seconds",
+    "Time from enqueueing a job to a worker claiming it",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+JOB_WORKER_RESTARTS = Counter("job_worker_restarts_total", "Job worker processes restarted after dying")
+
+
+def _queue_depth() -> float:
+    db = models.SessionLocal()
+    try:
+        return float(db.scalar(select(func.count()).select_from(Job).where(Job.status == "queued")) or 0)
+    except Exception:
+        return float("nan")
+    finally:
+        db.close()
+
+
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Jobs waiting for a worker")
+JOB_QUEUE_DEPTH.set_function(_queue_depth)
+
+
+# ── Interrupting jobs ──────────────────────────────────────────────────
+
+
+class JobInterrupted(BaseException):
+    """
+    Raised inside a running job to stop it.  A ``BaseException``, like
+    ``KeyboardInterrupt``, so the job's ``except Exception`` blocks do not
+    swallow it.  Parsers may attach what they finished as ``partial``.
+    """
+
+    status = "failed"
+    partial: Any = None
+
+    def describe(self, job: models.Job) -> str:
+        """The task's error message for *job* stopped this way."""
+        return "Stopped before it finished."
+
+
+class JobCancelled(JobInterrupted):
+    status = "cancelled"
+
+    def describe(self, job: models.Job) -> str:
+        return "Cancelled by request."
+
+
+class JobTimedOut(JobInterrupted):
+    def describe(self, job: models.Job) -> str:
+        return f"Timed out: the job ran past its {job.deadline_seconds:g} s deadline."
+
+
+_pending_signals: list[type[JobInterrupted]] = []
+# None where there is no SIGUSR1 / pthread_kill (Windows): the main thread
+# then gets the asynchronous exception like any other.
+_INTERRUPT_SIGNAL = getattr(signal, "SIGUSR1", None) if hasattr(signal, "pthread_kill") else None
+
+
+def _on_interrupt_signal(signum, frame) -> None:
+    if _pending_signals:
+        raise _pending_signals.pop()()
+
+
+def _interrupt(thread_id: int, exc_type: type[JobInterrupted]) -> None:
+    """Raise *exc_type* in the thread *thread_id*."""
+    if (
+        _INTERRUPT_SIGNAL is not None
+        and thread_id == threading.main_thread().ident
+        and signal.getsignal(_INTERRUPT_SIGNAL) is _on_interrupt_signal
+    ):
+        # A signal also breaks the main thread out of blocking calls
+        # (sleeping, waiting on the PDF pool).
+        _pending_signals.append(exc_type)
+        signal.pthread_kill(thread_id, _INTERRUPT_SIGNAL)
+    else:
+        # Delivered at the thread's next Python bytecode.
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), ctypes.py_object(exc_type))
+
+
+def deadline_for(filename: str) -> float | None:
+    """JOB_DEADLINES entry for *filename*'s extension (None = no deadline)."""
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    seconds = settings.JOB_DEADLINES.get(ext, settings.JOB_DEFAULT_DEADLINE_SECONDS)
+    return seconds if seconds > 0 else None
+
+
+# ── Queue operations ───────────────────────────────────────────────────
+
+
+def enqueue(
+    db: Session,
+    handler: str,
+    args: list[Any],
+    *,
+    task_id: str | None = None,
+    priority: int = 0,
+    client: str | None = None,
+    size_bytes: int | None = None,
+    deadline_seconds: float | None = None,
+) -> str:
+    """
+    Add a job running ``handler(*args)``; the caller commits.  Returns the job id.
+
+    *client* is whom the job is scheduled fairly against, *size_bytes* the
+    input size that decides whether it can take the fast lane, and
+    *deadline_seconds* how long each attempt may run.
+    """
+    job = Job(
+        id=uuid.uuid4().hex,
+        task_id=task_id,
+        handler=handler,
+        args_json=json.dumps(args),
+        status="queued",
+        attempts=0,
+        priority=priority,
+        client=client,
+        size_bytes=size_bytes,
+        deadline_seconds=deadline_seconds,
+        cancel_requested=False,
+        enqueued_at=time.time(),
+    )
+    db.add(job)
+    return job.id
+
+
+def _claimable(now: float):
+    return or_(Job.status == "queued", and_(Job.status == "running", Job.lease_expires_at < now))
+
+
+def _fits(max_bytes: int):
+    return and_(Job.size_bytes.is_not(None), Job.size_bytes <= max_bytes)
+
+
+def _schedule_order():
+    """Highest priority first, then the client with fewest jobs running, then oldest."""
+    other = aliased(Job)
+    in_flight = (
+        select(func.count())
+        .select_from(other)
+        .where(other.client == Job.client, other.status == "running")
+        .correlate(Job)
+        .scalar_subquery()
+    )
+    return Job.priority.desc(), in_flight, Job.enqueued_at
+
+
+def claim(db: Session, worker: str, job_id: str | None = None, max_bytes: int | None = None) -> models.Job | None:
+    """
+    Lease the next job in schedule order (or *job_id*) to *worker*, or None.
+    With *max_bytes* only jobs that small are considered (the fast lane).
+
+    The conditional UPDATE makes the claim atomic across processes: of
+    several workers racing for one job exactly one sees a row updated.
+    Jobs that already used up JOB_MAX_ATTEMPTS are failed instead.
+    """
+    while True:
+        now = time.time()
+        query: Select = select(Job.id).where(_claimable(now))
+        if job_id is not None:
+            query = query.where(Job.id == job_id)
+        if max_bytes is not None:
+            query = query.where(_fits(max_bytes))
+        candidate = db.scalar(query.order_by(*_schedule_order()).limit(1))
+        if candidate is None:
+            return None
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == candidate, _claimable(now))
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                worker=worker,
+                started_at=now,
+                lease_expires_at=now + settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+            )
+        )
+        db.commit()
+        if claimed.rowcount != 1:
+            continue  # another worker won this one
+        job = db.get(Job, candidate)
+        if job.cancel_requested:
+            # Cancelled while running on a worker that has since died.
+            _finish(db, job, error=JobCancelled().describe(job), status="cancelled")
+        elif job.attempts > settings.JOB_MAX_ATTEMPTS:
+            _finish(db, job, error=f"Gave up after {job.attempts - 1} attempt(s): the worker running it stopped.")
+        else:
+            return job
+
+
+def renew(job_id: str, worker: str) -> None:
+    """Extend *worker*'s lease on a running job."""
+    db = models.SessionLocal()
+    try:
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.worker == worker, Job.status == "running")
+            .values(lease_expires_at=time.time() + settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def release(worker: str) -> list[str]:
+    """
+    Make the jobs *worker* was running claimable now (the worker is known
+    to be gone).  Returns their task ids.
+    """
+    db = models.SessionLocal()
+    try:
+        running = (Job.worker == worker, Job.status == "running")
+        query: Select = select(Job.task_id).where(*running)
+        task_ids = [task_id for task_id in db.scalars(query) if task_id]
+        db.execute(update(Job).where(*running).values(lease_expires_at=0.0))
+        db.commit()
+        return task_ids
+    finally:
+        db.close()
+
+
+def _end_task(db: Session, task_id: str | None, status: str, message: str) -> models.TaskStatus | None:
+    """Move a job's task to a terminal *status*, unless the job already did."""
+    task = db.get(models.TaskStatus, task_id) if task_id else None
+    if task is None or task.status in task_events.TERMINAL_STATUSES:
+        return None
+    task.status = status
+    task.error_message = message
+    return task
+
+
+def _finish(db: Session, job: models.Job, error: str | None = None, status: str | None = None) -> None:
+    """Record a job's outcome; a failed job takes its task with it."""
+    job.status = status or ("failed" if error else "done")
+    job.error = error
+    job.finished_at = time.time()
+    job.lease_expires_at = None
+    task = _end_task(db, job.task_id, job.status, error) if error else None
+    db.commit()
+    if task is not None:
+        task_events.deliver(task_events.snapshot(task))
+
+
+def cancel(db: Session, task_id: str) -> str | None:
+    """
+    Cancel *task_id*'s job: a queued job is cancelled at once (returns
+    ``"cancelled"``), a running one is stopped by its worker's watchdog
+    within a second or so (returns ``"cancelling"``).  None if the task
+    has no queued or running job.
+    """
+    job = db.scalar(select(Job).where(Job.task_id == task_id, Job.status.in_(("queued", "running"))).limit(1))
+    if job is None:
+        return None
+    dequeued = db.execute(update(Job).where(Job.id == job.id, Job.status == "queued").values(cancel_requested=True))
+    if dequeued.rowcount == 1:
+        db.refresh(job)
+        _finish(db, job, error=JobCancelled().describe(job), status="cancelled")
+        return "cancelled"
+    db.execute(update(Job).where(Job.id == job.id).values(cancel_requested=True))
+    db.commit()
+    return "cancelling"
+
+
+def _cancel_requested(job_id: str) -> bool:
+    db = models.SessionLocal()
+    try:
+        return bool(db.scalar(select(Job.cancel_requested).where(Job.id == job_id)))
+    finally:
+        db.close()
+
+
+def recover_orphans(db: Session) -> int:
+    """
+    Startup sweep: jobs left "running" by a dead process (lease lapsed) go
+    back to the queue, their tasks back to pending.  Returns the number
+    of jobs recovered.
+    """
+    now = time.time()
+    orphans = db.scalars(select(Job).where(Job.status == "running", Job.lease_expires_at < now)).all()
+    for job in orphans:
+        if job.cancel_requested:
+            _finish(db, job, error=JobCancelled().describe(job), status="cancelled")
+            continue
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            _finish(db, job, error=f"Gave up after {job.attempts} attempt(s): the worker running it stopped.")
+            continue
+        job.status = "queued"
+        job.worker = None
+        job.lease_expires_at = None
+        task = db.get(models.TaskStatus, job.task_id) if job.task_id else None
+        if task is not None and task.status not in task_events.TERMINAL_STATUSES:
+            task.status = "pending"
+            task.stage = "queued"
+    db.commit()
+    if orphans:
+        logger.warning("Recovered %d orphaned job(s) from a previous run", len(orphans))
+    return len(orphans)
+
+
+class QueueEstimate(NamedTuple):
+    position: int  # 1 = next to start
+    start_at: float | None  # Unix time; None until some job has finished to time them by
+
+
+def _lanes() -> tuple[int, int]:
+    """(general, fast-lane) worker counts; at least one worker stays general."""
+    workers = max(1, settings.JOB_WORKERS)
+    fast = 0 if runs_inline() else max(0, min(settings.JOB_FAST_LANE_WORKERS, workers - 1))
+    return workers - fast, fast
+
+
+def _mean_runtime(db: Session, max_bytes: int | None = None, sample: int = 20) -> float | None:
+    query: Select = select(Job.finished_at - Job.started_at).where(
+        Job.status == "done", Job.started_at.is_not(None), Job.finished_at.is_not(None)
+    )
+    if max_bytes is not None:
+        query = query.where(_fits(max_bytes))
+    runtimes = db.scalars(query.order_by(Job.finished_at.desc()).limit(sample)).all()
+    return sum(runtimes) / len(runtimes) if runtimes else None
+
+
+def estimate(db: Session, task_id: str) -> QueueEstimate | None:
+    """
+    Place in line and expected start of *task_id*'s queued job, or None if
+    it is not waiting.  Counts the jobs scheduled ahead of it by priority
+    and age (fairness between clients can still reorder them) and assumes
+    each takes as long as recent ones did; small jobs use the fast lane
+    when that is sooner.
+    """
+    job = db.scalar(select(Job).where(Job.task_id == task_id, Job.status == "queued").limit(1))
+    if job is None:
+        return None
+    ahead = (
+        Job.status == "queued",
+        Job.id != job.id,
+        or_(Job.priority > job.priority, and_(Job.priority == job.priority, Job.enqueued_at < job.enqueued_at)),
+    )
+    general, fast = _lanes()
+    lanes = [(general, None)]
+    if fast and job.size_bytes is not None and job.size_bytes <= settings.JOB_FAST_LANE_MAX_BYTES:
+        lanes.append((fast, settings.JOB_FAST_LANE_MAX_BYTES))
+
+    best: QueueEstimate | None = None
+    now = time.time()
+    for workers, max_bytes in lanes:
+        waiting, running = select(func.count()).where(*ahead), select(func.count()).where(Job.status == "running")
+        if max_bytes is not None:
+            waiting, running = waiting.where(_fits(max_bytes)), running.where(_fits(max_bytes))
+        position = (db.scalar(waiting.select_from(Job)) or 0) + 1
+        busy = min(workers, db.scalar(running.select_from(Job)) or 0)
+        # Jobs ahead plus those running are worked off *workers* at a time.
+        rounds = (position - 1 + busy) // workers
+        runtime = _mean_runtime(db, max_bytes) or _mean_runtime(db)
+        start_at = now + rounds * runtime if runtime is not None else (now if rounds == 0 else None)
+        if best is None or (start_at or float("inf")) < (best.start_at or float("inf")):
+            best = QueueEstimate(position, start_at)
+    return best
+
+
+# ── Running jobs ───────────────────────────────────────────────────────
+
+
+def _resolve(handler: str):
+    module, _, name = handler.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+# How often a running job's watchdog checks for cancellation and its deadline.
+_WATCH_INTERVAL_SECONDS = 0.5
+
+
+def _execute(db: Session, job: models.Job, worker: str) -> None:
+    """
+    Run a claimed job in this thread.  A watchdog thread renews the lease
+    and interrupts the job when it is cancelled or runs past its deadline.
+    """
+    job_id, handler, args = job.id, job.handler, json.loads(job.args_json or "[]")
+    deadline = job.started_at + job.deadline_seconds if job.deadline_seconds else None
+    target = threading.get_ident()
+    if _INTERRUPT_SIGNAL is not None and target == threading.main_thread().ident:
+        signal.signal(_INTERRUPT_SIGNAL, _on_interrupt_signal)
+    done = threading.Event()
+    fire_lock = threading.Lock()
+
+    def watchdog():
+        fired = False
+        next_renewal = time.monotonic() + settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3
+        while not done.wait(_WATCH_INTERVAL_SECONDS):
+            try:
+                if not fired:
+                    reason = None
+                    if deadline is not None and time.time() >= deadline:
+                        reason = JobTimedOut
+                    elif _cancel_requested(job_id):
+                        reason = JobCancelled
+                    with fire_lock:
+                        if reason is not None and not done.is_set():
+                            logger.warning("Stopping job %s: %s", job_id, reason.__name__)
+                            _interrupt(target, reason)
+                            fired = True
+                if time.monotonic() >= next_renewal:
+                    renew(job_id, worker)
+                    next_renewal = time.monotonic() + settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3
+            except Exception:
+                logger.warning("Watchdog of job %s hit an error", job_id, exc_info=True)
+
+    threading.Thread(target=watchdog, name=f"job-{job_id[:8]}-watchdog", daemon=True).start()
+    error, interrupted = None, None
+    try:
+        try:
+            _resolve(handler)(*args)
+        finally:
+            with fire_lock:
+                done.set()
+    except JobInterrupted as exc:
+        interrupted = exc
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job_id, handler)
+        error = f"{type(exc).__name__}: {exc}"
+    done.set()
+    db.rollback()
+    job = db.get(Job, job_id)
+    if interrupted is not None:
+        error = interrupted.describe(job)
+        logger.warning("Job %s (%s) stopped: %s", job_id, handler, error)
+    _finish(db, job, error=error, status=interrupted.status if interrupted is not None else None)
+
+
+def run_job(job_id: str) -> None:
+    """Claim and run one job in this process (JOB_WORKERS=0)."""
+    db = models.SessionLocal()
+    try:
+        job = claim(db, f"{socket.gethostname()}:{os.getpid()}:inline", job_id=job_id)
+        if job is not None:
+            _execute(db, job, job.worker)
+    finally:
+        db.close()
+
+
+def runs_inline() -> bool:
+    """True when jobs run in the API process instead of the worker pool."""
+    return settings.JOB_WORKERS <= 0
+
+
+def run_queued() -> None:
+    """
+    Run every queued job in this process (JOB_WORKERS=0 has no pool to pick
+    them up): those left by a previous run, or queued by another job.
+    """
+    db = models.SessionLocal()
+    try:
+        worker = f"{socket.gethostname()}:{os.getpid()}:inline"
+        while (job := claim(db, worker)) is not None:
+            _execute(db, job, worker)
+    finally:
+        db.close()
+
+
+# ── Worker pool ────────────────────────────────────────────────────────
+
+
+def _worker_name(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}"
+
+
+def _worker_main(index: int, conn, stop, max_bytes: int | None) -> None:
+    """
+    Entry point of a worker process: claim and run jobs until *stop* is set
+    (only jobs up to *max_bytes* for a fast-lane worker).
+    """
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    # Ctrl-C reaches the whole process group; the pool stops workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    send_lock = threading.Lock()
+
+    def send(*message) -> None:
+        with send_lock:
+            conn.send(message)
+
+    task_events.set_sink(lambda event: send("task", event))
+    cache.set_sink(lambda name, args: send("cache", (name, args)))
+    worker = _worker_name(os.getpid())
+    logger.info("Job worker %d started as %s%s", index, worker, " (fast lane)" if max_bytes is not None else "")
+
+    while not stop.is_set():
+        db = models.SessionLocal()
+        try:
+            job = claim(db, worker, max_bytes=max_bytes)
+            if job is None:
+                db.close()
+                stop.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+            task_id = job.task_id
+            if job.attempts == 1:
+                send("waited", job.started_at - job.enqueued_at)
+            _execute(db, job, worker)
+            if task_id:
+                send("finished", task_id)
+        except Exception:
+            logger.exception("Job worker %d hit an error; continuing", index)
+            stop.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+        finally:
+            db.close()
+
+
+class WorkerPool:
+    """
+    JOB_WORKERS worker processes plus two threads in the API process: one
+    relays task updates, cache invalidations and metrics from the workers,
+    one restarts any worker that dies (releasing the job it was running).
+
+    Each worker reports over a pipe of its own, so one dying mid-message
+    cannot wedge the others.
+    """
+
+    def __init__(self, size: int):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._procs: list[Any] = [None] * size
+        self._conns: list[Connection] = []
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(len(self._procs)):
+            self._spawn(index)
+        for target, name in ((self._relay, "job-pool-relay"), (self._supervise, "job-pool-supervisor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d job worker process(es)", len(self._procs))
+
+    def _spawn(self, index: int) -> None:
+        reader, writer = self._ctx.Pipe(duplex=False)
+        # The last workers form the fast lane.
+        general, _ = _lanes()
+        max_bytes = settings.JOB_FAST_LANE_MAX_BYTES if index >= general else None
+        # Not a daemon: workers start their own PDF-parsing process pools.
+        proc = self._ctx.Process(
+            target=_worker_main, args=(index, writer, self._stop, max_bytes), name=f"job-worker-{index}"
+        )
+        proc.start()
+        writer.close()
+        self._procs[index] = proc
+        with self._lock:
+            self._conns.append(reader)
+
+    def _relay(self) -> None:
+        while True:
+            with self._lock:
+                conns = list(self._conns)
+            if not conns and self._stop.is_set():
+                return
+            conn: Connection
+            for conn in wait(conns, timeout=0.5):
+                try:
+                    kind, payload = conn.recv()
+                except EOFError, OSError:
+                    # Worker exited; the supervisor deals with its job.
+                    with self._lock:
+                        self._conns.remove(conn)
+                    conn.close()
+                    continue
+                if kind == "task":
+                    task_events.deliver(payload)
+                elif kind == "cache":
+                    cache.apply(*payload)
+                elif kind == "waited":
+                    JOB_WAIT_SECONDS.observe(payload)
+                elif kind == "finished":
+                    # The job is over: its task's row is now the source of truth.
+                    task_events.forget(payload)
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(1.0):
+            for index, proc in enumerate(self._procs):
+                if proc.is_alive():
+                    continue
+                logger.error("Job worker %d exited with code %s; restarting it", index, proc.exitcode)
+                JOB_WORKER_RESTARTS.inc()
+                # Hand its job to the next worker now rather than when the lease lapses.
+                try:
+                    for task_id in release(_worker_name(proc.pid)):
+                        task_events.forget(task_id)
+                except Exception:
+                    logger.exception("Could not release the job of dead worker %d", index)
+                self._spawn(index)
+
+    def stop(self, timeout: float) -> None:
+        """Ask workers to finish their current job; stop any still busy after *timeout*."""
+        self._stop.set()
+        for thread in self._threads:
+            if thread.name == "job-pool-supervisor":
+                thread.join()
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            proc.join(max(0.0, deadline - time.monotonic()))
+        for proc in self._procs:
+            if proc.is_alive():
+                # Its job's lease lapses and the job is retried after restart.
+                logger.warning("Stopping busy job worker %s", proc.name)
+                proc.terminate()
+                proc.join()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+
+_pool: WorkerPool | None = None
+
+
+def start() -> None:
+    """Recover orphaned jobs, then start the worker pool (application startup)."""
+    global _pool
+    db = models.SessionLocal()
+    try:
+        recover_orphans(db)
+    finally:
+        db.close()
+    if runs_inline():
+        threading.Thread(target=run_queued, name="job-drain", daemon=True).start()
+        return
+    _pool = WorkerPool(settings.JOB_WORKERS)
+    _pool.start()
+
+
+def stop() -> None:
+    """Stop the worker pool (application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.stop(settings.JOB_SHUTDOWN_GRACE_SECONDS)
+        _pool = None
@@ -0,0 +1,168 @@
+# app/services/parse_cache.py
+"""
+Content-addressed cache of parsed uploads.
+
+Operators often upload the same CGWB PDF or CSV more than once (after a
+failed calculate, or to load it into another environment).  The parsed
+frame is kept on disk keyed by the SHA-256 of the upload bytes plus
+everything else the parse depends on, so a repeat upload skips parsing::
+
+    data/parse_cache/<key>/        one entry, in the ``upload_store`` format
+
+Entries are evicted least-recently-used once the cache grows past
+PARSE_CACHE_MAX_BYTES; a hit refreshes the entry's mtime.  The cache is
+best effort: any error reading or writing it is logged and the upload is
+simply parsed as usual.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from app.config import settings
+from app.services import upload_store
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to file_parser / pdf_parser alters the parsed
+# output, so entries written by the old code stop matching.
+PARSER_VERSION = 2
+
+_lock = threading.Lock()
+
+
+def cache_key(sha256: str, filename: str) -> str:
+    """
+    Key for an upload whose bytes hash to *sha256*.
+
+    The parse also depends on the file name: its extension picks the
+    parser, and PDF reports take their sample year from it.
+    """
+    from app.services.pdf_parser import extract_year_from_filename
+
+    ext = os.path.splitext(filename)[1].lower()
+    variant = f"{ext}:{extract_year_from_filename(filename)}" if ext == ".pdf" else ext
+    material = f"{sha256}:{PARSER_VERSION}:{upload_store.FORMAT_VERSION}:{variant}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(settings.PARSE_CACHE_DIR, key)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for name in os.listdir(path):
+        try:
+            total += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return total
+
+
+def lookup(key: str) -> str | None:
+    """Path of the cached parse for *key* (marked as recently used), or None on a miss."""
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    path = _entry_path(key)
+    if not upload_store.exists(path):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    logger.info("Parse cache hit for %s", key[:12])
+    return path
+
+
+def copy_to(key: str, directory: str) -> bool:
+    """
+    Materialize the cached parse for *key* as an upload store at *directory*
+    (hard-linked where possible, the files are never modified in place).
+    Returns False on a miss.
+    """
+    path = lookup(key)
+    if path is None:
+        return False
+    try:
+        _copy_store(path, directory)
+    except OSError:
+        logger.warning("Could not copy parse cache entry %s", key[:12], exc_info=True)
+        return False
+    return True
+
+
+def _copy_store(src: str, directory: str) -> None:
+    """Hard-link (or copy) the store at *src* to *directory*, renamed into place."""
+    staging = f"{directory}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        shutil.copytree(src, staging, copy_function=_link_or_copy)
+        os.replace(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def store(key: str, df: pd.DataFrame) -> None:
+    """Add a freshly parsed upload to the cache, then evict down to the size limit."""
+    if not settings.PARSE_CACHE_ENABLED:
+        return
+    path = _entry_path(key)
+    try:
+        os.makedirs(settings.PARSE_CACHE_DIR, exist_ok=True)
+        with _lock:
+            if not upload_store.exists(path):
+                upload_store.save_frame(df, path)
+            _evict()
+    except Exception:
+        logger.warning("Could not write parse cache entry %s", key[:12], exc_info=True)
+
+
+def store_saved(key: str, directory: str) -> None:
+    """Like ``store``, for a parse already saved as an upload store at *directory* (hard-linked in)."""
+    if not settings.PARSE_CACHE_ENABLED:
+        return
+    path = _entry_path(key)
+    try:
+        os.makedirs(settings.PARSE_CACHE_DIR, exist_ok=True)
+        with _lock:
+            if not upload_store.exists(path):
+                _copy_store(directory, path)
+            _evict()
+    except Exception:
+        logger.warning("Could not write parse cache entry %s", key[:12], exc_info=True)
+
+
+def _evict() -> None:
+    """Drop least-recently-used entries until the cache fits PARSE_CACHE_MAX_BYTES."""
+    entries = []
+    for name in os.listdir(settings.PARSE_CACHE_DIR):
+        path = os.path.join(settings.PARSE_CACHE_DIR, name)
+        if name.endswith(".partial") or not os.path.isdir(path):
+            continue
+        try:
+            entries.append((os.stat(path).st_mtime, _dir_size(path), path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.PARSE_CACHE_MAX_BYTES:
+            break
+        upload_store.remove(path)
+        total -= size
+        logger.info("Evicted parse cache entry %s (%d bytes)", os.path.basename(path)[:12], size)
@@ -0,0 +1,267 @@
+# app/services/parse_sandbox.py
+"""
+Parse untrusted uploads in a throwaway, resource-capped subprocess.
+
+pdfplumber and the Excel readers run arbitrary file structure through a
+lot of pure-Python code: one pathological file can eat all memory or pin
+a core for an hour.  In-process, that takes the whole job worker (or API
+process) down with it.  Here each parse runs in a fresh child forked from
+a ``forkserver`` that has the parsers preloaded, under
+
+* ``RLIMIT_AS`` (PARSE_SANDBOX_MAX_MEMORY_BYTES): allocations past it
+  fail with MemoryError instead of waking the OOM killer;
+* ``RLIMIT_CPU`` (PARSE_SANDBOX_CPU_SECONDS): the kernel kills the child
+  once it has used that much CPU time;
+* a wall-clock watchdog (PARSE_SANDBOX_TIMEOUT_SECONDS) in the parent,
+  for parses stuck without burning CPU.
+
+Whatever happens to the child, the caller gets a ``ParseSandboxError``
+(a ValueError, so it fails the task like any unparseable file) and the
+next parse gets a fresh child.  Progress, the result (the parsed frame,
+or just a row count when the child writes an upload store itself) and
+the child's peak memory come back over a pipe.
+
+Both ``forkserver`` and rlimits are POSIX-only.  On Windows uploads are
+parsed in-process, unsandboxed, and a warning says so once.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pandas as pd
+from fastapi import HTTPException
+from prometheus_client import Counter, Histogram
+
+from app.config import settings
+from app.services import file_parser
+from app.services.job_queue import JobInterrupted, JobTimedOut
+
+logger = logging.getLogger(__name__)
+
+# False on Windows, which has neither a forkserver nor rlimits.
+SUPPORTED = sys.platform != "win32" and "forkserver" in multiprocessing.get_all_start_methods()
+if SUPPORTED:
+    import resource
+
+SANDBOX_RESTARTS = Counter(
+    "parse_sandbox_worker_restarts_total",
+    "Parse sandbox workers that died and were replaced, by cause",
+    ["reason"],  # memory | cpu | timeout | crash
+)
+SANDBOX_PEAK_MEMORY = Histogram(
+    "parse_sandbox_peak_memory_bytes",
+    "Peak resident memory of a sandboxed parse",
+    buckets=[2**n * 1024 * 1024 for n in range(5, 14)],  # 32 MB .. 8 GB
+)
+
+# How long an interrupted parse may take to hand back its partial rows.
+_PARTIAL_GRACE_SECONDS = 5.0
+
+_ctx = None
+_ctx_lock = threading.Lock()
+
+
+class ParseSandboxError(ValueError):
+    """The sandboxed parse died or was stopped; the message says why."""
+
+
+def _get_context():
+    global _ctx
+    with _ctx_lock:
+        if _ctx is None:
+            _ctx = multiprocessing.get_context("forkserver")
+            # Children fork from a server that already imported these, so a
+            # parse starts in milliseconds rather than re-importing pandas.
+            _ctx.set_forkserver_preload(["app.services.file_parser", "app.services.pdf_parser"])
+        return _ctx
+
+
+def _peak_memory_bytes() -> int:
+    # ru_maxrss is in KiB on Linux; the PDF page workers count as children.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * 1024
+
+
+def _raise_timed_out(signum, frame) -> None:
+    raise JobTimedOut()
+
+
+def _sandbox_main(conn, target: Callable, args: tuple, kwargs: dict, max_memory: int, cpu_seconds: int) -> None:
+    """Child entry point: apply the limits, run *target*, send back the outcome."""
+    from app.services import pdf_parser
+
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if max_memory > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+    if cpu_seconds > 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    # The parent's way of saying "time is up, send what you have".
+    signal.signal(signal.SIGUSR1, _raise_timed_out)
+
+    try:
+        result = target(*args, progress_callback=lambda pct: conn.send(("progress", pct)), **kwargs)
+        conn.send(("done", result, _peak_memory_bytes()))
+    except JobInterrupted as exc:
+        conn.send(("interrupted", exc.partial, _peak_memory_bytes()))
+    except MemoryError:
+        conn.send(("error", "memory", None, _peak_memory_bytes()))
+    except HTTPException as exc:
+        conn.send(("error", "http", (exc.status_code, exc.detail), _peak_memory_bytes()))
+    except ValueError as exc:
+        conn.send(("error", "value", str(exc), _peak_memory_bytes()))
+    except Exception:
+        logger.exception("Sandboxed parse failed")
+        conn.send(("error", "other", None, _peak_memory_bytes()))
+    finally:
+        pdf_parser.shutdown_pool()
+        conn.close()
+
+
+def _failure(proc, reason: str) -> ParseSandboxError:
+    SANDBOX_RESTARTS.labels(reason=reason).inc()
+    messages = {
+        "memory": f"Parsing this file needed more than {settings.PARSE_SANDBOX_MAX_MEMORY_BYTES // 2**20} MB of memory.",
+        "cpu": f"Parsing this file used more than {settings.PARSE_SANDBOX_CPU_SECONDS} s of CPU time.",
+        "timeout": f"Parsing this file took longer than {settings.PARSE_SANDBOX_TIMEOUT_SECONDS:g} s.",
+        "crash": f"The parser crashed on this file (exit code {proc.exitcode}).",
+    }
+    logger.error("[BREADCRUMB] Sandboxed parse failed: %s (pid %s)", reason, proc.pid)
+    return ParseSandboxError(messages[reason])
+
+
+def _exit_reason(proc) -> str:
+    if proc.exitcode in (-signal.SIGXCPU, -signal.SIGKILL) and settings.PARSE_SANDBOX_CPU_SECONDS > 0:
+        return "cpu"
+    return "crash"
+
+
+def run(target: Callable, *args: Any, progress_callback: Callable[[int], None] | None = None, **kwargs: Any) -> Any:
+    """
+    Call ``target(*args, progress_callback=..., **kwargs)`` in a sandboxed
+    child and return its result.  *target* and the result must pickle.
+    """
+    ctx = _get_context()
+    reader, writer = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_sandbox_main,
+        args=(
+            writer,
+            target,
+            args,
+            kwargs,
+            settings.PARSE_SANDBOX_MAX_MEMORY_BYTES,
+            settings.PARSE_SANDBOX_CPU_SECONDS,
+        ),
+        name="parse-sandbox",
+    )
+    proc.start()
+    writer.close()
+    deadline = time.monotonic() + settings.PARSE_SANDBOX_TIMEOUT_SECONDS
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise _failure(proc, "timeout")
+            if not reader.poll(min(remaining, 1.0)):
+                continue
+            try:
+                message = reader.recv()
+            except EOFError:
+                proc.join()
+                raise _failure(proc, _exit_reason(proc)) from None
+            kind, *payload = message
+            if kind == "progress":
+                if progress_callback:
+                    progress_callback(payload[0])
+                continue
+            SANDBOX_PEAK_MEMORY.observe(payload[-1])
+            if kind == "done":
+                return payload[0]
+            if kind == "interrupted":
+                # The child was told to stop (see below) before it got here.
+                exc = JobTimedOut()
+                exc.partial = payload[0]
+                raise exc
+            cause, detail = payload[0], payload[1]
+            if cause == "memory":
+                raise _failure(proc, "memory")
+            if cause == "http":
+                raise HTTPException(status_code=detail[0], detail=detail[1])
+            if cause == "value":
+                raise ValueError(detail)
+            raise ValueError("Error processing file: unable to parse the uploaded data.")
+    except JobTimedOut as exc:
+        if exc.partial is None and proc.is_alive():
+            # Ask the child for the rows it has so far, briefly.
+            os.kill(proc.pid, signal.SIGUSR1)
+            if reader.poll(_PARTIAL_GRACE_SECONDS):
+                try:
+                    kind, *payload = reader.recv()
+                    if kind == "interrupted":
+                        exc.partial = payload[0]
+                except EOFError:
+                    pass
+        raise
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        reader.close()
+
+
+@functools.cache
+def _warn_unsupported() -> None:
+    logger.warning("Parse sandbox unavailable on %s; parsing uploads in-process without limits", sys.platform)
+
+
+def _sandboxed(target: Callable, *args: Any, progress_callback: Callable[[int], None] | None = None) -> Any:
+    """``run`` *target* when PARSE_SANDBOX_ENABLED and SUPPORTED, else call it in-process."""
+    if not settings.PARSE_SANDBOX_ENABLED or not SUPPORTED:
+        if settings.PARSE_SANDBOX_ENABLED:
+            _warn_unsupported()
+        return target(*args, progress_callback=progress_callback)
+    return run(target, *args, progress_callback=progress_callback)
+
+
+def parse_file_frame(
+    path: str,
+    filename: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> pd.DataFrame:
+    """``file_parser.parse_file_frame``, sandboxed when PARSE_SANDBOX_ENABLED and SUPPORTED."""
+    return _sandboxed(
+        file_parser.parse_file_frame, path, filename, validate_columns, progress_callback=progress_callback
+    )
+
+
+def parse_file_to_store(
+    path: str,
+    filename: str,
+    directory: str,
+    validate_columns: bool = True,
+    progress_callback: Callable[[int], None] | None = None,
+) -> int:
+    """
+    ``file_parser.parse_file_to_store``, sandboxed likewise.  The child
+    writes the store itself, so only the row count crosses the pipe.
+    """
+    return _sandboxed(
+        file_parser.parse_file_to_store,
+        path,
+        filename,
+        directory,
+        validate_columns,
+        progress_callback=progress_callback,
+    )
@@ -26,14 +26,21 @@ rather than discard the row.
 from __future__ import annotations
 
 import io
+import itertools
 import logging
+import multiprocessing
 import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 import pandas as pd
 import pdfplumber
 from fastapi import HTTPException
 
+from app.config import settings
 from app.services.file_parser import REQUIRED_COLUMNS as TARGET_COLUMNS
+from app.services.job_queue import JobInterrupted
 
 logger = logging.getLogger(__name__)
 
@@ -299,69 +306,200 @@ def extract_year_from_filename(filename: str) -> int:
     return 2023
 
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+
+# ── Page-parallel table extraction ──────────────────────────────────────
+# pdfplumber's layout analysis is pure Python and CPU-bound (~1 s/page on
+# the CGWB reports), so large PDFs are split into page ranges that run in
+# a shared process pool.  Results are reassembled in page order, which
+# keeps the continuation-table recovery in ``parse_pdf_bytes`` intact.
+
+RawTable = tuple[list, list[list]]
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn": the server is multi-threaded, and forking a threaded
+            # process can deadlock the child.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor, terminate: bool = False) -> None:
+    """
+    Drop *pool* after it broke (a worker died) so the next parse starts a
+    fresh one.  With *terminate* its workers are killed mid-extraction too.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if terminate:
+        pool.terminate_workers()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool() -> None:
+    """Stop the PDF worker processes (called on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _open_pdf(data: bytes | str):
+    return pdfplumber.open(data if isinstance(data, str) else io.BytesIO(data))
+
+
+def _tables_from_pages(pages) -> list[RawTable]:
+    tables: list[RawTable] = []
+    for page in pages:
+        for t in page.extract_tables():
+            if not t:
+                continue
+            header, rows = t[0], t[1:]
+            if not rows and not header:
+                continue
+            tables.append((header, rows))
+    return tables
+
+
+def _extract_page_range(data: bytes | str, start: int, stop: int) -> list[RawTable]:
+    """Worker entry point: raw ``(header, rows)`` tables of pages ``[start, stop)``, in page order."""
+    with _open_pdf(data) as pdf:
+        return _tables_from_pages(pdf.pages[start:stop])
+
+
+def _as_frames(raw_tables: Iterable[RawTable]) -> list[pd.DataFrame]:
+    return [pd.DataFrame(rows, columns=header, dtype=str) for header, rows in raw_tables]
 
 
 def _read_tables_with_pdfplumber(
-    data: bytes,
+    data: bytes | str,
     progress_callback: Callable[[int], None] | None = None,
 ) -> list[pd.DataFrame]:
     """
-    Extract tables from a PDF byte stream using pdfplumber (pure Python,
-    no JVM/subprocess dependencies or deadlock risks).
+    Extract tables from PDF bytes (or a path to a PDF on disk) using
+    pdfplumber (pure Python, no JVM/subprocess dependencies or deadlock risks).
+
+    PDFs longer than ``PDF_PAGES_PER_CHUNK`` pages are extracted in page
+    ranges across ``PDF_PARSE_WORKERS`` processes; tables are always
+    returned in page order.
+
+    If the job is interrupted (cancelled, or past its deadline) the page
+    workers are stopped, and the tables of the leading pages finished so
+    far travel on the exception as ``partial_tables``.
     """
     logger.info("[BREADCRUMB] Starting pdfplumber PDF table extraction")
-    dfs: list[pd.DataFrame] = []
+
+    def report(pages_done: int, total_pages: int) -> None:
+        if progress_callback and total_pages > 0:
+            progress_callback(int(20 + (pages_done / total_pages) * 55))
+
     try:
-        with pdfplumber.open(io.BytesIO(data)) as pdf:
+        with _open_pdf(data) as pdf:
             total_pages = len(pdf.pages)
             logger.info("[BREADCRUMB] PDF opened with %d page(s)", total_pages)
-            for p_idx, page in enumerate(pdf.pages):
-                tables = page.extract_tables()
-                logger.info("[BREADCRUMB] Page %d/%d produced %d raw table(s)", p_idx + 1, total_pages, len(tables))
-                for t in tables:
-                    if not t or len(t) == 0:
-                        continue
-                    header = t[0]
-                    rows = t[1:]
-                    if not rows and not header:
-                        continue
-                    df = pd.DataFrame(rows, columns=header, dtype=str)
-                    dfs.append(df)
-
-                if progress_callback and total_pages > 0:
-                    pct = int(20 + ((p_idx + 1) / total_pages) * 55)
-                    progress_callback(pct)
+            chunk = max(1, settings.PDF_PAGES_PER_CHUNK)
+            if settings.PDF_PARSE_WORKERS <= 1 or total_pages <= chunk:
+                raw_tables: list[RawTable] = []
+                try:
+                    for p_idx, page in enumerate(pdf.pages):
+                        tables = _tables_from_pages([page])
+                        logger.info(
+                            "[BREADCRUMB] Page %d/%d produced %d raw table(s)", p_idx + 1, total_pages, len(tables)
+                        )
+                        raw_tables.extend(tables)
+                        report(p_idx + 1, total_pages)
+                except JobInterrupted as exc:
+                    exc.partial_tables = _as_frames(raw_tables)
+                    raise
+                return _as_frames(raw_tables)
+
+        ranges = [(start, min(start + chunk, total_pages)) for start in range(0, total_pages, chunk)]
+        pool = _get_pool()
+        futures: dict[Future, tuple[int, int]] = {}
+        results: dict[int, list[RawTable]] = {}
+        try:
+            for start, stop in ranges:
+                futures[pool.submit(_extract_page_range, data, start, stop)] = (start, stop)
+            pages_done = 0
+            for future in as_completed(futures):
+                start, stop = futures[future]
+                results[start] = future.result()
+                pages_done += stop - start
+                logger.info(
+                    "[BREADCRUMB] Pages %d-%d/%d produced %d raw table(s)",
+                    start + 1,
+                    stop,
+                    total_pages,
+                    len(results[start]),
+                )
+                report(pages_done, total_pages)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        except JobInterrupted as exc:
+            _discard_pool(pool, terminate=True)
+            leading = itertools.takewhile(lambda r: r[0] in results, ranges)
+            exc.partial_tables = _as_frames(t for start, _ in leading for t in results[start])
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        return _as_frames(t for start, _ in ranges for t in results[start])
 
     except Exception as exc:
         logger.exception("[BREADCRUMB] Error extracting tables with pdfplumber")
         raise HTTPException(status_code=400, detail="Error reading PDF file structure.") from exc
-    return dfs
 
 
 def parse_pdf_bytes(
-    data: bytes,
+    data: bytes | str,
     filename: str,
     progress_callback: Callable[[int], None] | None = None,
 ) -> pd.DataFrame:
     """
-    Extract all tables from a PDF byte stream, apply heuristics to map
-    the varying headers into the standard format, clean lab-report
-    shorthand out of the values, and return a concatenated DataFrame.
+    Extract all tables from a PDF byte stream (or the PDF at path *data*),
+    apply heuristics to map the varying headers into the standard format,
+    clean lab-report shorthand out of the values, and return a
+    concatenated DataFrame.
     """
     logger.info("[BREADCRUMB] Entering parse_pdf_bytes for '%s'", filename)
-    default_year = extract_year_from_filename(filename)
-    all_records = []
 
     try:
         tables = _read_tables_with_pdfplumber(data, progress_callback=progress_callback)
+    except JobInterrupted as exc:
+        # Keep what the finished pages yield, for callers that want partial rows.
+        try:
+            exc.partial = _combine_tables(getattr(exc, "partial_tables", None) or [], filename)
+        except HTTPException:
+            exc.partial = None
+        raise
     except Exception as exc:
         logger.exception("Failed to parse PDF bytes using pdfplumber.")
         raise HTTPException(status_code=400, detail="Error reading PDF file structure.") from exc
 
+    return _combine_tables(tables, filename)
+
+
+def _combine_tables(tables: list[pd.DataFrame], filename: str) -> pd.DataFrame:
+    """Map the raw tables' headers onto the standard columns and concatenate them."""
     if not tables:
         raise HTTPException(status_code=400, detail="No data tables found in the PDF.")
 
+    default_year = extract_year_from_filename(filename)
+    all_records = []
+
     # Tracks the raw (pre-rename) column layout of the last table that
     # produced at least one recognized column, so a later continuation
     # page that lost its header row (a common tabula artifact when the
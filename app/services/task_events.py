@@ -0,0 +1,197 @@
+# app/services/task_events.py
+"""
+In-process progress tracking and pub/sub for background tasks.
+
+A running job reports through a ``TaskTracker``: every update lands in an
+in-memory registry of live task snapshots (which ``GET /tasks/{task_id}``
+reads before falling back to the database) and is published to
+``subscribe``-rs, i.e. the ``GET /tasks/{task_id}/events`` streams.  The
+``task_status`` row is written behind: at most once per
+TASK_PROGRESS_FLUSH_SECONDS for progress and stage updates, and always
+when the status changes, so per-page progress costs no commits.
+
+Snapshots are complete (status, progress, stage, result, error), so a
+subscriber that falls behind only needs the latest.  Job worker processes
+``set_sink`` to forward their snapshots to the API process that started
+them, which ``deliver``-s them here.  Everything else is per process: with
+several API workers, another worker sees a running task's row as of its
+last flush.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+
+class _Subscriber(NamedTuple):
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+
+
+_subscribers: dict[str, list[_Subscriber]] = {}
+_live: dict[str, dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def snapshot(task: models.TaskStatus) -> dict[str, Any]:
+    """The task's client-visible state, shaped like ``TaskStatusResponse``."""
+    return {
+        "task_id": task.id,
+        "status": task.status,
+        "progress": task.progress,
+        "stage": task.stage,
+        "result": task.result,
+        "error_message": task.error_message,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at,
+    }
+
+
+def live_snapshot(task_id: str) -> dict[str, Any] | None:
+    """Current state of a task running in this process, or None (read the DB)."""
+    with _lock:
+        event = _live.get(task_id)
+    return dict(event) if event is not None else None
+
+
+# Set in job worker processes (see job_queue), where updates are forwarded
+# to the API process instead of being kept locally.
+_sink: Callable[[dict[str, Any]], None] | None = None
+
+
+def set_sink(sink: Callable[[dict[str, Any]], None] | None) -> None:
+    """Send this process's task updates to *sink* rather than the local registry."""
+    global _sink
+    _sink = sink
+
+
+def deliver(event: dict[str, Any]) -> None:
+    """Record a task snapshot in the live registry and notify its subscribers."""
+    if _sink is not None:
+        _sink(event)
+        return
+    task_id = event["task_id"]
+    with _lock:
+        if event["status"] in TERMINAL_STATUSES:
+            _live.pop(task_id, None)
+        else:
+            _live[task_id] = event
+    publish(task_id, event)
+
+
+def forget(task_id: str) -> None:
+    """Drop a task from the live registry, so readers fall back to its ``task_status`` row."""
+    with _lock:
+        _live.pop(task_id, None)
+
+
+class TaskTracker:
+    """
+    Live state of one running task, written behind to its ``task_status`` row.
+
+    ``update`` is cheap: it replaces the in-memory snapshot and notifies
+    subscribers, and only commits *task* when the status changed or the
+    last write is TASK_PROGRESS_FLUSH_SECONDS old.  A terminal state is
+    committed before it is delivered, and the task then leaves the registry.
+    """
+
+    def __init__(self, db: Session, task: models.TaskStatus):
+        self._db = db
+        self._task = task
+        self._state = snapshot(task)
+        self._result_dirty = False
+        self._last_flush = time.monotonic()
+        deliver(dict(self._state))
+
+    @property
+    def task_id(self) -> str:
+        return self._state["task_id"]
+
+    def update(self, **changes: Any) -> None:
+        """Apply *changes* (status, stage, progress, result, error_message)."""
+        status_changed = "status" in changes and changes["status"] != self._state["status"]
+        self._result_dirty = self._result_dirty or "result" in changes
+        self._state.update(changes, updated_at=datetime.now(UTC))
+        try:
+            if status_changed or time.monotonic() - self._last_flush >= settings.TASK_PROGRESS_FLUSH_SECONDS:
+                self.flush()
+        finally:
+            deliver(dict(self._state))
+
+    def flush(self) -> None:
+        """Commit the current snapshot to the ``task_status`` row."""
+        # Only assign attributes: reading one of the (expired) row's
+        # attributes after an earlier commit would reload it first.
+        task = self._task
+        task.status = self._state["status"]
+        task.stage = self._state["stage"]
+        task.progress = self._state["progress"]
+        task.error_message = self._state["error_message"]
+        if self._result_dirty:
+            task.result = self._state["result"]
+            self._result_dirty = False
+        self._db.commit()
+        self._last_flush = time.monotonic()
+
+
+def publish(task_id: str, event: dict[str, Any]) -> None:
+    """Hand *event* to every subscriber of *task_id*; safe to call from any thread."""
+    with _lock:
+        subscribers = list(_subscribers.get(task_id, ()))
+    for sub in subscribers:
+        try:
+            sub.loop.call_soon_threadsafe(sub.queue.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's event loop is gone; it unsubscribes on its own.
+            pass
+
+
+class Subscription:
+    """A queue of snapshots for one task, bound to the running event loop."""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self._sub = _Subscriber(asyncio.get_running_loop(), asyncio.Queue())
+        with _lock:
+            _subscribers.setdefault(task_id, []).append(self._sub)
+
+    async def next(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """
+        The most recent snapshot published since the last call (older ones
+        are dropped), or None if nothing arrived within *timeout* seconds.
+        """
+        try:
+            event = await asyncio.wait_for(self._sub.queue.get(), timeout)
+        except TimeoutError:
+            return None
+        while not self._sub.queue.empty():
+            event = self._sub.queue.get_nowait()
+        return event
+
+    def close(self) -> None:
+        with _lock:
+            subscribers = _subscribers.get(self.task_id, [])
+            if self._sub in subscribers:
+                subscribers.remove(self._sub)
+            if not subscribers:
+                _subscribers.pop(self.task_id, None)
+
+
+def subscribe(task_id: str) -> Subscription:
+    """Start receiving snapshots for *task_id*; call ``close()`` when done."""
+    return Subscription(task_id)
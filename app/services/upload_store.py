@@ -0,0 +1,251 @@
+# app/services/upload_store.py
+"""
+Columnar on-disk format for parsed uploads.
+
+A parsed upload is kept between ``/upload/`` and ``/calculate/{file_id}``
+as a directory with one NumPy ``.npy`` file per column, so the calculate
+step can memory-map it and read any row range without loading — or
+JSON-decoding — the whole file::
+
+    data/uploads/<file_id>/
+        schema.json        row count + [{"name", "kind"}] per column
+        c0.npy             float64 / int64 / bool columns, stored as-is
+        c1.codes.npy       text columns: int32 dictionary codes (-1 = null)
+        c1.dict.json       ... and the distinct values they index
+
+Text columns are dictionary-encoded: identifiers such as state, district
+and source repeat heavily, so the codes are small and decoding a chunk is
+a single ``take``.  Values in mixed-type (object) columns are stored as
+their ``str()`` form, which ``ingest_service`` coerces back to the same
+numbers and strings the old JSON round-trip produced.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_SCHEMA_FILE = "schema.json"
+# Rows per block when an already-written column is rewritten as a wider kind.
+_WIDEN_BLOCK_ROWS = 1 << 16
+
+
+# ── Writing ────────────────────────────────────────────────────────────
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+        return "int64"
+    if pd.api.types.is_float_dtype(series.dtype):
+        return "float64"
+    return "text"
+
+
+def _text_values(series: pd.Series) -> np.ndarray:
+    """Object array of str / None for a text or mixed column."""
+    return np.array(
+        [None if v is None or v is pd.NA or (isinstance(v, float) and v != v) else str(v) for v in series.tolist()],
+        dtype=object,
+    )
+
+
+class _ColumnWriter:
+    """
+    One column of a store being written chunk by chunk.
+
+    Values are appended to a raw file and framed as ``.npy`` at the end, so
+    only the current chunk is in memory (plus a text column's dictionary).
+    A column whose chunks disagree on its kind is widened as it goes:
+    int64 and float64 to float64, anything else to text.
+    """
+
+    def __init__(self, stem: str):
+        self.stem = stem
+        self.kind: str | None = None
+        self.rows = 0
+        self._codes: dict[str, int] = {}  # text: value → dictionary code
+
+    @property
+    def _raw(self) -> str:
+        return f"{self.stem}.raw"
+
+    def _encode(self, values: np.ndarray) -> np.ndarray:
+        """int32 dictionary codes (-1 = null) for str / None *values*, growing the dictionary."""
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        lookup = np.array([self._codes.setdefault(v, len(self._codes)) for v in uniques.tolist()], dtype=np.int32)
+        out = np.full(len(codes), -1, dtype=np.int32)
+        valid = codes >= 0
+        out[valid] = lookup[codes[valid]]
+        return out
+
+    def _encoded(self, series: pd.Series) -> np.ndarray:
+        return self._encode(_text_values(series)) if self.kind == "text" else series.to_numpy(dtype=self.kind)
+
+    def _widen(self, kind: str) -> None:
+        """Rewrite the values written so far as *kind*."""
+        old, self.kind = self.kind, kind
+        if not self.rows:
+            return
+        written = np.memmap(self._raw, dtype=old, mode="r")
+        with open(f"{self._raw}.tmp", "wb") as f:
+            for start in range(0, self.rows, _WIDEN_BLOCK_ROWS):
+                self._encoded(pd.Series(written[start : start + _WIDEN_BLOCK_ROWS])).tofile(f)
+        del written
+        os.replace(f"{self._raw}.tmp", self._raw)
+
+    def append(self, series: pd.Series) -> None:
+        kind = _column_kind(series)
+        if not self.rows:
+            self.kind = kind  # nothing written yet (or only a header): no widening needed
+        elif kind != self.kind:
+            widened = "float64" if {kind, self.kind} == {"int64", "float64"} else "text"
+            if widened != self.kind:
+                self._widen(widened)
+        with open(self._raw, "ab") as f:
+            self._encoded(series).tofile(f)
+        self.rows += len(series)
+
+    def finish(self) -> None:
+        """Frame the raw values as ``.npy`` (plus the dictionary of a text column)."""
+        dtype = np.dtype(np.int32 if self.kind == "text" else self.kind)
+        suffix = ".codes.npy" if self.kind == "text" else ".npy"
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.rows,)}
+        with open(self.stem + suffix, "wb") as out:
+            np.lib.format.write_array_header_1_0(out, header)
+            if self.rows:
+                with open(self._raw, "rb") as raw:
+                    shutil.copyfileobj(raw, out)
+        if os.path.exists(self._raw):
+            os.remove(self._raw)
+        if self.kind == "text":
+            with open(f"{self.stem}.dict.json", "w") as f:
+                json.dump(list(self._codes), f)
+
+
+def save_chunks(chunks: Iterable[pd.DataFrame], directory: str) -> int:
+    """
+    Write consecutive frames with the same columns to *directory* as one
+    upload store, holding only one frame in memory at a time; returns the
+    row count.  At least one frame (possibly empty) is needed for the columns.
+
+    The store is written under a temporary name and renamed into place, so
+    a reader never sees a half-written upload.
+    """
+    staging = f"{directory}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    names: list[str] | None = None
+    writers: list[_ColumnWriter] = []
+    rows = 0
+    try:
+        for df in chunks:
+            if names is None:
+                names = [str(name) for name in df.columns]
+                writers = [_ColumnWriter(os.path.join(staging, f"c{idx}")) for idx in range(len(names))]
+            for idx, writer in enumerate(writers):
+                writer.append(df.iloc[:, idx])
+            rows += len(df)
+        if names is None:
+            raise ValueError("No frames to save.")
+
+        for writer in writers:
+            writer.finish()
+        columns = [{"name": name, "kind": writer.kind} for name, writer in zip(names, writers, strict=True)]
+        with open(os.path.join(staging, _SCHEMA_FILE), "w") as f:
+            json.dump({"version": FORMAT_VERSION, "rows": rows, "columns": columns}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+        logger.info("Saved %d rows x %d columns to %s", rows, len(columns), directory)
+        return rows
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def save_frame(df: pd.DataFrame, directory: str) -> None:
+    """Write *df* to *directory* in the columnar upload format (see ``save_chunks``)."""
+    save_chunks([df], directory)
+
+
+# ── Reading ────────────────────────────────────────────────────────────
+
+
+class UploadStore:
+    """
+    Read-only view of a saved upload.  Numeric columns and dictionary codes
+    are memory-mapped, so ``read``/``iter_chunks`` only touch the pages of
+    the rows they return.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, _SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        if schema.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported upload store version: {schema.get('version')!r}")
+        self.directory = directory
+        self.num_rows: int = schema["rows"]
+        self._kinds: dict[str, str] = {c["name"]: c["kind"] for c in schema["columns"]}
+        self._index: dict[str, int] = {c["name"]: i for i, c in enumerate(schema["columns"])}
+        self._arrays: dict[str, np.ndarray] = {}
+        self._dicts: dict[str, np.ndarray] = {}
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._kinds)
+
+    def _array(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            stem = os.path.join(self.directory, f"c{self._index[name]}")
+            suffix = ".codes.npy" if self._kinds[name] == "text" else ".npy"
+            self._arrays[name] = np.load(stem + suffix, mmap_mode="r")
+        return self._arrays[name]
+
+    def _dictionary(self, name: str) -> np.ndarray:
+        if name not in self._dicts:
+            with open(os.path.join(self.directory, f"c{self._index[name]}.dict.json")) as f:
+                # A trailing None slot makes code -1 (null) decode to None.
+                self._dicts[name] = np.array([*json.load(f), None], dtype=object)
+        return self._dicts[name]
+
+    def column(self, name: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Rows ``[start, stop)`` of *name*: a numeric array or an object array of str / None."""
+        values = self._array(name)[start:stop]
+        if self._kinds[name] == "text":
+            return self._dictionary(name).take(values)
+        return np.array(values)
+
+    def read(self, start: int = 0, stop: int | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+        """Rows ``[start, stop)`` as a DataFrame (text columns as object dtype)."""
+        names = self.columns if columns is None else columns
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        return pd.DataFrame({name: self.column(name, start, stop) for name in names})
+
+    def iter_chunks(self, chunk_size: int, columns: list[str] | None = None) -> Iterator[pd.DataFrame]:
+        """Yield the upload as consecutive DataFrames of at most *chunk_size* rows."""
+        for start in range(0, self.num_rows, chunk_size):
+            yield self.read(start, start + chunk_size, columns)
+
+
+def open_store(directory: str) -> UploadStore:
+    return UploadStore(directory)
+
+
+def exists(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, _SCHEMA_FILE))
+
+
+def remove(directory: str) -> None:
+    """Delete the store at *directory*, and any half-written one a killed writer left behind."""
+    shutil.rmtree(directory, ignore_errors=True)
+    shutil.rmtree(f"{directory}.partial", ignore_errors=True)
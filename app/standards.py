@@ -11,10 +11,21 @@ Sources:
 Each entry contains:
   Si — Permissible limit (Maximum Permissible Limit)
   Ii — Ideal/desirable limit (Acceptable Limit)
+
+Every standard is also compiled into a ``StandardProfile`` of NumPy
+vectors (see the bottom of this module); custom standards can be added
+at runtime with ``register_standard``.
 """
 
 from __future__ import annotations
 
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+import numpy as np
+
 # ── Drinking Water Standards ───────────────────────────────────────────
 STANDARDS: dict[str, dict[str, dict[str, float]]] = {
     # ----------------------------------------------------------
@@ -126,3 +137,131 @@ RFD: dict[str, float] = {
     "Hg": 0.0003,
     "U": 0.0006,
 }
+
+
+# ── Compiled Standard Profiles ─────────────────────────────────────────
+# The vectorized calculators never touch the nested dicts above per row.
+# Each standard is compiled once (at import, or when registered) into a
+# StandardProfile of NumPy vectors aligned to METAL_ORDER.
+
+# Fixed metal ordering shared by every compiled vector.
+METAL_ORDER: tuple[str, ...] = ("Pb", "Cd", "Cr", "As", "Hg", "Ni", "U", "Fe", "Mn", "Zn", "Cu")
+
+
+def _frozen(values: Any) -> np.ndarray:
+    """Read-only copy of *values*, so a shared profile can't be mutated by callers."""
+    arr = np.array(values)
+    arr.setflags(write=False)
+    return arr
+
+
+@dataclass(frozen=True, eq=False)
+class StandardProfile:
+    """
+    One standard compiled into dense vectors over ``METAL_ORDER``.
+
+    Metals the standard does not define — or defines with a missing or
+    zero ``Si`` — get NaN limits and zero weights, so every index simply
+    skips them without any per-row membership checks.
+
+    Profiles compare and hash by identity, so a re-registered standard
+    never matches results memoized against its previous profile.
+    """
+
+    name: str
+    si: np.ndarray  # Permissible limit (NaN = not defined)
+    ii: np.ndarray  # Ideal limit (NaN = not defined)
+    inv_si: np.ndarray  # 1 / Si, i.e. the HPI unit weight Wi
+    span: np.ndarray  # Si - Ii (NaN where No Relaxation or undefined)
+    no_relaxation: np.ndarray  # Si == Ii
+    defined: np.ndarray  # metal appears in the standard at all
+    hpi_weight: np.ndarray  # Wi where both Si and Ii are usable, else 0
+    ehci_weight: np.ndarray  # EHCI weight where Si != Ii, else 0
+    hmi_weight: np.ndarray  # HMI toxicity weight where Si is usable, else 0
+    pmi_weight: np.ndarray  # PCA factor scores (standard-independent)
+    rfd: np.ndarray  # Reference doses (standard-independent)
+    limits: Mapping[str, float]  # {symbol: Si} for the dict-based service layer
+
+
+def compile_standard(name: str, table: Mapping[str, Mapping[str, float | None]]) -> StandardProfile:
+    """Compile a ``{symbol: {"Si": .., "Ii": ..}}`` table into a StandardProfile."""
+    si, ii, defined = [], [], []
+    for symbol in METAL_ORDER:
+        entry = table.get(symbol) or {}
+        s, i = entry.get("Si"), entry.get("Ii")
+        si.append(np.nan if not s else float(s))
+        ii.append(np.nan if i is None else float(i))
+        defined.append(symbol in table)
+
+    si_arr, ii_arr = np.array(si), np.array(ii)
+    usable = ~np.isnan(si_arr) & ~np.isnan(ii_arr)
+    no_relaxation = si_arr == ii_arr
+    inv_si = 1.0 / si_arr
+    ehci = np.array([EHCI_WEIGHTS.get(s, 0.0) for s in METAL_ORDER])
+    hmi = np.array([HMI_WEIGHTS.get(s, 0.0) for s in METAL_ORDER])
+
+    return StandardProfile(
+        name=name,
+        si=_frozen(si_arr),
+        ii=_frozen(ii_arr),
+        inv_si=_frozen(inv_si),
+        span=_frozen(np.where(usable & ~no_relaxation, si_arr - ii_arr, np.nan)),
+        no_relaxation=_frozen(no_relaxation),
+        defined=_frozen(defined),
+        hpi_weight=_frozen(np.where(usable, inv_si, 0.0)),
+        ehci_weight=_frozen(np.where(usable & ~no_relaxation, ehci, 0.0)),
+        hmi_weight=_frozen(np.where(~np.isnan(si_arr), hmi, 0.0)),
+        pmi_weight=_frozen([PMI_FACTOR_SCORES.get(s, 0.0) for s in METAL_ORDER]),
+        rfd=_frozen([RFD.get(s, np.nan) for s in METAL_ORDER]),
+        limits=MappingProxyType({k: v["Si"] for k, v in table.items() if v.get("Si") is not None}),
+    )
+
+
+PROFILES: dict[str, StandardProfile] = {name: compile_standard(name, table) for name, table in STANDARDS.items()}
+
+
+def get_profile(standard: str) -> StandardProfile:
+    """Compiled profile for *standard*, falling back to BIS like the calculators always have."""
+    return PROFILES.get(standard, PROFILES["BIS"])
+
+
+def register_standard(
+    name: str,
+    table: Mapping[str, Mapping[str, float]],
+    *,
+    overwrite: bool = False,
+) -> StandardProfile:
+    """
+    Register a custom (e.g. state-specific) standard at runtime.
+
+    *table* uses the same shape as ``STANDARDS`` — ``{symbol: {"Si": ..,
+    "Ii": ..}}`` in mg/L, with ``Ii`` defaulting to 0.0.  The table is
+    validated, added to ``STANDARDS`` and compiled once, so scoring
+    against it costs the same per row as BIS or WHO.
+
+    Raises ``ValueError`` for unknown metals or inconsistent limits, or if
+    *name* already exists and *overwrite* is False.
+    """
+    if not name:
+        raise ValueError("Standard name must not be empty.")
+    if name in STANDARDS and not overwrite:
+        raise ValueError(f"Standard '{name}' is already registered.")
+
+    unknown = set(table) - set(METAL_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown metal(s) in standard '{name}': {', '.join(sorted(unknown))}.")
+
+    cleaned: dict[str, dict[str, float]] = {}
+    for symbol, entry in table.items():
+        if "Si" not in entry:
+            raise ValueError(f"Standard '{name}' is missing Si for {symbol}.")
+        si = float(entry["Si"])
+        ii = float(entry.get("Ii", 0.0))
+        if not (si > 0 and 0 <= ii <= si):
+            raise ValueError(f"Standard '{name}' needs 0 <= Ii <= Si and Si > 0 for {symbol}.")
+        cleaned[symbol] = {"Si": si, "Ii": ii}
+
+    profile = compile_standard(name, cleaned)
+    STANDARDS[name] = cleaned
+    PROFILES[name] = profile
+    return profile
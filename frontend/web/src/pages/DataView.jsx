@@ -238,26 +238,37 @@ export default function DataView({ samples, setSamples, summary }) {
       const data = await res.json()
       addToast(`Parsing started for ${file.name}. Please wait...`, 'info')
       
-      // Poll for task completion
+      // Track the task: push updates over SSE, falling back to polling
+      let finished = false;
+      const handleStatus = (sdata) => {
+        setTaskProgress(sdata.progress || 0);
+
+        if (sdata.status === 'completed') {
+          finished = true;
+          setUploadedFileId(sdata.result.file_id);
+          setUploadedFileName(sdata.result.filename || file.name);
+          setBusy(false);
+          setTaskProgress(0);
+          addToast(`File ${sdata.result.filename || file.name} loaded and parsed successfully. Click Calculate to process.`, 'success');
+        } else if (sdata.status === 'failed') {
+          finished = true;
+          setBusy(false);
+          setTaskProgress(0);
+          addToast(`Parsing failed: ${sdata.error_message}`, 'error');
+        } else if (sdata.status === 'cancelled') {
+          finished = true;
+          setBusy(false);
+          setTaskProgress(0);
+          addToast(`Parsing of ${file.name} was cancelled.`, 'info');
+        }
+      };
+
       const checkStatus = async () => {
         try {
           const sres = await fetch(API(`/api/v1/tasks/${data.task_id}`));
           if (!sres.ok) throw new Error("Failed to check task status");
-          const sdata = await sres.json();
-          
-          setTaskProgress(sdata.progress || 0);
-
-          if (sdata.status === 'completed') {
-            setUploadedFileId(sdata.result.file_id);
-            setUploadedFileName(sdata.result.filename || file.name);
-            setBusy(false);
-            setTaskProgress(0);
-            addToast(`File ${sdata.result.filename || file.name} loaded and parsed successfully. Click Calculate to process.`, 'success');
-          } else if (sdata.status === 'failed') {
-            setBusy(false);
-            setTaskProgress(0);
-            addToast(`Parsing failed: ${sdata.error_message}`, 'error');
-          } else {
+          handleStatus(await sres.json());
+          if (!finished) {
             // still pending or processing, poll again at a 800ms cadence
             setTimeout(checkStatus, 800);
           }
@@ -267,9 +278,21 @@ export default function DataView({ samples, setSamples, summary }) {
           addToast(String(err), 'error');
         }
       };
-      
-      setTimeout(checkStatus, 800);
-      
+
+      if (typeof EventSource === 'undefined') {
+        setTimeout(checkStatus, 800);
+      } else {
+        const events = new EventSource(API(`/api/v1/tasks/${data.task_id}/events`));
+        events.onmessage = (e) => {
+          handleStatus(JSON.parse(e.data));
+          if (finished) events.close();
+        };
+        events.onerror = () => {
+          // Stream unavailable or dropped before the task finished: poll instead
+          events.close();
+          if (!finished) setTimeout(checkStatus, 800);
+        };
+      }
     } catch (err) {
       addToast(String(err), 'error')
       setBusy(false)
@@ -36,6 +36,7 @@ from app.middleware import (
     SecurityHeadersMiddleware,
 )
 from app.models import Base, engine
+from app.services import geocoding, job_queue, pdf_parser
 
 # ── Logging ─────────────────────────────────────────────────────────────
 setup_logging()
@@ -57,8 +58,15 @@ async def lifespan(app: FastAPI):
     """
     logger.info("Creating database tables (if not exist) …")
     Base.metadata.create_all(bind=engine)
+    job_queue.start()
+    # This process only geocodes when jobs run in it or ingest geocodes inline;
+    # otherwise the workers load the index themselves, on first use.
+    if settings.GEOCODER_WARM_UP and (job_queue.runs_inline() or not settings.GEOCODER_DEFERRED):
+        geocoding.warm_up()
     yield
     logger.info("Application shutting down.")
+    job_queue.stop()
+    pdf_parser.shutdown_pool()
 
 
 # ── App ─────────────────────────────────────────────────────────────────
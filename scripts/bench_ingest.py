@@ -0,0 +1,84 @@
+"""
+Throughput benchmark for WHO/BIS scoring in the ``/calculate`` ingest path.
+
+Compares the per-row service functions (``calc_ci``/``calc_hei``/... once
+per row and standard, as the ingest loop used to do) against the columnar
+``score_standards_batch``, and times the full ``build_sample_records``
+pass that ``/calculate`` now runs.
+
+Usage:
+    python scripts/bench_ingest.py [--rows 100000] [--scalar-rows 20000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services import calculation_service as cs
+from app.services import ingest_service
+from app.standards import METAL_ORDER, RFD
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic parsed upload: every parameter column, ~10% blanks."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for column in ingest_service.PARAM_COLUMN_MAP:
+        col = rng.lognormal(mean=1.0, sigma=1.5, size=n_rows)
+        col[rng.random(n_rows) < 0.1] = np.nan
+        data[column] = col
+    data["state"] = rng.choice(["Punjab", "Bihar", "Kerala"], size=n_rows)
+    data["year"] = rng.integers(2000, 2024, size=n_rows)
+    data[ingest_service.LON_COLUMN] = rng.uniform(68.0, 97.0, size=n_rows)
+    data[ingest_service.LAT_COLUMN] = rng.uniform(8.0, 37.0, size=n_rows)
+    return pd.DataFrame(data)
+
+
+def bench_per_row(df: pd.DataFrame) -> float:
+    metal_columns = [f"parameters.{metal}" for metal in METAL_ORDER]
+    rows = [
+        {m: v for m, v in zip(METAL_ORDER, r, strict=True) if v == v} for r in df[metal_columns].to_numpy().tolist()
+    ]
+    start = time.perf_counter()
+    for raw in rows:
+        metals = cs.convert_units_for_metals(raw)
+        for limits in (cs.WHO_LIMITS_METALS, cs.BIS_LIMITS_METALS):
+            ci = cs.calc_ci(metals, limits)
+            cs.calc_ehci(ci)
+            cs.calc_hei(ci)
+            cs.calc_pli(ci)
+            cs.calc_hmpi(metals, limits)
+            cs.calc_hi(metals, RFD)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def bench_batch(df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    raw = np.column_stack([ingest_service.numeric_column(df, f"parameters.{metal}") for metal in METAL_ORDER])
+    cs.score_standards_batch(cs.convert_units_batch(raw))
+    return len(df) / (time.perf_counter() - start)
+
+
+def bench_records(df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    ingest_service.build_sample_records(df)
+    return len(df) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows for the columnar runs")
+    parser.add_argument("--scalar-rows", type=int, default=20_000, help="rows for the per-row run")
+    args = parser.parse_args()
+
+    per_row_rate = bench_per_row(make_frame(args.scalar_rows))
+    frame = make_frame(args.rows)
+    batch_rate = bench_batch(frame)
+    records_rate = bench_records(frame)
+
+    print(f"per-row scoring  : {per_row_rate:>14,.0f} rows/sec  ({args.scalar_rows:,} rows)")
+    print(f"batch scoring    : {batch_rate:>14,.0f} rows/sec  ({args.rows:,} rows)")
+    print(f"records (full)   : {records_rate:>14,.0f} rows/sec  ({args.rows:,} rows)")
+    print(f"scoring speedup  : {batch_rate / per_row_rate:>14,.1f}x")
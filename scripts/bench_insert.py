@@ -0,0 +1,84 @@
+"""
+Insert throughput for ``water_samples``: ORM vs the ingest upsert.
+
+Compares the old ``db.bulk_save_objects([WaterSample(**r) ...])`` path
+against ``ingest_service.upsert_sample_records``, what ingest runs (a
+keyed lookup, then a Core executemany upsert over the record dicts).
+Both insert the same scored records
+in INGEST_BATCH_SIZE batches with a commit per batch, into a fresh
+file-backed SQLite database per run.
+
+Usage:
+    python scripts/bench_insert.py [--rows 10000 100000 1000000] [--batch-size 5000]
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import ingest_service
+
+
+def make_records(n_rows: int, seed: int = 42) -> list[dict]:
+    """Scored records for a synthetic upload (reused cyclically for big runs)."""
+    rng = np.random.default_rng(seed)
+    data = {column: rng.lognormal(mean=1.0, sigma=1.5, size=n_rows) for column in ingest_service.PARAM_COLUMN_MAP}
+    data["state"] = rng.choice(["Punjab", "Bihar", "Kerala"], size=n_rows)
+    data["district"] = rng.choice([f"District {i}" for i in range(300)], size=n_rows)
+    data["year"] = rng.integers(2000, 2024, size=n_rows)
+    data[ingest_service.LON_COLUMN] = rng.uniform(68.0, 97.0, size=n_rows)
+    data[ingest_service.LAT_COLUMN] = rng.uniform(8.0, 37.0, size=n_rows)
+    return ingest_service.build_sample_records(pd.DataFrame(data))
+
+
+def _batches(template: list[dict], n_rows: int, batch_size: int):
+    # Records are reused cyclically, so give each copy a unique row_key.
+    rows = enumerate(itertools.islice(itertools.cycle(template), n_rows))
+    while batch := [dict(r, row_key=str(i)) for i, r in itertools.islice(rows, batch_size)]:
+        yield batch
+
+
+def insert_orm(db, batch: list[dict]) -> None:
+    db.bulk_save_objects([models.WaterSample(**record) for record in batch])
+
+
+def insert_upsert(db, batch: list[dict]) -> None:
+    ingest_service.upsert_sample_records(db, batch)
+
+
+def bench(insert, template: list[dict], n_rows: int, batch_size: int) -> float:
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        models.Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        elapsed = 0.0
+        for batch in _batches(template, n_rows, batch_size):
+            start = time.perf_counter()
+            insert(db, batch)
+            db.commit()
+            elapsed += time.perf_counter() - start
+        db.close()
+        engine.dispose()
+    return n_rows / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=5_000, help="rows per insert + commit")
+    args = parser.parse_args()
+
+    template = make_records(min(max(args.rows), 20_000))
+    print(f"{'rows':>10}{'orm rows/s':>16}{'upsert rows/s':>16}{'speedup':>10}")
+    for n_rows in args.rows:
+        orm_rate = bench(insert_orm, template, n_rows, args.batch_size)
+        upsert_rate = bench(insert_upsert, template, n_rows, args.batch_size)
+        print(f"{n_rows:>10,}{orm_rate:>16,.0f}{upsert_rate:>16,.0f}{upsert_rate / orm_rate:>9.1f}x")
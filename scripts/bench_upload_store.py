@@ -0,0 +1,93 @@
+"""
+Size and throughput of the parsed-upload intermediate format.
+
+Compares the old ``json.dump``/``json.load`` of the row dicts against the
+columnar ``upload_store`` (one memory-mappable ``.npy`` per column) on a
+synthetic parsed upload, including a chunked read of the store.
+
+Usage:
+    python scripts/bench_upload_store.py [--rows 200000] [--chunk-size 5000]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services import file_parser, upload_store
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic parsed upload: every required column, ~10% blanks."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for column in file_parser.REQUIRED_COLUMNS:
+        if column.startswith(("parameters.", "coordinates.")):
+            col = rng.lognormal(mean=1.0, sigma=1.5, size=n_rows)
+            col[rng.random(n_rows) < 0.1] = np.nan
+            data[column] = col
+    data["state"] = rng.choice(["Punjab", "Bihar", "Kerala", "Uttar Pradesh"], size=n_rows)
+    data["district"] = rng.choice([f"District {i}" for i in range(300)], size=n_rows)
+    data["location"] = [f"Site {i}" for i in rng.integers(0, n_rows, size=n_rows)]
+    data["village_code"] = rng.integers(100000, 999999, size=n_rows)
+    data["year"] = rng.integers(2000, 2024, size=n_rows)
+    data["source"] = "lab_A"
+    return pd.DataFrame(data)
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_json(df: pd.DataFrame, workdir: str) -> dict:
+    path = os.path.join(workdir, "upload.json")
+
+    def write():
+        rows = file_parser._frame_to_rows(df)
+        with open(path, "w") as f:
+            json.dump(rows, f)
+
+    def read():
+        with open(path) as f:
+            return pd.DataFrame(json.load(f), dtype=object)
+
+    _, write_s = _timed(write)
+    _, read_s = _timed(read)
+    return {"size": os.path.getsize(path), "write": write_s, "read": read_s}
+
+
+def bench_store(df: pd.DataFrame, workdir: str, chunk_size: int) -> dict:
+    path = os.path.join(workdir, "upload")
+    _, write_s = _timed(lambda: upload_store.save_frame(df, path))
+    _, read_s = _timed(lambda: upload_store.open_store(path).read())
+    _, chunk_s = _timed(lambda: sum(len(c) for c in upload_store.open_store(path).iter_chunks(chunk_size)))
+    return {"size": _dir_size(path), "write": write_s, "read": read_s, "chunked": chunk_s}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in the synthetic upload")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="rows per chunk for the chunked read")
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    with tempfile.TemporaryDirectory() as workdir:
+        js = bench_json(frame, workdir)
+        st = bench_store(frame, workdir, args.chunk_size)
+
+    rows = args.rows
+    print(f"{'':<18}{'size':>12}{'write rows/s':>16}{'read rows/s':>16}")
+    print(f"{'json':<18}{js['size'] / 2**20:>10.1f}MB{rows / js['write']:>16,.0f}{rows / js['read']:>16,.0f}")
+    print(f"{'columnar':<18}{st['size'] / 2**20:>10.1f}MB{rows / st['write']:>16,.0f}{rows / st['read']:>16,.0f}")
+    print(f"{'columnar chunked':<18}{'':>12}{'':>16}{rows / st['chunked']:>16,.0f}")
+    print(f"size ratio json/columnar: {js['size'] / st['size']:.1f}x")
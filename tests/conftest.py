@@ -1,3 +1,5 @@
+import dataclasses
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import StaticPool, create_engine
@@ -25,6 +27,33 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 # --- Fixtures ---
 
 
+@pytest.fixture(autouse=True)
+def isolated_parse_cache(monkeypatch, tmp_path_factory):
+    """Give every test an empty parse cache of its own."""
+    from app.services import parse_cache
+
+    cache_dir = str(tmp_path_factory.mktemp("parse_cache"))
+    monkeypatch.setattr(parse_cache, "settings", dataclasses.replace(parse_cache.settings, PARSE_CACHE_DIR=cache_dir))
+
+
+@pytest.fixture(autouse=True)
+def inline_jobs(monkeypatch):
+    """Run queued jobs in-process, right after the request that queued them."""
+    from app.services import job_queue
+
+    monkeypatch.setattr(job_queue, "settings", dataclasses.replace(job_queue.settings, JOB_WORKERS=0))
+
+
+@pytest.fixture(autouse=True)
+def unsandboxed_parsing(monkeypatch):
+    """Parse uploads in-process (tests that need the sandbox turn it back on)."""
+    from app.services import parse_sandbox
+
+    monkeypatch.setattr(
+        parse_sandbox, "settings", dataclasses.replace(parse_sandbox.settings, PARSE_SANDBOX_ENABLED=False)
+    )
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """
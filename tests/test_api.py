@@ -1,5 +1,8 @@
 import io
+import json
+import os
 import time
+from datetime import datetime
 
 
 def test_upload_csv_success(client, db_session):
@@ -163,3 +166,1081 @@ def test_pdf_parsing_mocked(monkeypatch):
     assert result_df["village_code"].iloc[0] == "V100"
     assert result_df["state"].iloc[0] == "Punjab"
     assert result_df["parameters.Fe"].iloc[0] == 0.15
+
+
+def test_pdf_page_parallel_extraction_matches_sequential(monkeypatch):
+    """Page ranges parsed in the process pool come back in page order, identical to a sequential parse."""
+    import dataclasses
+    import pathlib
+
+    import pypdfium2 as pdfium
+    import pytest
+
+    from app.services import pdf_parser
+
+    source = pathlib.Path(__file__).parent.parent / "cgwb-pdf" / "final_nhs-wq_pre_2023_compressed.pdf"
+    if not source.exists():
+        pytest.skip("CGWB sample PDF not available")
+    doc = pdfium.PdfDocument.new()
+    doc.import_pages(pdfium.PdfDocument(str(source)), [0, 1])
+    buf = io.BytesIO()
+    doc.save(buf)
+
+    monkeypatch.setattr(pdf_parser, "settings", dataclasses.replace(pdf_parser.settings, PDF_PARSE_WORKERS=1))
+    sequential = pdf_parser._read_tables_with_pdfplumber(buf.getvalue())
+
+    monkeypatch.setattr(
+        pdf_parser,
+        "settings",
+        dataclasses.replace(pdf_parser.settings, PDF_PARSE_WORKERS=2, PDF_PAGES_PER_CHUNK=1),
+    )
+    progress: list[int] = []
+    try:
+        parallel = pdf_parser._read_tables_with_pdfplumber(buf.getvalue(), progress_callback=progress.append)
+    finally:
+        pdf_parser.shutdown_pool()
+
+    assert sequential
+    assert len(parallel) == len(sequential)
+    for a, b in zip(parallel, sequential, strict=True):
+        pd_equal = a.equals(b) and list(a.columns) == list(b.columns)
+        assert pd_equal
+    assert progress == [47, 75]
+
+
+def test_quickcalc_batch_json_array_matches_single(client):
+    items = [
+        {"metals": {"As": 15.0, "Pb": 12.0}, "standard": "BIS"},
+        {"metals": {"arsenic": 5.0, "Fe": 400.0}, "standard": "WHO"},
+        {"metals": {"As": "not-a-number"}},
+        {"metals": {"Cd": 4.0}},
+    ]
+    response = client.post("/api/v1/quickcalc/batch", json=items)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert "error" in lines[2]
+
+    for i in (0, 1, 3):
+        single = client.post("/api/v1/quickcalc/", json=items[i]).json()
+        assert lines[i]["indices"] == single["indices"]
+        assert lines[i]["standard"] == single["standard"]
+
+
+def test_quickcalc_batch_ndjson_stream(client, monkeypatch):
+    import dataclasses
+
+    from app.routes import quickcalc
+
+    # Force several chunks so chunk boundaries are exercised.
+    monkeypatch.setattr(quickcalc, "settings", dataclasses.replace(quickcalc.settings, QUICKCALC_BATCH_CHUNK_SIZE=2))
+    body = "\n".join(json.dumps({"metals": {"As": float(i)}}) for i in range(5)) + "\n{not json}\n"
+
+    response = client.post(
+        "/api/v1/quickcalc/batch",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 6
+    assert [line["indices"]["hei"] for line in lines[:5]] == sorted(line["indices"]["hei"] for line in lines[:5])
+    assert "Invalid JSON line" in lines[5]["error"]
+
+
+def test_quickcalc_batch_rejects_non_array(client):
+    response = client.post("/api/v1/quickcalc/batch", json={"metals": {"As": 1.0}})
+    assert response.status_code == 400
+
+
+def test_quickcalc_cache_shares_name_and_symbol_keys(client):
+    from app import cache
+
+    cache._quickcalc_cache.clear()
+    hits = cache.QUICKCALC_CACHE_HITS._value.get()
+
+    by_name = client.post("/api/v1/quickcalc/", json={"metals": {"arsenic": 12.0, "Fe": 400.0}})
+    by_symbol = client.post("/api/v1/quickcalc/", json={"metals": {"As": 12.0, "Fe": 400.0}})
+
+    assert by_name.json()["indices"] == by_symbol.json()["indices"]
+    assert cache.QUICKCALC_CACHE_HITS._value.get() == hits + 1
+    assert len(cache._quickcalc_cache) == 1
+
+    metrics = client.get("/metrics").text
+    assert "quickcalc_cache_hits_total" in metrics
+    assert "quickcalc_cache_misses_total" in metrics
+
+
+def test_quickcalc_cache_can_be_disabled(client, monkeypatch):
+    import dataclasses
+
+    from app import cache
+
+    cache._quickcalc_cache.clear()
+    monkeypatch.setattr(cache, "settings", dataclasses.replace(cache.settings, QUICKCALC_CACHE_ENABLED=False))
+
+    client.post("/api/v1/quickcalc/", json={"metals": {"As": 12.0}})
+    assert len(cache._quickcalc_cache) == 0
+
+
+def test_csv_reader_declares_types_and_reads_in_chunks(monkeypatch, tmp_path):
+    import dataclasses
+    import importlib.util
+
+    import pandas as pd
+
+    from app.services import file_parser
+
+    # The blank line would throw off a resume that skipped lines, not records.
+    data = b"village_code,state,year,parameters.As,notes\n1,S1,2023,1.5,a\n2,S2,,2,b\n\n,S1,2021,BDL,c\n4,S3,2020,3,d\n"
+    path = tmp_path / "t.csv"
+    path.write_bytes(data)
+    # pyarrow is an optional dependency, as with CSV_ENGINE=auto.
+    engines = ["c"] + (["pyarrow"] if importlib.util.find_spec("pyarrow") is not None else [])
+    for engine in engines:
+        monkeypatch.setattr(
+            file_parser, "settings", dataclasses.replace(file_parser.settings, CSV_ENGINE=engine, CSV_CHUNK_ROWS=2)
+        )
+        clean = file_parser.read_csv_frame(data.replace(b"BDL", b"0.5"))
+        assert clean["parameters.As"].dtype == "float64" and clean["year"].dtype == "float64"
+        assert isinstance(clean["state"].dtype, pd.CategoricalDtype)
+        assert clean["village_code"].tolist()[:2] == ["1", "2"]  # not 1.0, 2.0
+
+        # Chunks are read lazily; text in a measurement column falls back to
+        # inference from that chunk on, without losing or repeating rows.
+        assert [len(c) for c in file_parser.iter_csv_chunks(data)] == [2, 2]
+        messy = file_parser.read_csv_frame(str(path))
+        assert messy["parameters.As"].tolist()[:3] == [1.5, 2.0, "BDL"]
+        assert messy["notes"].tolist() == ["a", "b", "c", "d"]
+
+
+def test_predict_hotspots_scores_columns_like_rows(client):
+    from app.services import calculation_service, file_parser
+
+    csv_content = (
+        "state,coordinates.coordinates[0],coordinates.coordinates[1],parameters.Fe,parameters.As,parameters.U\n"
+        "S1,77.1,28.7,0.2,4,10\n"
+        "S2,72.8,19.0,,,\n"
+        "S3,,19.0,0.1,1,1\n"
+        "S4,80.2,13.0,2.5,80.0,\n"
+    )
+    response = client.post(
+        "/api/v1/predict-hotspots/", files={"file": ("t.csv", io.BytesIO(csv_content.encode()), "text/csv")}
+    )
+    assert response.status_code == 200
+    predictions = response.json()
+    assert [(p["latitude"], p["risk_category"]) for p in predictions] == [
+        (28.7, "Moderate"),
+        (19.0, "Unknown"),  # no metals measured
+        (13.0, "Critical"),
+    ]  # the row without a longitude is skipped
+
+    # The older one-dict-per-row input scores the same.
+    rows = file_parser.parse_bytes_direct(csv_content.encode(), "t.csv")
+    assert calculation_service.predict_hotspots(rows) == predictions
+
+
+def test_upload_is_spooled_to_disk_and_cleaned_up(client, monkeypatch, tmp_path):
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    csv_content = "state,district,parameters.As\nS1,D1,12.0\n"
+
+    response = client.post(
+        "/api/v1/upload/", files={"file": ("test.csv", io.BytesIO(csv_content.encode()), "text/csv")}
+    )
+    assert response.status_code == 202
+
+    status = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()
+    assert status["status"] == "completed"
+    # Only the parsed rows remain; the spooled upload itself is removed.
+    assert [p.name for p in tmp_path.iterdir()] == [status["result"]["file_id"]]
+
+
+def test_upload_size_limit_enforced_while_streaming(client, monkeypatch, tmp_path):
+    import dataclasses
+
+    from app.routes import upload
+    from app.services import file_parser
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        file_parser,
+        "settings",
+        dataclasses.replace(file_parser.settings, MAX_UPLOAD_SIZE_BYTES=1000, UPLOAD_CHUNK_SIZE_BYTES=256),
+    )
+    csv_content = "state,parameters.As\n" + "S1,12.0\n" * 1000
+
+    response = client.post("/api/v1/upload/", files={"file": ("big.csv", io.BytesIO(csv_content.encode()), "text/csv")})
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_store_round_trip_and_chunked_read(tmp_path):
+    import numpy as np
+    import pandas as pd
+
+    from app.services import upload_store
+
+    df = pd.DataFrame(
+        {
+            "state": ["Punjab", None, "Punjab", "Bihar", "Kerala"],
+            "village_code": [101, 102, 103, 104, 105],
+            "parameters.As": [12.5, np.nan, 0.0, 3.0, 1e-300],
+            "parameters.Fe": pd.Series(["0.3", None, 0.25, "BDL", 7], dtype=object),
+        }
+    )
+    path = str(tmp_path / "upload")
+    upload_store.save_frame(df, path)
+
+    store = upload_store.open_store(path)
+    assert store.num_rows == 5
+    assert store.columns == list(df.columns)
+    assert isinstance(store._array("parameters.As"), np.memmap)
+
+    back = store.read()
+    assert back["state"].isna().tolist() == [False, True, False, False, False]
+    assert back["state"].dropna().tolist() == ["Punjab", "Punjab", "Bihar", "Kerala"]
+    assert back["village_code"].tolist() == [101, 102, 103, 104, 105]
+    np.testing.assert_array_equal(back["parameters.As"].to_numpy(), df["parameters.As"].to_numpy())
+    assert back["parameters.Fe"].tolist()[2:] == ["0.25", "BDL", "7"]
+
+    chunks = list(store.iter_chunks(2, columns=["village_code"]))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert pd.concat(chunks, ignore_index=True)["village_code"].tolist() == df["village_code"].tolist()
+
+
+def test_upload_store_is_written_chunk_by_chunk(tmp_path):
+    import pandas as pd
+
+    from app.services import upload_store
+
+    chunks = [
+        pd.DataFrame({"n": pd.Series([], dtype=object), "x": pd.Series([], dtype=object)}),  # header only
+        pd.DataFrame({"n": [1, 2], "x": [1, 2]}),
+        pd.DataFrame({"n": [2.5, None], "x": [3, 4]}),
+        pd.DataFrame({"n": ["BDL", 7], "x": [5, 6]}),
+    ]
+    path = str(tmp_path / "upload")
+    assert upload_store.save_chunks(iter(chunks), path) == 6
+    assert not os.path.exists(f"{path}.partial")
+
+    back = upload_store.open_store(path).read()
+    assert back["n"].tolist()[:3] + back["n"].tolist()[4:] == ["1.0", "2.0", "2.5", "BDL", "7"]
+    assert back["n"].isna().tolist() == [False, False, False, True, False, False]
+    assert back["x"].dtype == "int64" and back["x"].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+def test_csv_upload_is_parsed_into_the_store_chunk_by_chunk(client, monkeypatch, tmp_path):
+    import dataclasses
+
+    from app.routes import upload
+    from app.services import file_parser
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        file_parser, "settings", dataclasses.replace(file_parser.settings, CSV_ENGINE="c", CSV_CHUNK_ROWS=2)
+    )
+    monkeypatch.setattr(upload, "settings", dataclasses.replace(upload.settings, INGEST_BATCH_SIZE=2))
+
+    def whole_frame(*args, **kwargs):
+        raise AssertionError("the upload was read as one frame")
+
+    monkeypatch.setattr(file_parser, "read_csv_frame", whole_frame)
+    csv_content = "state,district,location,year,parameters.As\n" + "".join(
+        f"S{i},D{i},L{i},2023,{'BDL' if i == 3 else i}\n" for i in range(5)
+    )
+
+    saved = client.post("/api/v1/upload/", files={"file": ("a.csv", io.BytesIO(csv_content.encode()), "text/csv")})
+    status = client.get(f"/api/v1/tasks/{saved.json()['task_id']}").json()
+    assert status["status"] == "completed"
+    calc = client.post(f"/api/v1/calculate/{status['result']['file_id']}").json()
+    assert (calc["rows_processed"], calc["rows_inserted"]) == (5, 5)
+
+    auto = client.post(
+        "/api/v1/upload/?auto_calculate=true",
+        files={"file": ("b.csv", io.BytesIO(csv_content.replace("2023", "2024").encode()), "text/csv")},
+    )
+    result = client.get(f"/api/v1/tasks/{auto.json()['task_id']}").json()["result"]
+    assert (result["rows_processed"], result["rows_inserted"]) == (5, 5)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_auto_calculate_runs_whole_pipeline(client, monkeypatch, tmp_path):
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    csv_content = (
+        "state,district,location,year,coordinates.coordinates[0],coordinates.coordinates[1],parameters.As,parameters.Fe\n"
+        "S1,D1,L1,2023,77.1,28.7,12.0,0.4\n"
+        "S2,D2,L2,2023,72.8,19.0,3.0,0.1\n"
+    )
+
+    response = client.post(
+        "/api/v1/upload/?auto_calculate=true",
+        files={"file": ("test.csv", io.BytesIO(csv_content.encode()), "text/csv")},
+    )
+    assert response.status_code == 202
+
+    status = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()
+    assert status["status"] == "completed"
+    assert status["stage"] == "done"
+    assert status["result"] == {
+        "filename": "test.csv",
+        "rows_processed": 2,
+        "rows_inserted": 2,
+        "rows_updated": 0,
+        "rows_skipped": 0,
+        "rows_duplicate": 0,
+        "cached": False,
+        # Geocoding is deferred to a job of its own (see the next test).
+        "geocoding": {"rows": 0, "coordinates": 0, "cache_hits": 0, "deferred": 2, "cache_hit_rate": None},
+    }
+    # The parsed upload store is removed once its rows are ingested.
+    assert list(tmp_path.iterdir()) == []
+    assert client.get("/api/v1/indices/").json()["count"] == 2
+
+
+def test_geocoding_dedupes_coordinates_and_caches_them(client, monkeypatch, tmp_path):
+    import dataclasses
+
+    from app.routes import upload
+    from app.services import geocoding
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(upload, "settings", dataclasses.replace(upload.settings, GEOCODER_DEFERRED=False))
+    searched = []
+    real_search = geocoding.search
+
+    def spy(lat, lon):
+        searched.append(len(lat))
+        return real_search(lat, lon)
+
+    monkeypatch.setattr(geocoding, "search", spy)
+    header = "village_code,state,district,location,year,coordinates.coordinates[0],coordinates.coordinates[1],parameters.As\n"
+
+    def geocode(rows: str) -> dict:
+        response = client.post(
+            "/api/v1/upload/?auto_calculate=true",
+            files={"file": ("t.csv", io.BytesIO((header + rows).encode()), "text/csv")},
+        )
+        return client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()["result"]["geocoding"]
+
+    # The same well in three years (float noise below the precision) is looked up once.
+    wells = "V1,,,,2021,77.1,28.7,1\nV1,,,,2022,77.100001,28.7,2\nV1,,,,2023,77.1,28.7,3\nV2,,,,2023,72.8,19.0,4\n"
+    assert geocode(wells) == {"rows": 4, "coordinates": 2, "cache_hits": 0, "deferred": 0, "cache_hit_rate": 0.0}
+    assert searched == [2]
+    # Importing them again needs no search at all.
+    assert geocode(wells.replace(",1\n", ",5\n"))["cache_hit_rate"] == 1.0
+    assert searched == [2]
+    samples = client.get("/api/v1/datasets/?limit=10").json()
+    assert {s["state"] for s in samples["items"]} == {"NCT", "Maharashtra"}
+
+    # Rows that already carry their place can skip geocoding entirely.
+    monkeypatch.setattr(upload, "settings", dataclasses.replace(upload.settings, GEOCODER_SKIP_LOCATED_ROWS=True))
+    assert geocode("V3,S3,D3,L3,2023,80.2,13.0,1\nV4,,,,2023,80.3,13.1,1\n")["rows"] == 1
+    assert searched == [2, 1]
+
+
+def test_geocoding_is_deferred_to_a_background_job(client, db_session, monkeypatch, tmp_path):
+    import pytest
+
+    from app import cache, models
+    from app.routes import upload
+    from app.services import geocoding, job_queue
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    csv_content = (
+        "village_code,state,year,coordinates.coordinates[0],coordinates.coordinates[1],parameters.As\n"
+        "V1,Raw,2023,77.1,28.7,12.0\nV2,Raw,2023,72.8,19.0,3.0\nV3,Raw,2023,,,1.0\n"
+    )
+    response = client.post("/api/v1/upload/", files={"file": ("t.csv", io.BytesIO(csv_content.encode()), "text/csv")})
+    file_id = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()["result"]["file_id"]
+
+    # /calculate returns once rows are scored and inserted, before any geocoding.
+    search = geocoding.search
+    monkeypatch.setattr(job_queue, "run_queued", lambda: None)
+    monkeypatch.setattr(geocoding, "search", lambda lat, lon: pytest.fail("geocoded during ingest"))
+    assert client.post(f"/api/v1/calculate/{file_id}").json()["rows_inserted"] == 3
+    samples = {s["village_code"]: s for s in client.get("/api/v1/datasets/").json()["items"]}
+    assert [(s["state"], s["geo_pending"]) for s in samples.values()] == [("Raw", True), ("Raw", True), ("Raw", False)]
+    assert db_session.query(models.Job).filter_by(handler=geocoding.ENRICH_HANDLER, status="queued").count() == 1
+
+    # The job fills in place names and drops only the map views they are in.
+    monkeypatch.setattr(geocoding, "search", search)
+    monkeypatch.setattr(cache, "_map_cache", cache.TTLCache(maxsize=8, ttl=300))
+    monkeypatch.setattr(cache, "_map_bboxes", {})
+    client.get("/api/v1/datasets/map", params={"bbox": "76,28,78,29"})  # around V1
+    client.get("/api/v1/datasets/map", params={"bbox": "88,22,89,23"})  # nowhere near either
+    geocoding.enrich_pending()
+    assert list(cache._map_bboxes.values()) == [(88.0, 22.0, 89.0, 23.0)]
+    db_session.expire_all()
+    samples = {s["village_code"]: s for s in client.get("/api/v1/datasets/").json()["items"]}
+    assert (samples["V1"]["state"], samples["V1"]["geo_pending"]) == ("NCT", False)
+    assert samples["V2"]["state"] == "Maharashtra"
+    assert "district missing" not in samples["V1"]["validation_issues"]
+    assert samples["V3"]["state"] == "Raw"
+
+
+def test_calculate_commits_in_batches(client, monkeypatch, tmp_path):
+    import dataclasses
+
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(upload, "settings", dataclasses.replace(upload.settings, INGEST_BATCH_SIZE=2))
+    batch_sizes = []
+    real_build = upload.ingest_service.build_sample_records
+
+    def spy(df, geocode_results=None, geo_pending=None):
+        batch_sizes.append(len(df))
+        return real_build(df, geocode_results, geo_pending)
+
+    monkeypatch.setattr(upload.ingest_service, "build_sample_records", spy)
+    csv_content = "state,year,parameters.As\n" + "".join(f"S{i},2023,{i}.5\n" for i in range(5))
+
+    response = client.post("/api/v1/upload/", files={"file": ("t.csv", io.BytesIO(csv_content.encode()), "text/csv")})
+    file_id = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()["result"]["file_id"]
+    calc = client.post(f"/api/v1/calculate/{file_id}").json()
+
+    assert batch_sizes == [2, 2, 1]
+    assert (calc["rows_processed"], calc["rows_inserted"]) == (5, 5)
+    assert client.get("/api/v1/indices/").json()["count"] == 5
+
+
+def test_reupload_is_served_from_parse_cache(client, monkeypatch, tmp_path):
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    parses = []
+    real_parse = upload.file_parser.parse_file_to_store
+    monkeypatch.setattr(
+        upload.file_parser,
+        "parse_file_to_store",
+        lambda *args, **kwargs: parses.append(1) or real_parse(*args, **kwargs),
+    )
+    csv_content = b"state,year,parameters.As\nS1,2023,12.0\nS2,2023,3.0\n"
+
+    first = client.post("/api/v1/upload/", files={"file": ("a.csv", io.BytesIO(csv_content), "text/csv")})
+    assert client.get(f"/api/v1/tasks/{first.json()['task_id']}").json()["result"]["cached"] is False
+
+    second = client.post("/api/v1/upload/", files={"file": ("b.csv", io.BytesIO(csv_content), "text/csv")})
+    assert second.status_code == 202
+    assert second.json()["status"] == "completed"
+    status = client.get(f"/api/v1/tasks/{second.json()['task_id']}").json()
+    assert status["stage"] == "done"
+    assert status["result"]["cached"] is True
+    assert len(parses) == 1
+
+    calc = client.post(f"/api/v1/calculate/{status['result']['file_id']}").json()
+    assert (calc["rows_processed"], calc["rows_inserted"]) == (2, 2)
+
+
+def test_parse_cache_evicts_least_recently_used(monkeypatch):
+    import dataclasses
+
+    import pandas as pd
+
+    from app.services import parse_cache
+
+    df = pd.DataFrame({"parameters.As": [float(i) for i in range(1000)]})
+    parse_cache.store("a", df)
+    entry_size = parse_cache._dir_size(parse_cache._entry_path("a"))
+    monkeypatch.setattr(
+        parse_cache, "settings", dataclasses.replace(parse_cache.settings, PARSE_CACHE_MAX_BYTES=2 * entry_size)
+    )
+    parse_cache.store("b", df)
+    os.utime(parse_cache._entry_path("a"), (0, 0))
+    os.utime(parse_cache._entry_path("b"), (1, 1))
+    assert parse_cache.lookup("a")  # a is now the most recently used
+
+    parse_cache.store("c", df)
+
+    assert parse_cache.lookup("a") and parse_cache.lookup("c")
+    assert parse_cache.lookup("b") is None
+
+
+def test_recalculating_overlapping_upload_is_idempotent(client, monkeypatch, tmp_path):
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    header = "village_code,state,year,coordinates.coordinates[0],coordinates.coordinates[1],source,parameters.As\n"
+
+    def calculate(rows: str) -> dict:
+        response = client.post(
+            "/api/v1/upload/", files={"file": ("t.csv", io.BytesIO((header + rows).encode()), "text/csv")}
+        )
+        file_id = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()["result"]["file_id"]
+        return client.post(f"/api/v1/calculate/{file_id}").json()
+
+    first = calculate("V1,S1,2023,77.1,28.7,lab_A,12.0\nV2,S1,2023,77.2,28.8,lab_A,3.0\n")
+    assert (first["rows_inserted"], first["rows_updated"], first["rows_skipped"]) == (2, 0, 0)
+
+    # V1 unchanged; V2 renamed (its coordinates differ only past the key's rounding); V3 new
+    second = calculate(
+        "V1,S1,2023,77.1,28.7,lab_A,12.0\nV2,S2,2023,77.2000001,28.8,lab_A,3.0\nV3,S1,2023,77.3,28.9,lab_A,1.0\n"
+    )
+    assert (second["rows_inserted"], second["rows_updated"], second["rows_skipped"]) == (1, 1, 1)
+
+    samples = client.get("/api/v1/indices/").json()
+    assert samples["count"] == 3
+
+
+def test_ingest_records_match_per_row_service_functions():
+    import pandas as pd
+
+    from app.services import calculation_service as cs
+    from app.services import ingest_service
+
+    rows = [
+        {"state": " S1 ", "year": "2023", "parameters.pH": 7.1, "parameters.Fe": 0.4, "parameters.As": 12.5},
+        {"location": "L2", "year": 1850, "parameters.U": "31", "parameters.Pb": 0, "coordinates.coordinates[0]": 200},
+        {"district": "D3", "parameters.EC": "abc"},
+        {},
+    ]
+    records = ingest_service.build_sample_records(pd.DataFrame(rows, dtype=object))
+
+    assert len(records) == 3  # the all-empty row is dropped
+    first = records[0]
+    metals = cs.convert_units_for_metals({"Fe": 0.4, "As": 12.5})
+    ci = cs.calc_ci(metals, cs.BIS_LIMITS_METALS)
+    assert json.loads(first["standards_json"])["BIS"] == {
+        "ci": ci,
+        "ehci": cs.calc_ehci(ci),
+        "hei": cs.calc_hei(ci),
+        "pli": cs.calc_pli(ci),
+        "hmpi": cs.calc_hmpi(metals, cs.BIS_LIMITS_METALS),
+        "hi": cs.calc_hi(metals, cs.RFD),
+    }
+    assert (first["state"], first["year"], first["source"]) == ("S1", 2023, "lab_A")
+
+    second_issues = json.loads(records[1]["validation_issues_json"])
+    assert "year out of range (1900-2100)" in second_issues
+    assert "longitude out of range (-180, 180)" in second_issues
+    assert records[1]["longitude"] is None
+    assert json.loads(records[1]["standards_json"])["BIS"]["pli"] == 0.0
+
+    assert json.loads(records[2]["standards_json"]) == {}
+    assert json.loads(records[2]["parameters_json"]) == {}
+
+
+def test_samples_sharing_place_year_and_source_are_kept_apart(client, monkeypatch, tmp_path):
+    from app.routes import upload
+
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    csv = (
+        "state,district,location,year,source,parameters.As\n"
+        "S1,D1,Well 1,2023,lab_A,12.0\n"
+        "S1,D1,Well 1,2023,lab_A,55.0\n"
+        "S1,D1,Well 1,2023,lab_A,55.0\n"  # the second sample, listed twice
+    )
+    response = client.post("/api/v1/upload/", files={"file": ("t.csv", io.BytesIO(csv.encode()), "text/csv")})
+    file_id = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()["result"]["file_id"]
+    result = client.post(f"/api/v1/calculate/{file_id}").json()
+
+    assert (result["rows_inserted"], result["rows_skipped"], result["rows_duplicate"]) == (2, 0, 1)
+    assert client.get("/api/v1/indices/").json()["count"] == 2
+
+
+def _sse_events(body: str) -> list[dict]:
+    return [json.loads(line[len("data: ") :]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_task_events_stream_pushes_updates_until_done(client, db_session):
+    import threading
+
+    from app import models
+    from app.services import task_events
+
+    db_session.add(models.TaskStatus(id="t-sse", status="pending", progress=0))
+    db_session.commit()
+
+    def publish(**changes):
+        task_events.publish("t-sse", {"task_id": "t-sse", "status": "processing", "progress": 0, **changes})
+
+    # TestClient returns the body once the stream ends, so updates come from timers.
+    timers = [
+        threading.Timer(0.2, publish, kwargs={"progress": 40, "stage": "parsing"}),
+        threading.Timer(0.4, publish, kwargs={"status": "completed", "progress": 100, "result": {"file_id": "f"}}),
+    ]
+    for timer in timers:
+        timer.start()
+    response = client.get("/api/v1/tasks/t-sse/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(response.text)
+    assert [e["status"] for e in events] == ["pending", "processing", "completed"]
+    assert events[1]["stage"] == "parsing" and events[1]["progress"] == 40
+    assert events[-1]["result"] == {"file_id": "f"}
+    assert task_events._subscribers == {}
+
+
+def test_task_events_stream_ends_when_another_process_finishes_the_task(client, db_session, monkeypatch):
+    import dataclasses
+    import threading
+
+    from app import models
+    from app.routes import tasks
+
+    monkeypatch.setattr(tasks, "settings", dataclasses.replace(tasks.settings, SSE_KEEPALIVE_SECONDS=0.1))
+    db_session.add(models.TaskStatus(id="t-elsewhere", status="processing", progress=10))
+    db_session.commit()
+
+    def finish():
+        # A worker elsewhere only writes the row; nothing is published here.
+        task = db_session.get(models.TaskStatus, "t-elsewhere")
+        task.status, task.progress = "completed", 100
+        db_session.commit()
+
+    timer = threading.Timer(0.3, finish)
+    timer.start()
+    events = _sse_events(client.get("/api/v1/tasks/t-elsewhere/events").text)
+    timer.join()
+
+    assert [(e["status"], e["progress"]) for e in events] == [("processing", 10), ("completed", 100)]
+
+
+def test_task_events_for_finished_and_unknown_tasks(client):
+    csv_content = "state,district,parameters.As\nS1,D1,12.0\n"
+    response = client.post("/api/v1/upload/", files={"file": ("t.csv", io.BytesIO(csv_content.encode()), "text/csv")})
+    task_id = response.json()["task_id"]
+
+    events = _sse_events(client.get(f"/api/v1/tasks/{task_id}/events").text)
+    assert len(events) == 1
+    assert events[0]["status"] == "completed"
+    assert events[0] == client.get(f"/api/v1/tasks/{task_id}").json()
+
+    assert client.get("/api/v1/tasks/missing/events").status_code == 404
+
+
+def test_task_progress_is_written_behind(client, db_session, monkeypatch):
+    from app import models
+    from app.services import task_events
+
+    db_session.add(models.TaskStatus(id="t-wb", status="pending", progress=0))
+    db_session.commit()
+    task = db_session.get(models.TaskStatus, "t-wb")
+    commits = []
+    real_commit = db_session.commit
+    monkeypatch.setattr(db_session, "commit", lambda: commits.append(1) or real_commit())
+
+    tracker = task_events.TaskTracker(db_session, task)
+    tracker.update(status="processing", stage="parsing", progress=20)
+    for pct in range(21, 75):
+        tracker.update(progress=pct)
+
+    # Only the status change was committed; polling reads the live value.
+    assert len(commits) == 1
+    assert client.get("/api/v1/tasks/t-wb").json()["progress"] == 74
+    db_session.expire_all()
+    assert db_session.get(models.TaskStatus, "t-wb").progress == 20
+
+    tracker.update(status="completed", stage="done", progress=100, result={"file_id": "f"})
+    assert len(commits) == 2
+    assert task_events.live_snapshot("t-wb") is None
+    db_session.expire_all()
+    stored = db_session.get(models.TaskStatus, "t-wb")
+    assert (stored.status, stored.progress, stored.result) == ("completed", 100, {"file_id": "f"})
+
+
+def test_job_lease_lapses_and_orphans_are_recovered(client, db_session, monkeypatch):
+    import dataclasses
+
+    from app import models
+    from app.services import job_queue
+
+    monkeypatch.setattr(job_queue, "settings", dataclasses.replace(job_queue.settings, JOB_MAX_ATTEMPTS=2))
+    db_session.add(models.TaskStatus(id="t-job", status="pending", stage="queued", progress=0))
+    job_id = job_queue.enqueue(db_session, "os.path:exists", ["."], task_id="t-job")
+    db_session.commit()
+
+    # A live lease keeps the job from other workers; a lapsed one does not.
+    assert job_queue.claim(db_session, "w1").worker == "w1"
+    assert job_queue.claim(db_session, "w2") is None
+    db_session.get(models.Job, job_id).lease_expires_at = time.time() - 1
+    db_session.commit()
+
+    # Startup recovery puts it back in the queue and the task back to pending.
+    assert job_queue.recover_orphans(db_session) == 1
+    job = db_session.get(models.Job, job_id)
+    assert (job.status, job.worker, db_session.get(models.TaskStatus, "t-job").status) == ("queued", None, "pending")
+
+    job = job_queue.claim(db_session, "w2")
+    assert (job.id, job.attempts) == (job_id, 2)
+    job.lease_expires_at = time.time() - 1
+    db_session.commit()
+
+    # Out of attempts: the job and its task fail instead of looping forever.
+    assert job_queue.recover_orphans(db_session) == 1
+    db_session.expire_all()
+    assert db_session.get(models.Job, job_id).status == "failed"
+    task = db_session.get(models.TaskStatus, "t-job")
+    assert task.status == "failed"
+    assert "attempt" in task.error_message
+
+
+def test_jobs_are_scheduled_by_priority_fairness_and_size(client, db_session, monkeypatch):
+    import dataclasses
+
+    from app import models
+    from app.services import job_queue
+
+    monkeypatch.setattr(
+        job_queue,
+        "settings",
+        dataclasses.replace(job_queue.settings, JOB_WORKERS=2, JOB_FAST_LANE_WORKERS=1, JOB_FAST_LANE_MAX_BYTES=1000),
+    )
+
+    def add(task_id, client_key, size, priority=0):
+        db_session.add(models.TaskStatus(id=task_id, status="pending", stage="queued", progress=0))
+        job_queue.enqueue(
+            db_session, "os.path:exists", ["."], task_id=task_id, priority=priority, client=client_key, size_bytes=size
+        )
+        db_session.commit()
+
+    add("bulk-1", "national", 10**8)
+    add("bulk-2", "national", 10**8)
+    add("bulk-3", "national", 10**8)
+    add("small", "district", 500)
+    add("urgent", "national", 10**8, priority=5)
+
+    # Every job has finished before, at 30 s each.
+    db_session.add(
+        models.Job(id="old", handler="x:y", status="done", enqueued_at=0, started_at=100, finished_at=130, size_bytes=1)
+    )
+    db_session.commit()
+
+    status = client.get("/api/v1/tasks/bulk-3").json()
+    assert status["queue_position"] == 4  # urgent, bulk-1, bulk-2 first
+    assert status["estimated_start_at"] is not None
+    # The fast lane has nothing else queued, so the small file starts now.
+    small = client.get("/api/v1/tasks/small").json()
+    assert small["queue_position"] == 1
+    assert abs(datetime.fromisoformat(small["estimated_start_at"]).timestamp() - time.time()) < 5
+
+    claim = lambda **kw: job_queue.claim(db_session, "w", **kw).task_id  # noqa: E731
+    assert claim() == "urgent"
+    # "national" now has a job running, so the other client goes first.
+    assert claim() == "small"
+    assert claim() == "bulk-1"
+    # A fast-lane worker never picks up a large job.
+    assert job_queue.claim(db_session, "w", max_bytes=1000) is None
+    assert client.get("/api/v1/tasks/bulk-1").json()["queue_position"] is None
+
+
+def _spin(seconds: float) -> None:
+    """Job handler: busy-loop in Python (CPU work a cancellation has to stop)."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def test_jobs_are_cancelled_and_stopped_at_their_deadline(client, db_session, monkeypatch, tmp_path):
+    import threading
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import models
+    from app.services import job_queue
+
+    # A queued task is cancelled by the endpoint straight away.
+    db_session.add(models.TaskStatus(id="t-queued", status="pending", stage="queued", progress=0))
+    job_queue.enqueue(db_session, "os.path:exists", ["."], task_id="t-queued")
+    db_session.commit()
+    response = client.delete("/api/v1/tasks/t-queued")
+    assert response.status_code == 202
+    assert response.json()["status"] == "cancelled"
+    assert client.delete("/api/v1/tasks/t-queued").status_code == 409
+    assert client.delete("/api/v1/tasks/missing").status_code == 404
+
+    # Running jobs: the watchdog and the job share a database file.
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    db = models.SessionLocal()
+    db.add(models.TaskStatus(id="t-slow", status="pending", progress=0))
+    db.add(models.TaskStatus(id="t-spin", status="pending", progress=0))
+    slow = job_queue.enqueue(db, "time:sleep", [30], task_id="t-slow", deadline_seconds=0.5)
+    spin = job_queue.enqueue(db, f"{__name__}:_spin", [30], task_id="t-spin")
+    db.commit()
+
+    # Past its deadline, even a blocking call is interrupted.
+    started = time.monotonic()
+    job_queue.run_job(slow)
+    assert time.monotonic() - started < 5
+    db.expire_all()
+    assert db.get(models.Job, slow).status == "failed"
+    assert db.get(models.TaskStatus, "t-slow").error_message.startswith("Timed out")
+
+    # A running job stops soon after it is cancelled.
+    runner = threading.Thread(target=job_queue.run_job, args=(spin,))
+    runner.start()
+    while db.get(models.Job, spin).status != "running":
+        time.sleep(0.05)
+        db.expire_all()
+    assert job_queue.cancel(db, "t-spin") == "cancelling"
+    runner.join(timeout=5)
+    assert not runner.is_alive()
+    db.expire_all()
+    assert db.get(models.Job, spin).status == "cancelled"
+    assert db.get(models.TaskStatus, "t-spin").status == "cancelled"
+
+    # Without SIGUSR1 (Windows), a job on the main thread still stops at its deadline.
+    monkeypatch.setattr(job_queue, "_INTERRUPT_SIGNAL", None)
+    spin_late = job_queue.enqueue(db, f"{__name__}:_spin", [30], deadline_seconds=0.5)
+    db.commit()
+    job_queue.run_job(spin_late)
+    db.expire_all()
+    assert db.get(models.Job, spin_late).error.startswith("Timed out")
+    db.close()
+    engine.dispose()
+
+
+def test_pdf_timeout_keeps_rows_from_finished_pages(client, monkeypatch, tmp_path):
+    import contextlib
+    import dataclasses
+
+    from app.routes import upload as upload_mod
+    from app.services import job_queue, pdf_parser, upload_store
+
+    monkeypatch.setattr(upload_mod, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_parser, "settings", dataclasses.replace(pdf_parser.settings, PDF_PARSE_WORKERS=1))
+    pages = [
+        [(["State", "District", "Location", "As"], [["S1", "D1", "L1", "12"], ["S1", "D1", "L2", "3"]])],
+        [(["State", "District", "Location", "As"], [["S2", "D2", "L3", "7"]])],
+    ]
+    monkeypatch.setattr(
+        pdf_parser, "_open_pdf", lambda data: contextlib.nullcontext(type("Pdf", (), {"pages": [0, 1]}))
+    )
+
+    def tables_from_pages(page_numbers):
+        if page_numbers == [1]:
+            raise job_queue.JobTimedOut()  # the deadline hits while page 2 is parsed
+        return pages[page_numbers[0]]
+
+    monkeypatch.setattr(pdf_parser, "_tables_from_pages", tables_from_pages)
+
+    response = client.post(
+        "/api/v1/upload/?keep_partial=true",
+        files={"file": ("report_2023.pdf", io.BytesIO(b"%PDF-1.4 stub"), "application/pdf")},
+    )
+    task = client.get(f"/api/v1/tasks/{response.json()['task_id']}").json()
+
+    assert task["status"] == "failed"
+    assert task["error_message"].startswith("Timed out")
+    assert task["result"]["partial"] is True
+    saved = upload_store.open_store(os.path.join(str(tmp_path), task["result"]["file_id"]))
+    assert saved.num_rows == 2
+
+
+def test_geocoder_index_is_built_once_and_loaded_lazily(monkeypatch, tmp_path):
+    import dataclasses
+
+    import numpy as np
+    import pytest
+
+    from app.services import geocoding
+
+    monkeypatch.setattr(
+        geocoding, "settings", dataclasses.replace(geocoding.settings, GEOCODER_INDEX_DIR=str(tmp_path))
+    )
+    monkeypatch.setattr(geocoding, "_index", None)
+    assert not os.path.exists(geocoding.index_path())
+
+    delhi, mumbai, new_york = geocoding.search(np.array([28.61, 19.07, 40.71]), np.array([77.21, 72.88, -74.0]))
+    assert delhi["cc"] == "IN" and delhi["admin1"] == "NCT"
+    assert mumbai["admin1"] == "Maharashtra"
+    assert new_york is None  # no Indian place within GEOCODER_MAX_DISTANCE_KM
+    assert os.path.exists(geocoding.index_path())
+
+    # A fresh process loads the persisted index instead of rebuilding it.
+    monkeypatch.setattr(geocoding, "_index", None)
+    monkeypatch.setattr(geocoding, "_build_index", lambda path: pytest.fail("index rebuilt"))
+    assert geocoding.search(np.array([28.61]), np.array([77.21])) == [delhi]
+
+
+def test_parse_sandbox_caps_memory_and_cpu(monkeypatch, tmp_path):
+    import dataclasses
+    import math
+
+    import pytest
+
+    from app.services import file_parser, parse_sandbox
+
+    monkeypatch.setattr(
+        parse_sandbox,
+        "settings",
+        dataclasses.replace(
+            parse_sandbox.settings,
+            PARSE_SANDBOX_ENABLED=True,
+            PARSE_SANDBOX_MAX_MEMORY_BYTES=2 * 1024**3,
+            PARSE_SANDBOX_CPU_SECONDS=1,
+        ),
+    )
+    path = tmp_path / "t.csv"
+    path.write_text("state,district,parameters.As\nS1,D1,12.0\nS2,D2,3.5\n")
+
+    sandboxed = parse_sandbox.parse_file_frame(str(path), "t.csv")
+    assert sandboxed.equals(file_parser.parse_file_frame(str(path), "t.csv"))
+
+    restarts = parse_sandbox.SANDBOX_RESTARTS.labels(reason="memory")._value.get()
+    with pytest.raises(parse_sandbox.ParseSandboxError, match="memory"):
+        parse_sandbox.run(_allocate, 3 * 1024**3)
+    assert parse_sandbox.SANDBOX_RESTARTS.labels(reason="memory")._value.get() == restarts + 1
+
+    with pytest.raises(parse_sandbox.ParseSandboxError, match="CPU time"):
+        parse_sandbox.run(_compute, math.factorial, 10**8)
+
+    # Where there is no forkserver or rlimits (Windows), files are parsed in-process.
+    monkeypatch.setattr(parse_sandbox, "SUPPORTED", False)
+    monkeypatch.setattr(parse_sandbox, "run", lambda *args, **kwargs: pytest.fail("sandboxed without support"))
+    assert parse_sandbox.parse_file_frame(str(path), "t.csv").equals(sandboxed)
+
+
+def _allocate(size: int, progress_callback=None) -> int:
+    return len(bytearray(size))
+
+
+def _compute(func, arg, progress_callback=None):
+    return func(arg)
+
+
+def test_worker_pool_restarts_dead_workers_and_retries_their_jobs(monkeypatch, tmp_path):
+    import dataclasses
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import models
+    from app.services import job_queue
+
+    # Workers are separate processes, so they need a database file to share.
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(
+        job_queue,
+        "settings",
+        dataclasses.replace(job_queue.settings, JOB_WORKERS=1, JOB_MAX_ATTEMPTS=2, JOB_POLL_INTERVAL_SECONDS=0.1),
+    )
+    restarts = job_queue.JOB_WORKER_RESTARTS._value.get()
+
+    db = models.SessionLocal()
+    db.add(models.TaskStatus(id="t-crash", status="pending", stage="queued", progress=0))
+    crash = job_queue.enqueue(db, "os:_exit", [1], task_id="t-crash")
+    ok = job_queue.enqueue(db, "os.path:exists", [str(tmp_path)])
+    db.commit()
+
+    job_queue.start()
+    try:
+        for _ in range(300):
+            db.expire_all()
+            if {db.get(models.Job, crash).status, db.get(models.Job, ok).status} <= {"done", "failed"}:
+                break
+            time.sleep(0.1)
+    finally:
+        job_queue.stop()
+
+    # The crashing job killed its worker on each attempt, then was given up;
+    # the restarted worker went on to the next job.
+    assert db.get(models.Job, crash).status == "failed"
+    assert db.get(models.TaskStatus, "t-crash").status == "failed"
+    assert job_queue.JOB_WORKER_RESTARTS._value.get() == restarts + 2
+    assert db.get(models.Job, ok).status == "done"
+    db.close()
+    engine.dispose()
+
+
+def test_worker_pool_relays_cache_invalidations_to_the_api_process(monkeypatch, tmp_path):
+    import dataclasses
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import cache, models
+    from app.services import job_queue
+
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(
+        job_queue, "settings", dataclasses.replace(job_queue.settings, JOB_WORKERS=1, JOB_POLL_INTERVAL_SECONDS=0.1)
+    )
+    monkeypatch.setattr(cache, "_indices_cache", cache.TTLCache(maxsize=8, ttl=300))
+    cache._indices_cache["summary"] = {"count": 1}
+
+    db = models.SessionLocal()
+    job_id = job_queue.enqueue(db, "app.cache:invalidate_all", [])
+    db.commit()
+
+    job_queue.start()
+    try:
+        for _ in range(300):
+            db.expire_all()
+            if db.get(models.Job, job_id).status == "done" and not cache._indices_cache:
+                break
+            time.sleep(0.1)
+    finally:
+        job_queue.stop()
+
+    # The job ran in the worker, but cleared the cache this process serves from.
+    assert db.get(models.Job, job_id).status == "done"
+    assert not cache._indices_cache
+    db.close()
+    engine.dispose()
+
+
+def test_enrichment_in_a_worker_invalidates_the_api_process_map_cache(monkeypatch, tmp_path):
+    import dataclasses
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import cache, models
+    from app.services import geocoding, job_queue
+
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setenv("GEOCODER_INDEX_DIR", str(tmp_path / "geocoder"))
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(models, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(
+        job_queue, "settings", dataclasses.replace(job_queue.settings, JOB_WORKERS=1, JOB_POLL_INTERVAL_SECONDS=0.1)
+    )
+    monkeypatch.setattr(cache, "_map_cache", cache.TTLCache(maxsize=8, ttl=300))
+    monkeypatch.setattr(cache, "_map_bboxes", {})
+    for key, bbox in (("around-v1", (76.0, 28.0, 78.0, 29.0)), ("elsewhere", (88.0, 22.0, 89.0, 23.0))):
+        cache._map_cache[key] = []
+        cache._map_bboxes[key] = bbox
+
+    db = models.SessionLocal()
+    db.add(models.WaterSample(village_code="V1", state="Raw", latitude=28.7, longitude=77.1, geo_pending=True))
+    job_id = geocoding.enqueue_enrichment(db)
+    db.commit()
+
+    job_queue.start()
+    try:
+        for _ in range(300):
+            db.expire_all()
+            if db.get(models.Job, job_id).status == "done" and "around-v1" not in cache._map_cache:
+                break
+            time.sleep(0.1)
+    finally:
+        job_queue.stop()
+
+    # The worker renamed V1 and dropped the map view it is in from this process's cache.
+    assert db.get(models.Job, job_id).status == "done"
+    assert db.query(models.WaterSample).one().state == "NCT"
+    assert list(cache._map_bboxes) == ["elsewhere"]
+    db.close()
+    engine.dispose()
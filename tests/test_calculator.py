@@ -1,5 +1,6 @@
 # tests/test_calculator.py
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -59,3 +60,131 @@ def test_calculate_cd_low_pollution(sample_data_low):
     cd_value, category = calculator.calculate_degree_of_contamination(sample_data_low)
     assert cd_value == pytest.approx(0.0, 0.01)
     assert category == "Low degree of contamination"
+
+
+# --- Tests for the vectorized batch engine ---
+
+
+def test_batch_matches_scalar_for_dataframe(sample_data_moderate, sample_data_low):
+    """Batch results must equal the per-row wrappers row for row."""
+    rows = [sample_data_moderate.to_dict(), sample_data_low.to_dict(), {"As": 25.0, "Fe": 450.0, "Mn": 120.0}]
+    df = pd.DataFrame(rows)
+    batch = calculator.calculate_all_indices_batch(df, "BIS")
+
+    for i, row in enumerate(df.to_dict(orient="records")):
+        scalar = calculator.calculate_all_indices(row, "BIS")
+        for key in ("hpi", "hpi_category", "cd", "cd_category", "hei", "ehci", "hmi", "pmi"):
+            assert batch[key][i] == scalar[key], key
+        assert bool(batch["reduced_parameter_set"][i]) == scalar["reduced_parameter_set"]
+        assert calculator.missing_parameters(batch["missing_mask"][i]) == scalar["missing_parameters"]
+
+
+def test_batch_accepts_dict_of_arrays():
+    data = {"arsenic": np.array([15.0, np.nan]), "Pb": np.array([12.0, 4.0])}
+    batch = calculator.calculate_all_indices_batch(data, "WHO")
+
+    assert batch["hpi"].shape == (2,)
+    assert batch["hpi"][0] == calculator.calculate_hpi({"arsenic": 15.0, "Pb": 12.0}, "WHO")[0]
+    assert batch["hpi"][1] == calculator.calculate_hpi({"Pb": 4.0}, "WHO")[0]
+
+
+def test_batch_treats_strings_as_scalars():
+    # No metal columns: the row count comes from array-likes, not len("lab_A").
+    batch = calculator.calculate_all_indices_batch({"source": "lab_A", "year": np.array([2022, 2023])})
+
+    assert batch["hpi"].shape == (2,)
+    assert calculator.calculate_all_indices_batch({"source": "lab_A"})["hpi"].shape == (0,)
+
+
+def test_batch_symbol_overrides_name_and_handles_no_data():
+    df = pd.DataFrame({"arsenic": [5.0, None], "As": [50.0, None]})
+    batch = calculator.calculate_all_indices_batch(df)
+
+    assert batch["hpi"][0] == calculator.calculate_hpi({"As": 50.0})[0]
+    assert batch["hpi"][1] == 0.0
+    assert batch["hpi_category"][1] == "No Data"
+    assert batch["pmi"][1] == 0.0
+
+
+# --- Tests for compiled standard profiles ---
+
+
+def test_register_custom_standard_is_used_by_calculator_and_service(monkeypatch):
+    from app import standards
+    from app.services import calculation_service
+
+    monkeypatch.setattr(standards, "STANDARDS", dict(standards.STANDARDS))
+    monkeypatch.setattr(standards, "PROFILES", dict(standards.PROFILES))
+
+    standards.register_standard("TEST_STATE", {"As": {"Si": 0.05, "Ii": 0.01}, "Pb": {"Si": 0.01}})
+
+    # 30 µg/L As sits halfway between Ii and Si, and 5 µg/L Pb halfway
+    # between the default Ii = 0 and Si → both Qi = 50, so HPI = 50.
+    hpi, category = calculator.calculate_hpi({"As": 30.0, "Pb": 5.0}, "TEST_STATE")
+    assert hpi == pytest.approx(50.0)
+    assert category == "Poor"
+    assert calculator.calculate_all_indices({"As": 30.0}, "TEST_STATE")["missing_parameters"] == ["Pb"]
+    assert dict(calculation_service.get_limits("TEST_STATE")) == {"As": 0.05, "Pb": 0.01}
+
+
+def test_register_standard_rejects_bad_tables():
+    from app import standards
+
+    with pytest.raises(ValueError, match="already registered"):
+        standards.register_standard("BIS", {"As": {"Si": 0.01}})
+    with pytest.raises(ValueError, match="Unknown metal"):
+        standards.register_standard("BAD", {"Se": {"Si": 0.01}})
+    with pytest.raises(ValueError, match="Ii <= Si"):
+        standards.register_standard("BAD", {"As": {"Si": 0.01, "Ii": 0.02}})
+    assert "BAD" not in standards.STANDARDS
+
+
+def test_compiled_profiles_are_read_only():
+    from app.standards import get_profile
+
+    profile = get_profile("WHO")
+    assert profile.si.shape == (len(calculator.METAL_ORDER),)
+    with pytest.raises(ValueError):
+        profile.si[0] = 1.0
+    assert get_profile("UNKNOWN") is get_profile("BIS")
+
+
+# --- Tests for the log-space PLI ---
+
+
+def test_pli_zero_and_missing_handling():
+    from app.services import calculation_service as cs
+
+    assert cs.calc_pli({}) is None
+    assert cs.calc_pli({"As": -1.0}) is None
+    assert cs.calc_pli({"As": 0.0, "Pb": 4.0}) == 0.0
+    assert cs.calc_pli({"As": 2.0, "Pb": 8.0, "Cd": -3.0}) == pytest.approx(4.0)
+    assert cs.calc_pli({"As": 1e-300, "Pb": 1e300}) == pytest.approx(1.0)
+
+    ci = np.array([[2.0, 8.0, np.nan], [np.nan, np.nan, np.nan], [0.0, 5.0, 1.0]])
+    batch = cs.calc_pli_batch(ci)
+    assert batch[0] == pytest.approx(4.0)
+    assert np.isnan(batch[1])
+    assert batch[2] == 0.0
+
+
+@pytest.mark.parametrize("value", [1e-300, 5e-324, 1e300, np.finfo(np.float64).max])
+def test_pli_near_float_limits(value):
+    from app.services import calculation_service as cs
+
+    # Eleven such ratios underflow/overflow a running product; the
+    # geometric mean of identical values is the value itself.
+    ci = {metal: value for metal in calculator.METAL_ORDER}
+    assert cs.calc_pli(ci) == pytest.approx(value, rel=1e-12)
+
+
+def test_pli_batch_matches_per_row():
+    from app.services import calculation_service as cs
+
+    rng = np.random.default_rng(7)
+    ci = rng.lognormal(0.0, 20.0, size=(500, len(calculator.METAL_ORDER)))
+    ci[rng.random(ci.shape) < 0.3] = np.nan
+    batch = cs.calc_pli_batch(ci)
+    for row, expected in zip(ci.tolist(), batch.tolist(), strict=True):
+        per_row = cs.calc_pli({m: v for m, v in zip(calculator.METAL_ORDER, row, strict=True) if v == v})
+        assert per_row == (None if np.isnan(expected) else expected)